@@ -9,8 +9,7 @@ import sys
 import swisseph as swe
 from datetime import datetime
 
-# KP-Newcomb Ayanamsa value: 23° 43' 04"
-KP_AYANAMSA = 23 + 43/60 + 4/3600
+from kp_ayanamsa import AYANAMSA_NAME, KP_AYANAMSA, sidereal_calc
 
 def format_degrees_dms(decimal_degrees):
     """Convert decimal degrees to degrees, minutes, seconds"""
@@ -62,9 +61,6 @@ def calculate_comprehensive_chart(birth_data):
     decimal_time = hour + minute/60 + second/3600
     jd_utc = swe.julday(year, month, day, decimal_time - tz_offset)
     
-    # Set KP Ayanamsa
-    swe.set_sid_mode(swe.SIDM_USER, 0, KP_AYANAMSA)
-    
     chart_data = {
         'birth_info': {
             'date': f"{year}-{month:02d}-{day:02d}",
@@ -76,7 +72,7 @@ def calculate_comprehensive_chart(birth_data):
             'julian_day_utc': jd_utc
         },
         'ayanamsa': {
-            'system': 'KP-Newcomb',
+            'system': AYANAMSA_NAME,
             'value_degrees': KP_AYANAMSA,
             'formatted': format_degrees_dms(KP_AYANAMSA)['formatted']
         },
@@ -108,14 +104,14 @@ def calculate_comprehensive_chart(birth_data):
     for planet_name, planet_id in planets.items():
         try:
             # Calculate with speed and additional data
-            result = swe.calc_ut(jd_utc, planet_id, swe.FLG_SPEED | swe.FLG_SIDEREAL)
+            result = sidereal_calc(jd_utc, planet_id)
             
-            longitude = result[0][0]
-            latitude_planet = result[0][1]
-            distance = result[0][2]
-            speed_longitude = result[0][3]
-            speed_latitude = result[0][4] 
-            speed_distance = result[0][5]
+            longitude = result[0]
+            latitude_planet = result[1]
+            distance = result[2]
+            speed_longitude = result[3]
+            speed_latitude = result[4] 
+            speed_distance = result[5]
             
             # Sign calculation
             sign_num = int(longitude // 30)
@@ -179,7 +175,7 @@ def calculate_comprehensive_chart(birth_data):
         house_cusps = houses_result[0]
         ascmc = houses_result[1]
         
-        for i, cusp in enumerate(house_cusps[1:], 1):  # Skip index 0
+        for i, cusp in enumerate(house_cusps[-12:], 1):  # pyswisseph >= 2.10 returns 12 cusps, older versions 13
             cusp_sidereal = cusp - KP_AYANAMSA
             if cusp_sidereal < 0:
                 cusp_sidereal += 360
@@ -254,9 +250,6 @@ def calculate_comprehensive_chart(birth_data):
             except:
                 pass
         
-        # Reset to KP
-        swe.set_sid_mode(swe.SIDM_USER, 0, KP_AYANAMSA)
-        
     except Exception as e:
         chart_data['technical_data']['error'] = str(e)
     
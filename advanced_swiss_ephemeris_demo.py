@@ -9,6 +9,8 @@ import json
 import swisseph as swe
 from datetime import datetime, timezone, timedelta
 
+from kp_vector_houses import compute_house_systems
+
 # KP-Newcomb Ayanamsa value: 23° 43' 04"
 KP_AYANAMSA = 23 + 43/60 + 4/3600
 
@@ -128,7 +130,7 @@ def demo_house_calculations():
     ist_offset = 5.5
     jd_utc = swe.julday(year, month, day, decimal_time - ist_offset)
     
-    # Different house systems
+    # Different house systems, all derived from one shared ARMC, obliquity and Ascendant
     house_systems = {
         'P': 'Placidus',
         'K': 'Koch',
@@ -139,29 +141,25 @@ def demo_house_calculations():
         'E': 'Equal House'
     }
     
-    for system_code, system_name in house_systems.items():
-        try:
-            houses_result = swe.houses(jd_utc, latitude, longitude, system_code.encode('ascii'))
-            house_cusps = houses_result[0]  # House cusps
-            ascmc = houses_result[1]        # Ascendant, MC, etc.
-            
-            print(f"\n{system_name} House System:")
-            print("-" * 40)
-            
-            # Show house cusps
-            for i, cusp in enumerate(house_cusps[1:], 1):  # Skip index 0
-                pos = get_sidereal_position(cusp)
-                print(f"House {i:2d}: {pos['formatted']} {pos['sign']}")
-            
-            # Show important points
-            asc_pos = get_sidereal_position(ascmc[0])  # Ascendant
-            mc_pos = get_sidereal_position(ascmc[1])   # Midheaven
-            
-            print(f"\nAscendant: {asc_pos['formatted']} {asc_pos['sign']}")
-            print(f"Midheaven: {mc_pos['formatted']} {mc_pos['sign']}")
-            
-        except Exception as e:
-            print(f"Error calculating {system_name}: {e}")
+    houses_result = compute_house_systems([jd_utc], [latitude], [longitude], house_systems)
+    asc_pos = get_sidereal_position(houses_result['ascendant'][0])  # Ascendant
+    mc_pos = get_sidereal_position(houses_result['midheaven'][0])   # Midheaven
+    
+    for k, (system_code, system_name) in enumerate(house_systems.items()):
+        print(f"\n{system_name} House System:")
+        print("-" * 40)
+        
+        # Show house cusps
+        for i, cusp in enumerate(houses_result['cusps'][0, :, k], 1):
+            pos = get_sidereal_position(cusp)
+            print(f"House {i:2d}: {pos['formatted']} {pos['sign']}")
+        
+        if houses_result['fallback'][0, k]:
+            print("(undefined at this latitude, Porphyry cusps shown)")
+        
+        # Show important points
+        print(f"\nAscendant: {asc_pos['formatted']} {asc_pos['sign']}")
+        print(f"Midheaven: {mc_pos['formatted']} {mc_pos['sign']}")
 
 def demo_eclipse_calculations():
     """Demo 3: Eclipse calculations"""
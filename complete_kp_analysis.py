@@ -9,8 +9,10 @@ import json
 import swisseph as swe
 from datetime import datetime, timedelta
 
-# KP-Newcomb Ayanamsa value: 23° 43' 04"
-KP_AYANAMSA = 23 + 43/60 + 4/3600
+from kp_metrics import count_body_error, count_ephemeris_calls
+from kp_dasha_engine import VIMSHOTTARI
+from kp_ayanamsa import sidereal_calc, to_sidereal
+from kp_sub_table import ARCSEC_PER_YEAR, SUB_TABLE, sub_index
 
 # KP System Constants
 SIGNS = ["Aries", "Taurus", "Gemini", "Cancer", "Leo", "Virgo",
@@ -25,10 +27,7 @@ NAKSHATRAS = [
 ]
 
 # Vimshottari Dasha periods (in years)
-DASHA_PERIODS = {
-    'Ketu': 7, 'Venus': 20, 'Sun': 6, 'Moon': 10, 'Mars': 7,
-    'Rahu': 18, 'Jupiter': 16, 'Saturn': 19, 'Mercury': 17
-}
+DASHA_PERIODS = dict(VIMSHOTTARI.years)
 
 # KP Star Lord Sequence (which planet rules which nakshatra)
 STAR_LORDS = [
@@ -37,11 +36,8 @@ STAR_LORDS = [
     'Ketu', 'Venus', 'Sun', 'Moon', 'Mars', 'Rahu', 'Jupiter', 'Saturn', 'Mercury'
 ]
 
-# KP Sub-Lord divisions (Krishnamurti Padhdhati subdivision)
-SUB_LORD_DIVISIONS = {
-    'Ketu': 7,   'Venus': 20,  'Sun': 6,     'Moon': 10,   'Mars': 7,
-    'Rahu': 18,  'Jupiter': 16, 'Saturn': 19, 'Mercury': 17
-}
+# KP Sub-Lord divisions (Krishnamurti Padhdhati subdivision), in dasha years
+SUB_LORD_DIVISIONS = dict(VIMSHOTTARI.years)
 
 def format_dms(decimal_degrees):
     """Convert decimal degrees to degrees, minutes, seconds"""
@@ -75,35 +71,20 @@ def get_nakshatra_info(longitude):
     }
 
 def get_sub_lord(longitude):
-    """Calculate KP Sub-Lord for a given longitude"""
-    # Total zodiac = 360°, divided among 9 planets in proportion to their dasha periods
-    total_dasha_years = sum(SUB_LORD_DIVISIONS.values())  # 120 years
-    
-    # Each degree gets divided proportionally
-    degree_division = 120 / 360  # 0.333... years per degree
-    
-    # Find which sub-lord period this longitude falls into
-    cumulative_degrees = 0
-    planets_in_order = ['Ketu', 'Venus', 'Sun', 'Moon', 'Mars', 'Rahu', 'Jupiter', 'Saturn', 'Mercury']
-    
-    # Keep cycling through the 120-year cycle
-    adjusted_longitude = longitude % 360
-    cycle_position = (adjusted_longitude / 360) * total_dasha_years
-    
-    cumulative_years = 0
-    for planet in planets_in_order:
-        planet_years = SUB_LORD_DIVISIONS[planet]
-        if cycle_position < cumulative_years + planet_years:
-            remaining_in_period = cycle_position - cumulative_years
-            return {
-                'sub_lord': planet,
-                'position_in_period': remaining_in_period,
-                'period_duration': planet_years
-            }
-        cumulative_years += planet_years
-    
-    # Fallback (shouldn't reach here)
-    return {'sub_lord': 'Ketu', 'position_in_period': 0, 'period_duration': 7}
+    """Calculate KP Sub-Lord for a given longitude from the 249-sub table"""
+    index = int(sub_index(longitude))
+    sub = SUB_TABLE[index]
+    # A sub split by a sign boundary is one dasha period: measure from its first piece
+    start = sub.start
+    previous = SUB_TABLE[index - 1]
+    if previous.nakshatra == sub.nakshatra and previous.sub_lord == sub.sub_lord:
+        start = previous.start
+
+    return {
+        'sub_lord': sub.sub_lord,
+        'position_in_period': (longitude % 360 - start) * 3600 / ARCSEC_PER_YEAR,
+        'period_duration': SUB_LORD_DIVISIONS[sub.sub_lord]
+    }
 
 def calculate_divisional_charts(longitude_data, chart_type='D9'):
     """Calculate divisional chart positions"""
@@ -213,9 +194,6 @@ def calculate_complete_kp_chart(birth_data):
     decimal_time = hour + minute/60 + second/3600
     jd_utc = swe.julday(year, month, day, decimal_time - tz_offset)
     
-    # Set KP Ayanamsa
-    swe.set_sid_mode(swe.SIDM_USER, 0, KP_AYANAMSA)
-    
     complete_analysis = {
         'birth_info': {
             'date': f"{year}-{month:02d}-{day:02d}",
@@ -245,22 +223,22 @@ def calculate_complete_kp_chart(birth_data):
     
     for planet_name, planet_id in planets.items():
         try:
-            result = swe.calc_ut(jd_utc, planet_id, swe.FLG_SPEED | swe.FLG_SIDEREAL)
-            longitude = result[0][0]
-            speed = result[0][3]
+            result = sidereal_calc(jd_utc, planet_id)
+            planet_longitude = result[0]
+            speed = result[3]
             
             # Basic position
-            sign_num = int(longitude // 30)
-            degrees_in_sign = longitude % 30
+            sign_num = int(planet_longitude // 30)
+            degrees_in_sign = planet_longitude % 30
             
             # Nakshatra analysis
-            nakshatra_info = get_nakshatra_info(longitude)
+            nakshatra_info = get_nakshatra_info(planet_longitude)
             
             # Sub-lord analysis
-            sub_lord_info = get_sub_lord(longitude)
+            sub_lord_info = get_sub_lord(planet_longitude)
             
             planet_data = {
-                'longitude': longitude,
+                'longitude': planet_longitude,
                 'sign': SIGNS[sign_num],
                 'sign_number': sign_num + 1,
                 'degrees_in_sign': degrees_in_sign,
@@ -274,8 +252,11 @@ def calculate_complete_kp_chart(birth_data):
             planet_positions[planet_name] = planet_data
             
         except Exception as e:
+            count_body_error(planet_name)
             planet_positions[planet_name] = {'error': str(e)}
     
+    count_ephemeris_calls('calc_ut', len(planets))
+    
     # Add Ketu
     if 'Rahu' in planet_positions and 'error' not in planet_positions['Rahu']:
         rahu_lon = planet_positions['Rahu']['longitude']
@@ -311,15 +292,14 @@ def calculate_complete_kp_chart(birth_data):
     
     # KP Houses with cusps
     try:
+        count_ephemeris_calls('houses')
         houses_result = swe.houses(jd_utc, latitude, longitude, b'P')
         house_cusps = houses_result[0]
         ascmc = houses_result[1]
         
         kp_houses = {}
-        for i, cusp in enumerate(house_cusps[1:], 1):
-            cusp_sidereal = cusp - KP_AYANAMSA
-            if cusp_sidereal < 0:
-                cusp_sidereal += 360
+        for i, cusp in enumerate(house_cusps[-12:], 1):  # pyswisseph >= 2.10 returns 12 cusps, older versions 13
+            cusp_sidereal = float(to_sidereal(cusp, jd_utc))
                 
             sign_num = int(cusp_sidereal // 30)
             degrees_in_sign = cusp_sidereal % 30
@@ -339,6 +319,7 @@ def calculate_complete_kp_chart(birth_data):
         complete_analysis['kp_houses'] = kp_houses
         
     except Exception as e:
+        count_body_error('houses')
         complete_analysis['kp_houses'] = {'error': str(e)}
     
     return complete_analysis
@@ -4,7 +4,10 @@ import json
 from datetime import datetime, timedelta
 import swisseph as swe
 
-def calculate_kp_positions(birth_date, birth_time, latitude, longitude):
+from kp_ayanamsa import sidereal_calc
+from kp_timezones import DEFAULT_ZONE, resolve_zone, utc_offset_hours
+
+def calculate_kp_positions(birth_date, birth_time, latitude, longitude, timezone_name=DEFAULT_ZONE):
     """
     Calculate KP planetary positions using Swiss Ephemeris
     Args:
@@ -12,6 +15,7 @@ def calculate_kp_positions(birth_date, birth_time, latitude, longitude):
         birth_time: Time in HH:MM:SS format
         latitude: Latitude in decimal degrees
         longitude: Longitude in decimal degrees
+        timezone_name: IANA zone of the birth place (historical offsets applied)
     """
     try:
         # Parse birth data
@@ -21,11 +25,12 @@ def calculate_kp_positions(birth_date, birth_time, latitude, longitude):
         minute = int(time_parts[1])
         second = int(time_parts[2]) if len(time_parts) > 2 else 0
         
-        # Create birth datetime in local time (IST)
+        # Create birth datetime in local time
         birth_datetime_local = datetime(year, month, day, hour, minute, second)
         
-        # Convert to UTC (subtract 5.5 hours for IST)
-        birth_datetime_utc = birth_datetime_local - timedelta(hours=5.5)
+        # Convert to UTC using the zone's offset in force at the birth time
+        offset_hours = utc_offset_hours(timezone_name, year, month, day, hour, minute, second)
+        birth_datetime_utc = birth_datetime_local - timedelta(hours=offset_hours)
         
         # Calculate Julian Day Number
         julian_day = swe.julday(
@@ -35,10 +40,6 @@ def calculate_kp_positions(birth_date, birth_time, latitude, longitude):
             birth_datetime_utc.hour + birth_datetime_utc.minute/60.0 + birth_datetime_utc.second/3600.0
         )
         
-        # Set KP ayanamsa (23° 43' 07")
-        kp_ayanamsa = 23.71861111  # 23° 43' 07" in decimal degrees
-        swe.set_sid_mode(swe.SIDM_USER, 0, kp_ayanamsa)
-        
         # Planet definitions
         planets = {
             'Sun': swe.SUN,
@@ -60,12 +61,9 @@ def calculate_kp_positions(birth_date, birth_time, latitude, longitude):
         
         for planet_name, planet_id in planets.items():
             try:
-                # Calculate geocentric position
-                position = swe.calc_ut(julian_day, planet_id, swe.FLG_SWIEPH | swe.FLG_SIDEREAL)
-                tropical_longitude = position[0][0]
-                
-                # Convert to sidereal longitude using KP ayanamsa
-                sidereal_longitude = tropical_longitude
+                # Geocentric sidereal longitude in the KP-Newcomb frame
+                position = sidereal_calc(julian_day, planet_id, swe.FLG_SWIEPH)
+                sidereal_longitude = position[0]
                 
                 # Normalize to 0-360 range
                 while sidereal_longitude < 0:
@@ -118,17 +116,19 @@ def calculate_kp_positions(birth_date, birth_time, latitude, longitude):
 
 def main():
     """Main function to handle command line arguments and output JSON"""
-    if len(sys.argv) != 5:
-        print("Usage: python3 dynamic_swiss_kp.py <birth_date> <birth_time> <latitude> <longitude>", file=sys.stderr)
+    if len(sys.argv) not in (5, 6):
+        print("Usage: python3 dynamic_swiss_kp.py <birth_date> <birth_time> <latitude> <longitude> [timezone]", file=sys.stderr)
         sys.exit(1)
     
     birth_date = sys.argv[1]  # YYYY-MM-DD
     birth_time = sys.argv[2]  # HH:MM:SS
     latitude = float(sys.argv[3])
     longitude = float(sys.argv[4])
+    # Without an explicit zone, use the zone of the nearest known city
+    timezone_name = resolve_zone(sys.argv[5] if len(sys.argv) == 6 else None, latitude, longitude)
     
     # Calculate positions
-    planets = calculate_kp_positions(birth_date, birth_time, latitude, longitude)
+    planets = calculate_kp_positions(birth_date, birth_time, latitude, longitude, timezone_name)
     
     # Output as JSON
     print(json.dumps(planets, indent=2))
@@ -0,0 +1,145 @@
+// Client for the long-lived Python calculation worker (kp_worker.py)
+// One worker process serves every request over newline-delimited JSON, so the server
+// pays interpreter and ephemeris start-up once. The worker is restarted if it exits.
+
+import { spawn } from 'child_process';
+import path from 'path';
+import { fileURLToPath } from 'url';
+
+const __dirname = path.dirname(fileURLToPath(import.meta.url));
+
+const WORKER_SCRIPT = path.join(__dirname, 'kp_worker.py');
+const REQUEST_TIMEOUT_MS = 30000;
+const RESTART_DELAY_MS = 1000;
+
+export class KpWorker {
+  constructor({ args = [], timeoutMs = REQUEST_TIMEOUT_MS } = {}) {
+    this.args = args;
+    this.timeoutMs = timeoutMs;
+    this.process = null;
+    this.nextId = 1;
+    this.pending = new Map();
+    this.buffer = '';
+    this.stopped = false;
+  }
+
+  start() {
+    if (this.process) {
+      return;
+    }
+    this.stopped = false;
+    const child = spawn('python3', [WORKER_SCRIPT, ...this.args], { cwd: __dirname });
+    this.process = child;
+    this.buffer = '';
+
+    child.stdout.setEncoding('utf8');
+    child.stdout.on('data', (data) => this.onData(data));
+    child.stderr.on('data', (data) => {
+      console.error('🐍 Worker:', data.toString().trimEnd());
+    });
+    // Writes to a dead worker fail through the exit handler instead
+    child.stdin.on('error', () => {});
+    child.on('exit', (code, signal) => this.onExit(child, signal || code));
+    child.on('error', (error) => {
+      console.error('❌ Calculation worker error:', error.message);
+      this.onExit(child, error.code);
+    });
+    console.log('🐍 Python calculation worker started');
+  }
+
+  onData(data) {
+    this.buffer += data;
+    let newline;
+    while ((newline = this.buffer.indexOf('\n')) >= 0) {
+      const line = this.buffer.slice(0, newline);
+      this.buffer = this.buffer.slice(newline + 1);
+      if (!line.trim()) {
+        continue;
+      }
+
+      let response;
+      try {
+        response = JSON.parse(line);
+      } catch (error) {
+        console.error('❌ Unparseable worker output:', line);
+        continue;
+      }
+
+      const request = this.pending.get(response.id);
+      if (request) {
+        this.pending.delete(response.id);
+        clearTimeout(request.timer);
+        request.resolve(response);
+      }
+    }
+  }
+
+  onExit(child, reason) {
+    // 'error' and 'exit' can both fire for one process
+    if (this.process !== child) {
+      return;
+    }
+    this.process = null;
+    for (const request of this.pending.values()) {
+      clearTimeout(request.timer);
+      request.reject(new Error(`Calculation worker exited (${reason})`));
+    }
+    this.pending.clear();
+
+    if (!this.stopped) {
+      console.error(`⚠️ Calculation worker exited (${reason}), restarting`);
+      setTimeout(() => this.start(), RESTART_DELAY_MS);
+    }
+  }
+
+  send(message) {
+    this.start();
+    const id = this.nextId++;
+
+    return new Promise((resolve, reject) => {
+      const timer = setTimeout(() => {
+        this.pending.delete(id);
+        reject(new Error('Calculation worker timeout'));
+      }, this.timeoutMs);
+
+      this.pending.set(id, { resolve, reject, timer });
+      this.process.stdin.write(JSON.stringify({ id, ...message }) + '\n');
+    });
+  }
+
+  // Run an entry point (see ENTRY_POINTS in kp_worker.py); resolves to its result
+  async request(entry, input = {}) {
+    const response = await this.send({ entry, input });
+    if (!response.success) {
+      throw new Error(response.error || `Worker entry ${entry} failed`);
+    }
+    return response.result;
+  }
+
+  // Control messages: 'metrics', 'timings', 'ping'
+  async control(command) {
+    const response = await this.send({ control: command });
+    if (!response.success) {
+      throw new Error(response.error || `Worker control ${command} failed`);
+    }
+    return response;
+  }
+
+  stop() {
+    this.stopped = true;
+    if (this.process) {
+      this.process.stdin.end(JSON.stringify({ control: 'shutdown' }) + '\n');
+    }
+  }
+}
+
+let worker = null;
+
+// Process-wide worker, started on first use
+export function getWorker() {
+  if (!worker) {
+    worker = new KpWorker();
+    worker.start();
+  }
+  return worker;
+}
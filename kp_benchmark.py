@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+KP Chart Pipeline Benchmark Suite
+Times every calculation stage over a fixed synthetic corpus and checks for regressions
+against stored JSON baselines
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import resource
+import shutil
+import tempfile
+import subprocess
+from datetime import datetime
+import swisseph as swe
+
+from web_kp_calculator import calculate_chart_for_web, get_planet_house
+from complete_kp_analysis import calculate_complete_kp_chart, calculate_aspects_kp
+from ultimate_kp_system import calculate_vimshottari_dasha
+from kp_vector_houses import house_cusps
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_FILE = os.path.join(BASE_DIR, 'kp_benchmark_baseline.json')
+
+# Fixed corpus definition - changing these invalidates stored baselines
+CORPUS_SEED = 26
+CORPUS_SIZE = 2000
+CLI_RUNS = 10
+
+# Linux: writing 5 to clear_refs resets the peak RSS (VmHWM) to the current RSS
+PROC_STATUS = '/proc/self/status'
+CLEAR_REFS = '/proc/self/clear_refs'
+
+# A stage fails when its per-chart time exceeds the baseline by more than this fraction
+REGRESSION_THRESHOLD = 0.25
+
+def generate_corpus(size=CORPUS_SIZE, seed=CORPUS_SEED):
+    """Generate a reproducible list of synthetic birth records"""
+    rng = random.Random(seed)
+    corpus = []
+
+    for i in range(size):
+        year = rng.randint(1900, 2050)
+        month = rng.randint(1, 12)
+        day = rng.randint(1, 28)
+        hour = rng.randint(0, 23)
+        minute = rng.randint(0, 59)
+        second = rng.randint(0, 59)
+        latitude = round(rng.uniform(-60, 60), 4)
+        longitude = round(rng.uniform(-180, 180), 4)
+
+        corpus.append({
+            'name': f"Synthetic {i + 1}",
+            'year': year, 'month': month, 'day': day,
+            'hour': hour, 'minute': minute, 'second': second,
+            'timezone_offset': round(longitude / 7.5) / 2,  # Nearest half hour
+            'latitude': latitude,
+            'longitude': longitude,
+            'place_name': f"Synthetic Place {i + 1}"
+        })
+
+    return corpus
+
+def to_web_input(record):
+    """Convert a corpus record to the calculate_chart_for_web input format"""
+    return {
+        'name': record['name'],
+        'birthDate': f"{record['year']:04d}-{record['month']:02d}-{record['day']:02d}",
+        'birthTime': f"{record['hour']:02d}:{record['minute']:02d}:{record['second']:02d}",
+        'birthPlace': record['place_name'],
+        'latitude': record['latitude'],
+        'longitude': record['longitude'],
+        'timezoneOffset': record['timezone_offset']
+    }
+
+def peak_rss_kb(who=resource.RUSAGE_SELF):
+    """Peak resident set size in KB (ru_maxrss is bytes on macOS, KB on Linux)"""
+    peak = resource.getrusage(who).ru_maxrss
+    if sys.platform == 'darwin':
+        peak //= 1024
+    return peak
+
+def reset_peak_rss():
+    """Reset this process's peak RSS to its current RSS; False where unsupported"""
+    try:
+        with open(CLEAR_REFS, 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+def stage_peak_rss_kb():
+    """Peak RSS in KB since the last reset_peak_rss (VmHWM)"""
+    with open(PROC_STATUS) as f:
+        for line in f:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1])
+    return None
+
+def time_stage(func, items):
+    """Run func over every item, returning wall and CPU seconds and the stage's peak RSS
+    in KB (None where the peak cannot be reset, as ru_maxrss covers the whole run)"""
+    per_stage = reset_peak_rss()
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+
+    for item in items:
+        func(item)
+
+    wall_seconds, cpu_seconds = time.perf_counter() - wall_start, time.process_time() - cpu_start
+    return wall_seconds, cpu_seconds, stage_peak_rss_kb() if per_stage else None
+
+def summarize(count, wall_seconds, cpu_seconds, rss_kb):
+    """Build the per-stage result record"""
+    return {
+        'count': count,
+        'total_seconds': round(wall_seconds, 6),
+        'per_chart_us': round(wall_seconds / count * 1e6, 3) if count else 0.0,
+        'charts_per_sec_per_core': round(count / cpu_seconds, 1) if cpu_seconds > 0 else 0.0,
+        'peak_rss_kb': rss_kb
+    }
+
+def run_cli_cold_start(runs=CLI_RUNS):
+    """Time full interpreter start-up plus one chart via the command line entry point"""
+    script = os.path.join(BASE_DIR, 'web_kp_calculator.py')
+    payload = json.dumps(to_web_input(generate_corpus(1)[0]))
+    # The entry point serves charts through the chart cache; give the runs a throwaway one
+    cache_dir = tempfile.mkdtemp(prefix='kp_benchmark_')
+    env = dict(os.environ, KP_CACHE_DB=os.path.join(cache_dir, 'cache.db'))
+
+    wall_start = time.perf_counter()
+    cpu_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    for _ in range(runs):
+        subprocess.run([sys.executable, script, payload], check=True, env=env,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    wall_seconds = time.perf_counter() - wall_start
+    cpu_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu_seconds = ((cpu_after.ru_utime - cpu_before.ru_utime) +
+                   (cpu_after.ru_stime - cpu_before.ru_stime))
+    shutil.rmtree(cache_dir, ignore_errors=True)
+
+    return summarize(runs, wall_seconds, cpu_seconds, peak_rss_kb(resource.RUSAGE_CHILDREN))
+
+def run_benchmarks(size=CORPUS_SIZE, cli_runs=CLI_RUNS, stages=None):
+    """Run every selected stage and return the results keyed by stage name"""
+    corpus = generate_corpus(size)
+    web_inputs = [to_web_input(record) for record in corpus]
+    results = {}
+
+    def wanted(stage):
+        return stages is None or stage in stages
+
+    if wanted('calculate_chart_for_web'):
+        wall, cpu, rss = time_stage(calculate_chart_for_web, web_inputs)
+        results['calculate_chart_for_web'] = summarize(len(web_inputs), wall, cpu, rss)
+
+    # The complete charts double as fixtures for the dasha and aspect stages
+    if wanted('calculate_vimshottari_dasha') or wanted('calculate_aspects_kp'):
+        complete_charts = [calculate_complete_kp_chart(record) for record in corpus]
+
+    if wanted('calculate_complete_kp_chart'):
+        wall, cpu, rss = time_stage(calculate_complete_kp_chart, corpus)
+        results['calculate_complete_kp_chart'] = summarize(len(corpus), wall, cpu, rss)
+
+    if wanted('calculate_vimshottari_dasha'):
+        dasha_inputs = [
+            (chart['rasi_chart']['Moon']['longitude'],
+             datetime(record['year'], record['month'], record['day'],
+                      record['hour'], record['minute'], record['second']))
+            for record, chart in zip(corpus, complete_charts)
+            if 'error' not in chart['rasi_chart']['Moon']
+        ]
+        wall, cpu, rss = time_stage(lambda args: calculate_vimshottari_dasha(*args), dasha_inputs)
+        results['calculate_vimshottari_dasha'] = summarize(len(dasha_inputs), wall, cpu, rss)
+
+    if wanted('calculate_aspects_kp'):
+        aspect_inputs = [chart['rasi_chart'] for chart in complete_charts]
+        wall, cpu, rss = time_stage(calculate_aspects_kp, aspect_inputs)
+        results['calculate_aspects_kp'] = summarize(len(aspect_inputs), wall, cpu, rss)
+
+    if wanted('house_placement'):
+        placement_inputs = []
+        for web_input in web_inputs:
+            chart = calculate_chart_for_web(web_input)['chart']
+            if chart and chart['houses'] and 'error' not in chart['houses'][0]:
+                longitudes = [p['longitude'] for p in chart['planetary_positions'] if 'longitude' in p]
+                placement_inputs.append((longitudes, chart['houses']))
+
+        def place_all(args):
+            longitudes, houses_data = args
+            for planet_longitude in longitudes:
+                get_planet_house(planet_longitude, houses_data)
+
+        wall, cpu, rss = time_stage(place_all, placement_inputs)
+        results['house_placement'] = summarize(len(placement_inputs), wall, cpu, rss)
+
+    if wanted('vector_house_cusps'):
+        # The whole corpus as one NumPy call
+        batch = [(
+            [swe.julday(r['year'], r['month'], r['day'],
+                        r['hour'] + r['minute'] / 60 + r['second'] / 3600 - r['timezone_offset'])
+             for r in corpus],
+            [r['latitude'] for r in corpus],
+            [r['longitude'] for r in corpus]
+        )]
+        wall, cpu, rss = time_stage(lambda args: house_cusps(*args), batch)
+        results['vector_house_cusps'] = summarize(len(corpus), wall, cpu, rss)
+
+    if wanted('cli_cold_start') and cli_runs > 0:
+        results['cli_cold_start'] = run_cli_cold_start(cli_runs)
+
+    return results
+
+def load_baseline(path=BASELINE_FILE):
+    """Load stored baseline results, or None when no baseline exists"""
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def machine_info():
+    """Platform, Python version and processor of the current machine"""
+    return {
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'processor': platform.processor() or platform.machine()
+    }
+
+def save_baseline(results, size, path=BASELINE_FILE):
+    """Store results as the new baseline"""
+    baseline = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'corpus': {'seed': CORPUS_SEED, 'size': size},
+        'machine': machine_info(),
+        'stages': results
+    }
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2)
+        f.write('\n')
+
+def compare_to_baseline(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """Return a comparison row per stage; a stage regresses when it is slower than the threshold allows
+
+    Timings only compare on the machine that recorded the baseline, so a different
+    machine is reported on stderr.
+    """
+    comparison = {}
+    if baseline and baseline.get('machine') != machine_info():
+        print(f"Warning: baseline recorded on {json.dumps(baseline.get('machine'))}, "
+              f"running on {json.dumps(machine_info())}; timings may not be comparable", file=sys.stderr)
+
+    for stage, current in results.items():
+        previous = baseline['stages'].get(stage) if baseline else None
+        if not previous or not previous['per_chart_us']:
+            comparison[stage] = {'status': 'no-baseline', 'change': None}
+            continue
+
+        change = current['per_chart_us'] / previous['per_chart_us'] - 1
+        comparison[stage] = {
+            'status': 'regression' if change > threshold else 'ok',
+            'change': round(change, 4),
+            'baseline_per_chart_us': previous['per_chart_us']
+        }
+
+    return comparison
+
+def print_report(results, comparison):
+    """Print a human readable results table"""
+    print("KP CHART PIPELINE BENCHMARK")
+    print("=" * 100)
+    print(f"{'Stage':30} {'Count':>7} {'µs/chart':>12} {'charts/s/core':>14} {'peak RSS KB':>12} {'vs baseline':>16}")
+    print("-" * 100)
+
+    for stage, data in results.items():
+        row = comparison[stage]
+        if row['change'] is None:
+            delta = row['status']
+        else:
+            delta = f"{row['change'] * 100:+.1f}% {row['status']}"
+        rss = '-' if data['peak_rss_kb'] is None else data['peak_rss_kb']
+        print(f"{stage:30} {data['count']:7d} {data['per_chart_us']:12.1f} "
+              f"{data['charts_per_sec_per_core']:14.1f} {rss:>12} {delta:>16}")
+
+def main():
+    """Run the benchmark suite from the command line"""
+    parser = argparse.ArgumentParser(description="Benchmark the KP chart pipeline")
+    parser.add_argument('--size', type=int, default=CORPUS_SIZE, help="number of synthetic birth records")
+    parser.add_argument('--cli-runs', type=int, default=CLI_RUNS, help="cold-start CLI invocations (0 to skip)")
+    parser.add_argument('--stage', action='append', dest='stages', help="run only the named stage (repeatable)")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD, help="allowed slowdown fraction")
+    parser.add_argument('--baseline', default=BASELINE_FILE, help="baseline JSON file")
+    parser.add_argument('--update-baseline', action='store_true', help="store these results as the new baseline")
+    parser.add_argument('--json', action='store_true', help="print results as JSON")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.size, args.cli_runs, args.stages)
+    baseline = load_baseline(args.baseline)
+    comparison = compare_to_baseline(results, baseline, args.threshold)
+
+    if args.json:
+        print(json.dumps({'stages': results, 'comparison': comparison}, indent=2))
+    else:
+        print_report(results, comparison)
+
+    if args.update_baseline:
+        save_baseline(results, args.size, args.baseline)
+        print(f"\nBaseline written to {args.baseline}", file=sys.stderr)
+        return 0
+
+    regressions = [stage for stage, row in comparison.items() if row['status'] == 'regression']
+    if regressions:
+        print(f"\nRegressions: {', '.join(regressions)}", file=sys.stderr)
+        return 1
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Birth-Time Sensitivity
+For a birth time known only to within some minutes, the exact sub-intervals of that
+window over which each cusp and planet keeps its sign, star lord and sub lord, and
+the range of the dasha balance at birth. Positions are sampled only to bracket the
+sub boundaries crossed; each crossing is then solved by regula falsi on the cusp
+(vectorized Placidus) or ephemeris longitude, so a 30-minute window costs a few dozen
+evaluations instead of a chart per second
+"""
+
+import sys
+import json
+import argparse
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import swisseph as swe
+
+from web_kp_calculator import parse_birth_input
+from kp_ayanamsa import kp_ayanamsa, sidereal_calc
+from kp_sub_table import SUB_TABLE, SUB_STARTS, sub_index
+from kp_vector_houses import house_cusps
+from kp_dasha_engine import DAYS_PER_YEAR, DashaSystem, SYSTEMS, get_system
+from kp_metrics import count_ephemeris_calls
+from kp_timezones import UNIX_EPOCH_JD, SECONDS_PER_DAY, get_zone
+
+PLANET_BODIES = {
+    'Sun': swe.SUN, 'Moon': swe.MOON, 'Mercury': swe.MERCURY,
+    'Venus': swe.VENUS, 'Mars': swe.MARS, 'Jupiter': swe.JUPITER,
+    'Saturn': swe.SATURN, 'Rahu': swe.MEAN_NODE
+}
+PLANETS = list(PLANET_BODIES) + ['Ketu']
+MOON = PLANETS.index('Moon')
+
+DEFAULT_MINUTES = 15
+# Sample spacing: short enough that no point turns back across a boundary between two
+# samples; several boundaries crossed between samples are each solved
+CUSP_SAMPLE_DAYS = 10 / 1440
+PLANET_SAMPLE_DAYS = 1 / 24
+SOLVE_ITERATIONS = 60
+SOLVE_TOLERANCE_DEGREES = 1e-7
+
+MOON_SYSTEMS = [name for name, system in SYSTEMS.items() if isinstance(system, DashaSystem)]
+
+def _offset(longitudes, boundaries):
+    return (longitudes - boundaries + 180) % 360 - 180
+
+def planet_longitudes(times, columns):
+    """Sidereal longitudes of PLANETS[columns] at UT Julian days, in the chart's frame"""
+    result = np.empty(len(times))
+    for i, (jd, column) in enumerate(zip(np.asarray(times).tolist(), np.asarray(columns).tolist())):
+        body = PLANET_BODIES['Rahu' if PLANETS[column] == 'Ketu' else PLANETS[column]]
+        result[i] = sidereal_calc(jd, body, 0)[0] + (180 if PLANETS[column] == 'Ketu' else 0)
+    count_ephemeris_calls('calc_ut', len(result))
+    return result % 360
+
+def _cusp_longitudes(latitude, longitude):
+    def cusps(times, columns):
+        """Placidus cusps[columns] (0 for the first house) at UT Julian days"""
+        times = np.asarray(times)
+        table = house_cusps(times, latitude, longitude, 'P', kp_ayanamsa(times))['cusps']
+        return table[np.arange(len(table)), columns]
+    return cusps
+
+def _solve(position, columns, boundaries, lower, upper):
+    """Times in [lower, upper] at which position(t, columns) reaches boundaries, by
+    regula falsi with the Illinois modification"""
+    a, b = lower.astype(np.float64), upper.astype(np.float64)
+    fa = _offset(position(a, columns), boundaries)
+    fb = _offset(position(b, columns), boundaries)
+    for _ in range(SOLVE_ITERATIONS):
+        if not len(b) or np.abs(fb).max() < SOLVE_TOLERANCE_DEGREES:
+            break
+        t = b - fb * (b - a) / (fb - fa)
+        ft = _offset(position(t, columns), boundaries)
+        # The root lies between t and b: b becomes the other end; otherwise halve the
+        # stale end's value so it cannot be kept for ever
+        swap = np.sign(ft) != np.sign(fb)
+        a, fa = np.where(swap, b, a), np.where(swap, fb, fa / 2)
+        b, fb = t, ft
+    return b
+
+def sub_crossings(position, count, jd_start, jd_end, step):
+    """Sub boundary crossings of count moving points over [jd_start, jd_end)
+
+    position(times, columns) gives the sidereal longitude of point columns[i] at
+    times[i]. Returns (times, columns, subs entered), sorted by time, and the sub of
+    each point at jd_start.
+    """
+    samples = np.linspace(jd_start, jd_end, max(int(np.ceil((jd_end - jd_start) / step)), 1) + 1)
+    longitudes = position(np.repeat(samples, count), np.tile(np.arange(count), len(samples)))
+    longitudes = longitudes.reshape(len(samples), count)
+    subs = sub_index(longitudes)
+
+    # Every sub passed between two samples, counted in the direction of motion
+    forward = _offset(longitudes[1:], longitudes[:-1]) >= 0
+    passed = np.where(forward, subs[1:] - subs[:-1], subs[:-1] - subs[1:]) % len(SUB_TABLE)
+    interval, column = np.nonzero(passed)
+    repeats = passed[interval, column]
+    interval, column = np.repeat(interval, repeats), np.repeat(column, repeats)
+    forward = forward[interval, column]
+    steps = np.arange(repeats.sum()) - np.repeat(np.cumsum(repeats) - repeats, repeats) + 1
+    entered = np.where(forward, subs[interval, column] + steps, subs[interval, column] - steps) % len(SUB_TABLE)
+    # Moving forward the boundary is the start of the sub entered, moving back that of the sub left
+    boundaries = SUB_STARTS[np.where(forward, entered, (entered + 1) % len(SUB_TABLE))]
+
+    times = _solve(position, column, boundaries, samples[interval], samples[interval + 1])
+    order = np.argsort(times, kind='stable')
+    return times[order], column[order], entered[order], subs[0]
+
+def _intervals(times, columns, entered, first, column, jd_start, jd_end, local_time):
+    """Constant-sub intervals of one point over the window"""
+    mine = columns == column
+    starts = np.concatenate([[jd_start], times[mine]])
+    ends = np.concatenate([times[mine], [jd_end]])
+    subs = np.concatenate([[first[column]], entered[mine]])
+    result = []
+    for start, end, index in zip(starts.tolist(), ends.tolist(), subs.tolist()):
+        sub = SUB_TABLE[index]
+        result.append({
+            'start': local_time(start),
+            'end': local_time(end),
+            'jd_start': start,
+            'jd_end': end,
+            'minutes': round((end - start) * 1440, 2),
+            'sign': sub.sign,
+            'nakshatra': sub.nakshatra,
+            'star_lord': sub.star_lord,
+            'sub_lord': sub.sub_lord,
+            'sub': sub.number
+        })
+    return result
+
+def _balance(system, jd_ut):
+    """(dasha lord, years left) at birth at a UT Julian day"""
+    moon = float(planet_longitudes([jd_ut], [MOON])[0])
+    lord, _, end = system.start(jd_ut, moon).period_at(jd_ut, 1)[0]
+    return lord, (end - jd_ut) / DAYS_PER_YEAR
+
+def dasha_balance_range(moon_intervals, system='vimshottari', local_time=None):
+    """Birth dasha lord and its balance over the window, one entry per lord
+
+    moon_intervals are the Moon's constant-sub intervals. The balance shrinks as the
+    birth moves later; it is the lord's full years where the Moon has just entered
+    its group and nothing where it is about to leave.
+    """
+    system = get_system(system)
+    if not isinstance(system, DashaSystem):
+        raise ValueError(f"Birth balance needs a Moon-based dasha system, not {system.name}")
+    local_time = local_time or (lambda jd: jd)
+
+    # The lord of each interval, taken at its middle, away from the boundaries
+    runs = []
+    for interval in moon_intervals:
+        lord, _ = _balance(system, (interval['jd_start'] + interval['jd_end']) / 2)
+        if runs and runs[-1][0] == lord:
+            runs[-1][2] = interval['jd_end']
+        else:
+            runs.append([lord, interval['jd_start'], interval['jd_end']])
+
+    result = []
+    for i, (lord, start, end) in enumerate(runs):
+        first = system.years[lord] if i else _balance(system, start)[1]
+        last = 0.0 if i < len(runs) - 1 else _balance(system, end)[1]
+        result.append({
+            'lord': lord,
+            'start': local_time(start),
+            'end': local_time(end),
+            'balance_years': [round(float(first), 6), round(float(last), 6)],
+            'dasha_end': [local_time(start + first * DAYS_PER_YEAR), local_time(end + last * DAYS_PER_YEAR)]
+        })
+    return result
+
+def _birth(input_data):
+    """(UT Julian day, latitude, longitude, local time formatter) of birth data"""
+    birth = parse_birth_input(input_data)
+    decimal_time = birth['hour'] + birth['minute'] / 60 + birth['second'] / 3600
+    jd_ut = swe.julday(birth['year'], birth['month'], birth['day'], decimal_time - birth['timezone_offset'])
+
+    zone = get_zone(birth['timezone']) if birth['timezone'] else timezone(timedelta(hours=birth['timezone_offset']))
+
+    def local_time(jd):
+        """Local time to the nearest second"""
+        instant = datetime.fromtimestamp(round((jd - UNIX_EPOCH_JD) * SECONDS_PER_DAY), tz=timezone.utc)
+        return instant.astimezone(zone).isoformat()
+
+    return jd_ut, birth['latitude'], birth['longitude'], local_time
+
+def birth_time_sensitivity(input_data, minutes=DEFAULT_MINUTES, system='vimshottari'):
+    """Constant sign, star and sub lord intervals of every cusp and planet, and the dasha
+    balance range, for a birth time uncertain by plus or minus minutes
+
+    input_data is birth data in the calculate_chart_for_web format.
+    """
+    try:
+        jd_ut, latitude, longitude, local_time = _birth(input_data)
+    except ValueError as e:
+        return {'success': False, 'error': str(e)}
+    jd_start, jd_end = jd_ut - minutes / 1440, jd_ut + minutes / 1440
+
+    crossings = sub_crossings(_cusp_longitudes(latitude, longitude), 12, jd_start, jd_end, CUSP_SAMPLE_DAYS)
+    cusps = [{'house': house + 1, 'intervals': _intervals(*crossings, house, jd_start, jd_end, local_time)}
+             for house in range(12)]
+
+    crossings = sub_crossings(planet_longitudes, len(PLANETS), jd_start, jd_end, PLANET_SAMPLE_DAYS)
+    planets = {name: _intervals(*crossings, column, jd_start, jd_end, local_time)
+               for column, name in enumerate(PLANETS)}
+
+    return {
+        'success': True,
+        'birth': local_time(jd_ut),
+        'window': {'start': local_time(jd_start), 'end': local_time(jd_end), 'minutes': minutes},
+        'cusps': cusps,
+        'planets': planets,
+        'unchanged': ([f"House {cusp['house']}" for cusp in cusps if len(cusp['intervals']) == 1]
+                      + [name for name, spans in planets.items() if len(spans) == 1]),
+        'dasha_system': system,
+        'dasha_balance': dasha_balance_range(planets['Moon'], system, local_time)
+    }
+
+def main():
+    """Print how a chart's lords change over an uncertain birth time"""
+    parser = argparse.ArgumentParser(description="Birth-time sensitivity of cusp and planet lords")
+    parser.add_argument('input', help="birth data as JSON (calculate_chart_for_web format)")
+    parser.add_argument('--minutes', type=float, default=DEFAULT_MINUTES, help="uncertainty either side")
+    parser.add_argument('--system', choices=MOON_SYSTEMS, default='vimshottari')
+    args = parser.parse_args()
+
+    result = birth_time_sensitivity(json.loads(args.input), args.minutes, args.system)
+    print(json.dumps(result, indent=2))
+    if not result['success']:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Content-Addressed Chart Result Cache
+Stores calculated web charts in a dedicated SQLite file (data/chart_cache.db, not the
+app's local.db), keyed by a canonical hash of the normalized birth inputs plus the
+engine version. Only birth charts are cached: a request marked "cache": false, such as
+a chart of the current moment, is calculated and never stored
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+from web_kp_calculator import ENGINE_VERSION, parse_birth_input, calculate_chart_for_web
+from kp_metrics import count_cache
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# The app database shared with the Node server (DATABASE_URL)
+APP_DB_PATH = os.path.join(BASE_DIR, 'local.db')
+DB_PATH = os.environ.get('KP_CACHE_DB', os.path.join(BASE_DIR, 'data', 'chart_cache.db'))
+MAX_ENTRIES = int(os.environ.get('KP_CACHE_MAX_ENTRIES', '100000'))
+
+# last_access is only rewritten when older than this, so hot keys stay read-only lookups
+TOUCH_INTERVAL = 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chart_cache (
+    key TEXT PRIMARY KEY,
+    engine_version TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS chart_cache_last_access ON chart_cache (last_access);
+"""
+
+def chart_cache_key(input_data, engine_version=ENGINE_VERSION):
+    """SHA-256 of the canonical JSON of normalized inputs and engine version"""
+    normalized = parse_birth_input(input_data)
+    for field in ('latitude', 'longitude', 'timezone_offset', 'ayanamsa'):
+        if isinstance(normalized.get(field), float):
+            normalized[field] = round(normalized[field], 9)
+    canonical = json.dumps({'engine_version': engine_version, 'input': normalized},
+                           sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+class ChartCache:
+    """Bounded LRU cache table in SQLite, opened in WAL mode"""
+
+    def __init__(self, path=DB_PATH, max_entries=MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+        self.entries = self.conn.execute('SELECT COUNT(*) FROM chart_cache').fetchone()[0]
+
+    def get(self, key):
+        """Return the cached payload for key, or None"""
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT payload, last_access FROM chart_cache WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+
+            now = time.time()
+            if now - row[1] > TOUCH_INTERVAL:
+                self.conn.execute('UPDATE chart_cache SET last_access = ? WHERE key = ?', (now, key))
+
+        return json.loads(row[0])
+
+    def put(self, key, payload, engine_version=ENGINE_VERSION):
+        """Store a payload, evicting the least recently used rows past max_entries"""
+        now = time.time()
+        data = json.dumps(payload, ensure_ascii=False, separators=(',', ':'))
+
+        with self.lock:
+            cursor = self.conn.execute(
+                'INSERT OR IGNORE INTO chart_cache (key, engine_version, payload, created_at, last_access) '
+                'VALUES (?, ?, ?, ?, ?)', (key, engine_version, data, now, now))
+            self.entries += cursor.rowcount
+
+            if self.entries > self.max_entries:
+                excess = self.entries - self.max_entries
+                cursor = self.conn.execute(
+                    'DELETE FROM chart_cache WHERE key IN '
+                    '(SELECT key FROM chart_cache ORDER BY last_access LIMIT ?)', (excess,))
+                self.entries -= cursor.rowcount
+
+    def purge_stale(self, engine_version=ENGINE_VERSION):
+        """Delete entries computed by other engine versions"""
+        with self.lock:
+            cursor = self.conn.execute('DELETE FROM chart_cache WHERE engine_version != ?', (engine_version,))
+            self.entries -= cursor.rowcount
+            return cursor.rowcount
+
+    def close(self):
+        self.conn.close()
+
+_cache = None
+
+def get_cache():
+    """Process-wide cache instance, opened on first use"""
+    global _cache
+    if _cache is None:
+        _cache = ChartCache()
+    return _cache
+
+def cached_chart(input_data, cache=None):
+    """calculate_chart_for_web with a cache lookup in front
+
+    Debug and profiling requests bypass the cache so they measure a real calculation;
+    so do requests with "cache": false, whose inputs are never repeated.
+    """
+    if input_data.get('cache') is False or input_data.get('debug_timings') or input_data.get('profile'):
+        return calculate_chart_for_web(input_data)
+
+    cache = cache or get_cache()
+    try:
+        key = chart_cache_key(input_data)
+    except Exception:
+        # Unparseable input: let the calculator report the error
+        return calculate_chart_for_web(input_data)
+
+    result = cache.get(key)
+    count_cache('chart', result is not None)
+
+    if result is None:
+        result = calculate_chart_for_web(input_data)
+        if result['success']:
+            cache.put(key, result)
+        return result
+
+    # Re-apply the fields that personalize a chart without changing the calculation
+    chart = result['chart']
+    chart['name'] = input_data.get('name', 'Unknown')
+    chart['birthDate'] = input_data.get('birthDate', '1990-11-03')
+    chart['birthTime'] = input_data.get('birthTime', '11:31:29')
+    chart['birthPlace'] = input_data.get('birthPlace', 'Tamil Nadu, India')
+    return result
+
+def main():
+    """Cache maintenance from the command line"""
+    if len(sys.argv) < 2 or sys.argv[1] not in ('stats', 'purge-stale', 'clear'):
+        print("Usage: python3 kp_chart_cache.py stats|purge-stale|clear", file=sys.stderr)
+        sys.exit(1)
+
+    cache = get_cache()
+    command = sys.argv[1]
+
+    if command == 'purge-stale':
+        print(json.dumps({'deleted': cache.purge_stale()}))
+    elif command == 'clear':
+        with cache.lock:
+            cache.conn.execute('DELETE FROM chart_cache')
+            cache.entries = 0
+        print(json.dumps({'deleted': 'all'}))
+    else:
+        versions = cache.conn.execute(
+            'SELECT engine_version, COUNT(*) FROM chart_cache GROUP BY engine_version').fetchall()
+        print(json.dumps({
+            'path': cache.path,
+            'entries': cache.entries,
+            'max_entries': cache.max_entries,
+            'engine_versions': dict(versions)
+        }, indent=2))
+
+if __name__ == "__main__":
+    main()
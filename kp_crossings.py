@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Boundary Crossing Catalogs
+Times at which a steadily increasing angle (Moon longitude, Moon-Sun elongation,
+Sun+Moon sum) crosses each multiple of a step, found by coarse sampling and Newton
+refinement on the ephemeris speed instead of polling minute by minute. A catalog
+answers "which division is in force at t, and when does it end" by bisection
+"""
+
+import json
+import argparse
+
+import numpy as np
+import swisseph as swe
+
+from kp_ayanamsa import sidereal_calc
+from kp_metrics import count_ephemeris_calls
+
+# Sampling must be fine enough that no division is skipped between two samples: the
+# Moon (up to ~15.4 deg/day) needs 0.8 day for a 13 deg 20' nakshatra
+SAMPLE_DAYS = 0.25
+REFINE_ITERATIONS = 8
+REFINE_TOLERANCE_DAYS = 1e-7
+
+def _sun_moon(jd_ut):
+    """KP sidereal (longitude, speed) of the Sun and the Moon"""
+    sun = sidereal_calc(jd_ut, swe.SUN)
+    moon = sidereal_calc(jd_ut, swe.MOON)
+    count_ephemeris_calls('calc_ut', 2)
+    return sun[0], sun[3], moon[0], moon[3]
+
+def lunar_elongation(jd_ut):
+    """Moon minus Sun (drives tithi and karana) and its daily rate"""
+    sun, sun_speed, moon, moon_speed = _sun_moon(jd_ut)
+    return (moon - sun) % 360, moon_speed - sun_speed
+
+def moon_longitude(jd_ut):
+    """Sidereal Moon longitude (drives nakshatra) and its daily rate"""
+    moon = sidereal_calc(jd_ut, swe.MOON)
+    count_ephemeris_calls('calc_ut')
+    return moon[0], moon[3]
+
+def sun_longitude(jd_ut):
+    """Sidereal Sun longitude (drives solar ingresses) and its daily rate"""
+    sun = sidereal_calc(jd_ut, swe.SUN)
+    count_ephemeris_calls('calc_ut')
+    return sun[0], sun[3]
+
+def yoga_angle(jd_ut):
+    """Sidereal Sun plus sidereal Moon (drives yoga) and its daily rate"""
+    sun, sun_speed, moon, moon_speed = _sun_moon(jd_ut)
+    return (sun + moon) % 360, sun_speed + moon_speed
+
+class BoundaryCatalog:
+    """Crossing times of an angle over multiples of step, with the division entered"""
+
+    def __init__(self, times, entered, first, step):
+        self.times = np.asarray(times, dtype=np.float64)
+        self.entered = np.asarray(entered, dtype=np.int16)
+        self.first = int(first)
+        self.step = step
+
+    def index_at(self, jd_ut):
+        """Division in force at UT Julian day(s) (vectorized)"""
+        position = np.searchsorted(self.times, jd_ut, side='right')
+        divisions = np.concatenate([[self.first], self.entered])
+        return divisions[position]
+
+    def end_after(self, jd_ut, skip=0):
+        """End of the division in force at jd_ut, or of the skip-th one after it (vectorized)
+
+        NaN past the end of the catalog.
+        """
+        position = np.searchsorted(self.times, jd_ut, side='right') + skip
+        padded = np.concatenate([self.times, [np.nan] * (skip + 1)])
+        return padded[position]
+
+    def spans(self, jd_start, jd_end):
+        """[(division, start, end)] of every division in force during [jd_start, jd_end)"""
+        first = int(np.searchsorted(self.times, jd_start, side='right'))
+        last = int(np.searchsorted(self.times, jd_end, side='left'))
+        starts = [jd_start] + self.times[first:last].tolist()
+        ends = self.times[first:last].tolist() + [float(self.end_after(jd_end - 1e-9))]
+        divisions = [int(self.index_at(jd_start))] + self.entered[first:last].tolist()
+        return list(zip(divisions, starts, ends))
+
+def angle_crossings(angle_rate, jd_start, jd_end, step, sample_days=SAMPLE_DAYS):
+    """Catalog of the times in [jd_start, jd_end) at which angle_rate's angle crosses a
+    multiple of step
+
+    angle_rate(jd) returns (angle in degrees, rate in degrees/day); the angle
+    must only increase, as the Moon, the elongation and the Sun+Moon sum do.
+    """
+    divisions = int(round(360 / step))
+    sample_jds = np.arange(jd_start, jd_end + sample_days, sample_days)
+    angles, rates = np.array([angle_rate(jd) for jd in sample_jds]).T
+    unwrapped = angles[0] + np.concatenate([[0], np.cumsum((np.diff(angles)) % 360)])
+
+    # Every multiple of step passed between consecutive samples, first guess by interpolation
+    first_boundary = np.floor(unwrapped[:-1] / step) + 1
+    last_boundary = np.floor(unwrapped[1:] / step)
+    counts = (last_boundary - first_boundary + 1).astype(int)
+    interval = np.repeat(np.arange(len(counts)), counts)
+    boundaries = (np.repeat(first_boundary, counts)
+                  + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)) * step
+    fraction = (boundaries - unwrapped[interval]) / (unwrapped[interval + 1] - unwrapped[interval])
+    guesses = sample_jds[interval] + fraction * sample_days
+
+    times = []
+    for guess, boundary in zip(guesses, boundaries):
+        for _ in range(REFINE_ITERATIONS):
+            angle, rate = angle_rate(guess)
+            correction = ((boundary - angle + 180) % 360 - 180) / rate
+            guess += correction
+            if abs(correction) < REFINE_TOLERANCE_DAYS:
+                break
+        times.append(guess)
+
+    times = np.array(times)
+    entered = (np.round(boundaries / step).astype(int)) % divisions
+    inside = (times >= jd_start) & (times < jd_end)
+    first = int(angles[0] // step) % divisions
+    return BoundaryCatalog(times[inside], entered[inside], first, step)
+
+# Panchang divisions: (angle function, step in degrees)
+TITHI = (lunar_elongation, 12.0)
+KARANA = (lunar_elongation, 6.0)
+NAKSHATRA = (moon_longitude, 360 / 27)
+YOGA = (yoga_angle, 360 / 27)
+
+def main():
+    """Print a crossing catalog for a range of Julian days"""
+    kinds = {'tithi': TITHI, 'karana': KARANA, 'nakshatra': NAKSHATRA, 'yoga': YOGA}
+    parser = argparse.ArgumentParser(description="Boundary crossing catalog")
+    parser.add_argument('kind', choices=sorted(kinds))
+    parser.add_argument('jd_start', type=float)
+    parser.add_argument('jd_end', type=float)
+    args = parser.parse_args()
+
+    angle_rate, step = kinds[args.kind]
+    catalog = angle_crossings(angle_rate, args.jd_start, args.jd_end, step)
+    print(json.dumps({'first': catalog.first,
+                      'crossings': [{'jd_ut': t, 'entered': int(e)}
+                                    for t, e in zip(catalog.times.tolist(), catalog.entered)]}, indent=2))
+
+if __name__ == "__main__":
+    main()
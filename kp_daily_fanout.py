@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Daily Horoscope Fan-Out
+Daily content depends only on the day's transits and a few natal keys, so it is
+computed once per bucket of ascendant sign x Moon nakshatra x Moon pada (12 x 27 x 4)
+and handed to users by a dict lookup on the bucket stored for each of them in an
+indexed table, instead of calculating every user's chart
+"""
+
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import threading
+from datetime import date
+
+from web_kp_calculator import SIGNS, NAKSHATRAS, STAR_LORDS
+from complete_kp_analysis import get_house_significance
+from kp_chart_cache import APP_DB_PATH, cached_chart
+from kp_ephemeris_cache import planet_positions
+from kp_timezones import UNIX_EPOCH_JD
+
+NAKSHATRA_SPAN = 360 / 27
+PADA_SPAN = NAKSHATRA_SPAN / 4
+BUCKET_COUNT = 12 * 27 * 4
+
+# Transits for a day's content are taken at 12:00 UT
+DAY_POSITION_HOUR = 12
+
+TARAS = ['Janma', 'Sampat', 'Vipat', 'Kshema', 'Pratyak', 'Sadhana', 'Naidhana', 'Mitra', 'Parama Mitra']
+FAVOURABLE_TARAS = {'Sampat', 'Kshema', 'Sadhana', 'Mitra', 'Parama Mitra'}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS natal_keys (
+    user_id TEXT PRIMARY KEY,
+    bucket INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS natal_keys_bucket ON natal_keys (bucket);
+"""
+
+def bucket_of(ascendant_longitude, moon_longitude):
+    """Bucket number from the sidereal ascendant and Moon longitudes"""
+    pada = int((moon_longitude % 360) // PADA_SPAN)  # 0-107: nakshatra * 4 + pada
+    return int((ascendant_longitude % 360) // 30) * 108 + pada
+
+def bucket_fields(bucket):
+    """(ascendant sign, Moon nakshatra, Moon pada) indexes of a bucket, pada 1-4"""
+    ascendant_sign, pada = divmod(bucket, 108)
+    return ascendant_sign, pada // 4, pada % 4 + 1
+
+def natal_bucket(chart):
+    """Bucket of a calculate_chart_for_web chart"""
+    moon = next(p for p in chart['planetary_positions'] if p['planet'] == 'Moon')
+    return bucket_of(chart['special_points']['ascendant']['longitude'], moon['longitude'])
+
+class NatalKeyIndex:
+    """Users' natal buckets in SQLite, indexed by bucket"""
+
+    def __init__(self, path=APP_DB_PATH):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript(SCHEMA)
+
+    def put(self, user_id, bucket):
+        """Store or replace a user's bucket"""
+        self.put_many([(user_id, bucket)])
+
+    def put_many(self, rows):
+        """Store (user_id, bucket) pairs in one transaction"""
+        now = time.time()
+        with self.lock:
+            self.conn.execute('BEGIN')
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO natal_keys (user_id, bucket, updated_at) VALUES (?, ?, ?)',
+                [(str(user_id), int(bucket), now) for user_id, bucket in rows])
+            self.conn.execute('COMMIT')
+
+    def remove(self, user_id):
+        with self.lock:
+            self.conn.execute('DELETE FROM natal_keys WHERE user_id = ?', (str(user_id),))
+
+    def occupied_buckets(self):
+        """Buckets that have at least one user"""
+        with self.lock:
+            return [row[0] for row in self.conn.execute('SELECT DISTINCT bucket FROM natal_keys ORDER BY bucket')]
+
+    def join(self, contents):
+        """(user_id, content) for every user: rows are read in bucket order and each
+        bucket's content looked up in contents"""
+        with self.lock:
+            rows = self.conn.execute('SELECT user_id, bucket FROM natal_keys ORDER BY bucket').fetchall()
+        for user_id, bucket in rows:
+            yield user_id, contents[bucket]
+
+    def close(self):
+        self.conn.close()
+
+def day_transits(day):
+    """Sidereal transit positions used for a day's content"""
+    day = day if isinstance(day, date) else date.fromisoformat(day)
+    jd_ut = UNIX_EPOCH_JD + (day - date(1970, 1, 1)).days + DAY_POSITION_HOUR / 24
+    return {name: position['longitude'] for name, position in planet_positions(jd_ut).items()}
+
+def _ordinal(number):
+    return f"{number}{'th' if 10 <= number % 100 <= 20 else {1: 'st', 2: 'nd', 3: 'rd'}.get(number % 10, 'th')}"
+
+def bucket_content(bucket, transits):
+    """Daily content for one bucket from the day's transits"""
+    ascendant_sign, nakshatra, pada = bucket_fields(bucket)
+    moon_sign = int((nakshatra * NAKSHATRA_SPAN + (pada - 1) * PADA_SPAN) // 30)
+
+    transit_moon_nakshatra = int(transits['Moon'] // NAKSHATRA_SPAN)
+    tara = TARAS[(transit_moon_nakshatra - nakshatra) % 27 % 9]
+    chandrashtama = int(transits['Moon'] // 30) == (moon_sign + 7) % 12
+
+    transit_houses = {}
+    for planet, longitude in transits.items():
+        sign = int(longitude // 30)
+        transit_houses[planet] = {
+            'sign': SIGNS[sign],
+            'from_moon': (sign - moon_sign) % 12 + 1,
+            'from_ascendant': (sign - ascendant_sign) % 12 + 1
+        }
+
+    moon_house = transit_houses['Moon']['from_ascendant']
+    highlights = [
+        f"Moon in {NAKSHATRAS[transit_moon_nakshatra]}: {tara} tara, "
+        f"{'a favourable' if tara in FAVOURABLE_TARAS else 'a cautious'} day for new beginnings.",
+        f"Moon transits your {_ordinal(moon_house)} house: {get_house_significance(moon_house)}."
+    ]
+    if chandrashtama:
+        highlights.append("Chandrashtama: the Moon is 8th from your Moon sign; postpone important decisions.")
+    for planet in ('Jupiter', 'Saturn'):
+        house = transit_houses[planet]['from_moon']
+        highlights.append(f"{planet} in the {_ordinal(house)} from your Moon: {get_house_significance(house)}.")
+
+    return {
+        'bucket': bucket,
+        'ascendant_sign': SIGNS[ascendant_sign],
+        'moon_sign': SIGNS[moon_sign],
+        'moon_nakshatra': NAKSHATRAS[nakshatra],
+        'moon_nakshatra_lord': STAR_LORDS[nakshatra],
+        'moon_pada': pada,
+        'tara': {'name': tara, 'favourable': tara in FAVOURABLE_TARAS},
+        'chandrashtama': chandrashtama,
+        'transit_houses': transit_houses,
+        'highlights': highlights
+    }
+
+def daily_bucket_contents(day, buckets=range(BUCKET_COUNT)):
+    """Content of each requested bucket, all from one set of transits"""
+    transits = day_transits(day)
+    return {bucket: bucket_content(bucket, transits) for bucket in buckets}
+
+def fan_out(day, index):
+    """(user_id, content) for every indexed user; only occupied buckets are computed"""
+    contents = daily_bucket_contents(day, index.occupied_buckets())
+    return index.join(contents)
+
+def main():
+    """Register users' natal keys or write a day's fan-out as NDJSON"""
+    parser = argparse.ArgumentParser(description="Daily horoscope content joined to users by natal bucket")
+    commands = parser.add_subparsers(dest='command', required=True)
+    add = commands.add_parser('add', help="store a user's natal bucket")
+    add.add_argument('user_id')
+    add.add_argument('input', help="birth data as JSON (calculate_chart_for_web format)")
+    run = commands.add_parser('run', help="print every user's content for a day")
+    run.add_argument('--date', default=date.today().isoformat())
+    parser.add_argument('--db', default=APP_DB_PATH)
+    args = parser.parse_args()
+
+    index = NatalKeyIndex(args.db)
+    try:
+        if args.command == 'add':
+            result = cached_chart(json.loads(args.input))
+            if not result['success']:
+                print(json.dumps({'error': result['error']}))
+                sys.exit(1)
+            bucket = natal_bucket(result['chart'])
+            index.put(args.user_id, bucket)
+            print(json.dumps({'user_id': args.user_id, 'bucket': bucket}))
+        else:
+            for user_id, content in fan_out(args.date, index):
+                print(json.dumps({'user_id': user_id, 'date': args.date, 'content': content}))
+    finally:
+        index.close()
+
+if __name__ == "__main__":
+    main()
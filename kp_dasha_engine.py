@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Dasha Engine
+Table-driven dasha systems. A system is compiled to arrays: its lords and their
+years, the rule that picks the lord running at birth and its elapsed part, and each
+lord's sub-period order and proportions. One nested-period expansion and one point
+query serve every system, so a new system is a new table, not new traversal code
+"""
+
+import sys
+import json
+import argparse
+from datetime import date
+
+import numpy as np
+
+from kp_sub_table import SIGNS, VIMSHOTTARI_ORDER, VIMSHOTTARI_YEARS
+from kp_timezones import UNIX_EPOCH_JD, jd_to_local
+
+DAYS_PER_YEAR = 365.25
+NAKSHATRA_SPAN = 360 / 27
+DEFAULT_DEPTH = 3
+LEVEL_NAMES = ['dasha', 'bhukti', 'antara', 'pratyantara', 'sookshma']
+
+SIGN_LORDS = ['Mars', 'Venus', 'Mercury', 'Moon', 'Sun', 'Mercury',
+              'Venus', 'Mars', 'Jupiter', 'Saturn', 'Saturn', 'Jupiter']
+
+class Dasha:
+    """One native's periods under one system"""
+
+    def __init__(self, system, years, order, elapsed, birth_jd, sub_orders, sub_fractions):
+        self.system = system
+        self.lords = system.lords
+        self.birth_jd = birth_jd
+        self.order = np.asarray(order)  # lords of one cycle of dashas, the birth dasha first
+        self.sub_orders = np.asarray(sub_orders)
+        self.sub_fractions = np.asarray(sub_fractions, dtype=np.float64)
+        self.sub_offsets = np.cumsum(self.sub_fractions, axis=1) - self.sub_fractions
+        self.lengths = np.asarray(years, dtype=np.float64)[self.order] * DAYS_PER_YEAR
+        self.offsets = np.concatenate([[0], np.cumsum(self.lengths)[:-1]])
+        self.cycle_days = self.lengths.sum()
+        self.cycle_start = birth_jd - elapsed * self.lengths[0]
+
+    def expand(self, depth, jd_start, jd_end):
+        """(starts, ends, lords) of the periods at a depth overlapping [jd_start, jd_end)
+
+        lords is an (n, depth) array of indexes into the system's lords, from the dasha
+        down. Only periods overlapping the window are subdivided; the first and last
+        keep their full extent.
+        """
+        cycles = np.arange(int((jd_start - self.cycle_start) // self.cycle_days),
+                           int((jd_end - self.cycle_start) // self.cycle_days) + 1)
+        starts = (self.cycle_start + cycles[:, None] * self.cycle_days + self.offsets).ravel()
+        lengths = np.tile(self.lengths, len(cycles))
+        lords = np.tile(self.order, len(cycles))[:, None]
+        for level in range(depth):
+            if level:
+                parents = lords[:, -1]
+                starts = (starts[:, None] + lengths[:, None] * self.sub_offsets[parents]).ravel()
+                lengths = (lengths[:, None] * self.sub_fractions[parents]).ravel()
+                lords = np.concatenate([np.repeat(lords, self.sub_orders.shape[1], axis=0),
+                                        self.sub_orders[parents].reshape(-1, 1)], axis=1)
+            keep = (starts + lengths > jd_start) & (starts < jd_end)
+            starts, lengths, lords = starts[keep], lengths[keep], lords[keep]
+        return starts, starts + lengths, lords
+
+    def period_at(self, jd_ut, depth=DEFAULT_DEPTH):
+        """[(lord, start, end)] of the periods running at a UT Julian day, dasha first"""
+        cycle, position = divmod(jd_ut - self.cycle_start, self.cycle_days)
+        k = min(max(int(np.searchsorted(self.offsets, position, side='right')) - 1, 0), len(self.order) - 1)
+        lord = int(self.order[k])
+        start = self.cycle_start + cycle * self.cycle_days + self.offsets[k]
+        length = self.lengths[k]
+        result = [(self.lords[lord], start, start + length)]
+        for _ in range(depth - 1):
+            offsets = self.sub_offsets[lord]
+            j = min(max(int(np.searchsorted(offsets, (jd_ut - start) / length, side='right')) - 1, 0),
+                    len(offsets) - 1)
+            start, length = start + length * offsets[j], length * self.sub_fractions[lord, j]
+            lord = int(self.sub_orders[lord, j])
+            result.append((self.lords[lord], start, start + length))
+        return result
+
+    def periods(self, depth=1, jd_start=None, jd_end=None):
+        """Periods at a depth overlapping a window, by default birth to one full cycle later,
+        in time order; the first starts no earlier than the window"""
+        jd_start = self.birth_jd if jd_start is None else jd_start
+        jd_end = jd_start + self.cycle_days if jd_end is None else jd_end
+        starts, ends, lords = self.expand(depth, jd_start, jd_end)
+        for start, end, row in zip(starts.tolist(), ends.tolist(), lords.tolist()):
+            yield {'lords': [self.lords[lord] for lord in row], 'start': max(start, jd_start), 'end': end}
+
+class DashaSystem:
+    """A nakshatra-based dasha system
+
+    The Moon's longitude picks the group of nakshatras it is in; the group's lord runs
+    at birth, for the part of its years that the Moon has not yet crossed in the
+    group. Dashas follow in the order of lords, and every period divides among all
+    lords in the same order, starting from its own, in proportion to their years.
+    """
+
+    def __init__(self, name, lords, years, groups):
+        """groups: (first nakshatra index, nakshatra count, lord) covering the zodiac"""
+        self.name = name
+        self.lords = tuple(lords)
+        self.years = dict(zip(lords, years))
+        self.year_array = np.array(years, dtype=np.float64)
+        self.group_starts = np.array([first * NAKSHATRA_SPAN for first, _, _ in groups])
+        self.group_spans = np.array([count * NAKSHATRA_SPAN for _, count, _ in groups])
+        self.group_lords = np.array([self.lords.index(lord) for _, _, lord in groups])
+        count = len(self.lords)
+        self.sub_orders = (np.arange(count)[:, None] + np.arange(count)) % count
+        self.sub_fractions = self.year_array[self.sub_orders] / self.year_array.sum()
+
+    def start(self, birth_jd, moon_longitude, chart=None):
+        """Periods of a native from the Moon's sidereal longitude at birth"""
+        travelled = (moon_longitude - self.group_starts) % 360
+        group = int(np.argmax(travelled < self.group_spans))
+        first = self.group_lords[group]
+        order = (first + np.arange(len(self.lords))) % len(self.lords)
+        return Dasha(self, self.year_array, order, travelled[group] / self.group_spans[group], birth_jd,
+                     self.sub_orders, self.sub_fractions)
+
+class CharaDashaSystem:
+    """Jaimini Chara dasha: sign periods from the ascendant sign
+
+    Dashas run from the ascendant sign, forward if the 9th sign from it is one of
+    Aries, Taurus, Gemini, Libra, Scorpio and Sagittarius and backward otherwise. A
+    sign's years are the count from it to its lord's sign (forward from those six
+    signs, backward from the rest), less one, or 12 when the lord is in the sign.
+    Each dasha divides into twelve equal bhuktis starting from the next sign in the
+    sign's own direction. Scorpio and Aquarius take Mars and Saturn as their lords,
+    and later cycles repeat the first.
+    """
+
+    FORWARD_SIGNS = {0, 1, 2, 6, 7, 8}
+
+    def __init__(self, name='chara'):
+        self.name = name
+        self.lords = tuple(SIGNS)
+        directions = np.array([1 if sign in self.FORWARD_SIGNS else -1 for sign in range(12)])
+        self.directions = directions
+        self.sub_orders = (np.arange(12)[:, None] + directions[:, None] * np.arange(1, 13)) % 12
+        self.sub_fractions = np.full((12, 12), 1 / 12)
+
+    def start(self, birth_jd, moon_longitude=None, chart=None):
+        """Periods of a native from a calculate_chart_for_web chart"""
+        if chart is None:
+            raise ValueError("Chara dasha needs the chart, not only the Moon")
+        ascendant = int(chart['special_points']['ascendant']['longitude'] % 360 // 30)
+        planet_signs = {p['planet']: int(p['longitude'] % 360 // 30)
+                        for p in chart['planetary_positions'] if 'longitude' in p}
+        years = []
+        for sign in range(12):
+            distance = (planet_signs[SIGN_LORDS[sign]] - sign) * self.directions[sign] % 12
+            years.append(distance or 12)
+        direction = 1 if (ascendant + 8) % 12 in self.FORWARD_SIGNS else -1
+        order = (ascendant + direction * np.arange(12)) % 12
+        return Dasha(self, years, order, 0.0, birth_jd, self.sub_orders, self.sub_fractions)
+
+VIMSHOTTARI = DashaSystem('vimshottari', VIMSHOTTARI_ORDER,
+                          [VIMSHOTTARI_YEARS[lord] for lord in VIMSHOTTARI_ORDER],
+                          [(n, 1, VIMSHOTTARI_ORDER[n % 9]) for n in range(27)])
+
+YOGINIS = ['Mangala', 'Pingala', 'Dhanya', 'Bhramari', 'Bhadrika', 'Ulka', 'Siddha', 'Sankata']
+YOGINI_PLANETS = dict(zip(YOGINIS, ['Moon', 'Sun', 'Jupiter', 'Mars', 'Mercury', 'Saturn', 'Venus', 'Rahu']))
+# Nakshatra number plus 3, modulo 8, is the yogini running at birth
+YOGINI = DashaSystem('yogini', YOGINIS, range(1, 9), [(n, 1, YOGINIS[(n + 3) % 8]) for n in range(27)])
+
+# Ashtottari groups from Ardra; Abhijit falls inside Saturn's group, which therefore
+# spans three nakshatras of longitude
+ASHTOTTARI_LORDS = ['Sun', 'Moon', 'Mars', 'Mercury', 'Saturn', 'Jupiter', 'Rahu', 'Venus']
+ASHTOTTARI_GROUP_SIZES = [4, 3, 4, 3, 3, 3, 4, 3]
+ASHTOTTARI = DashaSystem('ashtottari', ASHTOTTARI_LORDS, [6, 15, 8, 17, 10, 19, 12, 21],
+                         [(5 + sum(ASHTOTTARI_GROUP_SIZES[:i]), size, lord)
+                          for i, (size, lord) in enumerate(zip(ASHTOTTARI_GROUP_SIZES, ASHTOTTARI_LORDS))])
+
+CHARA = CharaDashaSystem()
+
+SYSTEMS = {system.name: system for system in (VIMSHOTTARI, YOGINI, ASHTOTTARI, CHARA)}
+
+def get_system(name):
+    if name not in SYSTEMS:
+        raise ValueError(f"Unknown dasha system: {name}")
+    return SYSTEMS[name]
+
+def dasha_from_moon(moon_longitude, birth_jd, system='vimshottari'):
+    """Periods from the Moon's sidereal longitude and the UT Julian day of birth"""
+    return get_system(system).start(birth_jd, moon_longitude)
+
+def dasha_for_chart(chart, system='vimshottari'):
+    """Periods of a calculate_chart_for_web chart"""
+    moon = next(p for p in chart['planetary_positions'] if p.get('planet') == 'Moon')
+    return get_system(system).start(chart['technical_info']['julian_day'], moon['longitude'], chart)
+
+def _date(jd_ut):
+    return jd_to_local('UTC', jd_ut).date().isoformat()
+
+def main():
+    """Print a chart's periods under a dasha system"""
+    from kp_chart_cache import cached_chart
+
+    parser = argparse.ArgumentParser(description="Dasha periods under any compiled system")
+    parser.add_argument('input', help="birth data as JSON (calculate_chart_for_web format)")
+    parser.add_argument('--system', choices=sorted(SYSTEMS), default='vimshottari')
+    parser.add_argument('--depth', type=int, default=1, choices=range(1, len(LEVEL_NAMES) + 1))
+    parser.add_argument('--at', help="print the periods running on this date (YYYY-MM-DD) instead")
+    args = parser.parse_args()
+
+    result = cached_chart(json.loads(args.input))
+    if not result['success']:
+        print(json.dumps({'error': result['error']}))
+        sys.exit(1)
+    dasha = dasha_for_chart(result['chart'], args.system)
+
+    if args.at:
+        jd_ut = UNIX_EPOCH_JD + (date.fromisoformat(args.at) - date(1970, 1, 1)).days
+        output = [{'level': LEVEL_NAMES[level], 'lord': lord, 'start': _date(start), 'end': _date(end)}
+                  for level, (lord, start, end) in enumerate(dasha.period_at(jd_ut, args.depth))]
+    else:
+        output = [{'lords': period['lords'], 'start': _date(period['start']), 'end': _date(period['end'])}
+                  for period in dasha.periods(args.depth)]
+    print(json.dumps({'system': args.system, 'periods': output}, indent=2))
+
+if __name__ == "__main__":
+    main()
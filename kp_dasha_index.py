@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Dasha Period Index
+Every user's Vimshottari dasha and bhukti periods stored once as interval rows in
+a dedicated SQLite file (data/dasha_index.db, not the app's local.db), indexed by
+(period key, start). A dasha or dasha/bhukti pair never lasts longer than a fixed
+span, so the periods containing a date are those starting within that span before
+it: "users in Saturn dasha / Venus bhukti on a date" and "users whose Jupiter bhukti
+starts this month" are both index range scans, instead of running
+calculate_vimshottari_dasha for every user per query. A user's rows are only
+rewritten when their Moon longitude or birth time changes
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import threading
+from datetime import date
+
+from ultimate_kp_system import DASHA_SEQUENCE
+from kp_event_timing import LORD_INDEX, LORD_YEARS, CYCLE_YEARS, DAYS_PER_YEAR, dasha_periods
+from kp_chart_cache import BASE_DIR, cached_chart
+from kp_timezones import UNIX_EPOCH_JD, jd_to_local
+
+DB_PATH = os.environ.get('KP_DASHA_DB', os.path.join(BASE_DIR, 'data', 'dasha_index.db'))
+
+LEVELS = ['dasha', 'bhukti']
+INDEX_YEARS = 120
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS dasha_users (
+    user_id TEXT PRIMARY KEY,
+    moon_longitude REAL NOT NULL,
+    birth_jd REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS dasha_periods (
+    user_id TEXT NOT NULL,
+    period_key INTEGER NOT NULL,
+    start_jd REAL NOT NULL,
+    end_jd REAL NOT NULL
+);
+"""
+
+INDEXES = """
+CREATE INDEX IF NOT EXISTS dasha_periods_user ON dasha_periods (user_id);
+CREATE INDEX IF NOT EXISTS dasha_periods_start ON dasha_periods (period_key, start_jd);
+"""
+
+def period_key(dasha_lord, bhukti_lord=None):
+    """Key of a dasha (0-8) or of a dasha/bhukti pair (9-89)"""
+    if bhukti_lord is None:
+        return dasha_lord
+    return 9 + dasha_lord * 9 + bhukti_lord
+
+def key_lords(key):
+    """(level name, dasha lord, lord) of a period key"""
+    if key < 9:
+        return LEVELS[0], DASHA_SEQUENCE[key], DASHA_SEQUENCE[key]
+    dasha_lord, lord = divmod(key - 9, 9)
+    return LEVELS[1], DASHA_SEQUENCE[dasha_lord], DASHA_SEQUENCE[lord]
+
+# Longest possible period per key, in days
+MAX_SPANS = ([LORD_YEARS[lord] * DAYS_PER_YEAR for lord in range(9)]
+             + [LORD_YEARS[dasha_lord] * LORD_YEARS[lord] / CYCLE_YEARS * DAYS_PER_YEAR
+                for dasha_lord in range(9) for lord in range(9)])
+
+def _lord(name):
+    if name not in LORD_INDEX:
+        raise ValueError(f"Unknown dasha lord: {name}")
+    return LORD_INDEX[name]
+
+def _jd(value):
+    """UT Julian day of a date (0h UT), 'YYYY-MM-DD' or a Julian day number"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    day = value if isinstance(value, date) else date.fromisoformat(value)
+    return UNIX_EPOCH_JD + (day - date(1970, 1, 1)).days
+
+def user_periods(moon_longitude, birth_jd, years=INDEX_YEARS):
+    """(period key, start, end) rows of a user's dasha and bhukti periods"""
+    starts, ends, lords = dasha_periods(moon_longitude, birth_jd, years, depth=1)
+    rows = list(zip(lords[:, 0].tolist(), starts.tolist(), ends.tolist()))
+    starts, ends, lords = dasha_periods(moon_longitude, birth_jd, years, depth=2)
+    return rows + list(zip((9 + lords[:, 0] * 9 + lords[:, 1]).tolist(), starts.tolist(), ends.tolist()))
+
+class DashaIndex:
+    """Users' dasha and bhukti periods in SQLite, indexed by period key and start"""
+
+    def __init__(self, path=DB_PATH, years=INDEX_YEARS):
+        self.years = years
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA + INDEXES)
+
+    def _delete(self, user_id):
+        self.conn.execute('DELETE FROM dasha_periods WHERE user_id = ?', (user_id,))
+
+    def put_many(self, users):
+        """Store (user_id, moon_longitude, birth_jd) triples in one transaction
+
+        Users whose stored inputs are unchanged are skipped. Returns how many users
+        had their periods rewritten.
+        """
+        now = time.time()
+        written = 0
+        with self.lock:
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                periods = []
+                for user_id, moon_longitude, birth_jd in users:
+                    user_id = str(user_id)
+                    stored = self.conn.execute('SELECT moon_longitude, birth_jd FROM dasha_users WHERE user_id = ?',
+                                               (user_id,)).fetchone()
+                    if stored == (moon_longitude, birth_jd):
+                        continue
+                    if stored is not None:
+                        self._delete(user_id)
+                    self.conn.execute('INSERT OR REPLACE INTO dasha_users (user_id, moon_longitude, birth_jd, '
+                                      'updated_at) VALUES (?, ?, ?, ?)', (user_id, moon_longitude, birth_jd, now))
+                    periods += [(user_id, key, start, end)
+                                for key, start, end in user_periods(moon_longitude, birth_jd, self.years)]
+                    written += 1
+                self.conn.executemany('INSERT INTO dasha_periods (user_id, period_key, start_jd, end_jd) '
+                                      'VALUES (?, ?, ?, ?)', periods)
+                self.conn.execute('COMMIT')
+            except BaseException:
+                self.conn.execute('ROLLBACK')
+                raise
+        return written
+
+    def rebuild(self, users):
+        """Replace the whole index with (user_id, moon_longitude, birth_jd) triples
+
+        For backfills: rows go in without indexes, which are built once at the end.
+        """
+        now = time.time()
+        with self.lock:
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                self.conn.execute('DROP INDEX IF EXISTS dasha_periods_user')
+                self.conn.execute('DROP INDEX IF EXISTS dasha_periods_start')
+                self.conn.execute('DELETE FROM dasha_periods')
+                self.conn.execute('DELETE FROM dasha_users')
+                count = 0
+                for user_id, moon_longitude, birth_jd in users:
+                    user_id = str(user_id)
+                    self.conn.execute('INSERT OR REPLACE INTO dasha_users (user_id, moon_longitude, birth_jd, '
+                                      'updated_at) VALUES (?, ?, ?, ?)', (user_id, moon_longitude, birth_jd, now))
+                    self.conn.executemany('INSERT INTO dasha_periods (user_id, period_key, start_jd, end_jd) '
+                                          'VALUES (?, ?, ?, ?)',
+                                          [(user_id,) + row for row in user_periods(moon_longitude, birth_jd,
+                                                                                    self.years)])
+                    count += 1
+                for statement in INDEXES.strip().split(';\n'):
+                    self.conn.execute(statement)
+                self.conn.execute('COMMIT')
+            except BaseException:
+                self.conn.execute('ROLLBACK')
+                raise
+        return count
+
+    def put(self, user_id, moon_longitude, birth_jd):
+        """Store or update one user; True if their periods were rewritten"""
+        return self.put_many([(user_id, moon_longitude, birth_jd)]) == 1
+
+    def put_chart(self, user_id, chart):
+        """Store a user from a calculate_chart_for_web chart"""
+        moon = next(p for p in chart['planetary_positions'] if p.get('planet') == 'Moon')
+        return self.put(user_id, moon['longitude'], chart['technical_info']['julian_day'])
+
+    def remove(self, user_id):
+        with self.lock:
+            self.conn.execute('BEGIN IMMEDIATE')
+            self._delete(str(user_id))
+            self.conn.execute('DELETE FROM dasha_users WHERE user_id = ?', (str(user_id),))
+            self.conn.execute('COMMIT')
+
+    def users_in(self, when, dasha, bhukti=None):
+        """Users in a dasha (and bhukti, if given) at a date or UT Julian day"""
+        jd = _jd(when)
+        key = period_key(_lord(dasha), None if bhukti is None else _lord(bhukti))
+        with self.lock:
+            rows = self.conn.execute(
+                'SELECT user_id FROM dasha_periods WHERE period_key = ? AND start_jd > ? AND start_jd <= ? '
+                'AND end_jd > ?', (key, jd - MAX_SPANS[key] - 1, jd, jd)).fetchall()
+        return [user_id for user_id, in rows]
+
+    def periods_starting(self, start, end, lord, level='bhukti', dasha=None):
+        """(user_id, dasha lord, lord, start_jd, end_jd) of periods of a lord beginning in
+        [start, end), optionally only within a given dasha, in start order"""
+        lord = _lord(lord)
+        if level == 'dasha':
+            keys = [period_key(lord)]
+        else:
+            dashas = range(9) if dasha is None else [_lord(dasha)]
+            keys = [period_key(dasha_lord, lord) for dasha_lord in dashas]
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT user_id, period_key, start_jd, end_jd FROM dasha_periods "
+                f"WHERE period_key IN ({', '.join('?' * len(keys))}) AND start_jd >= ? AND start_jd < ? "
+                f"ORDER BY start_jd", keys + [_jd(start), _jd(end)]).fetchall()
+        return [(user_id,) + key_lords(key)[1:] + (start_jd, end_jd) for user_id, key, start_jd, end_jd in rows]
+
+    def periods_of(self, user_id):
+        """A user's stored periods in time order"""
+        with self.lock:
+            rows = self.conn.execute('SELECT period_key, start_jd, end_jd FROM dasha_periods '
+                                     'WHERE user_id = ? ORDER BY start_jd, period_key', (str(user_id),)).fetchall()
+        return [dict(zip(('level', 'dasha', 'lord'), key_lords(key)), start_jd=start_jd, end_jd=end_jd)
+                for key, start_jd, end_jd in rows]
+
+    def close(self):
+        self.conn.close()
+
+def _date(jd_ut):
+    return jd_to_local('UTC', jd_ut).date().isoformat()
+
+def main():
+    """Index users' dasha periods and query them"""
+    parser = argparse.ArgumentParser(description="Dasha period index over users")
+    commands = parser.add_subparsers(dest='command', required=True)
+    add = commands.add_parser('add', help="store or update a user's periods")
+    add.add_argument('user_id')
+    add.add_argument('input', help="birth data as JSON (calculate_chart_for_web format)")
+    commands.add_parser('rebuild', help="replace the index from NDJSON lines on stdin with "
+                                        "user_id, moon_longitude and birth_jd")
+    users = commands.add_parser('in', help="users in a dasha (and bhukti) on a date")
+    users.add_argument('dasha')
+    users.add_argument('bhukti', nargs='?')
+    users.add_argument('--date', default=date.today().isoformat())
+    starting = commands.add_parser('starting', help="periods of a lord starting in a date range")
+    starting.add_argument('lord')
+    starting.add_argument('start')
+    starting.add_argument('end')
+    starting.add_argument('--level', choices=LEVELS, default='bhukti')
+    starting.add_argument('--dasha')
+    parser.add_argument('--db', default=DB_PATH)
+    args = parser.parse_args()
+
+    index = DashaIndex(args.db)
+    try:
+        if args.command == 'add':
+            result = cached_chart(json.loads(args.input))
+            if not result['success']:
+                print(json.dumps({'error': result['error']}))
+                sys.exit(1)
+            print(json.dumps({'user_id': args.user_id, 'updated': index.put_chart(args.user_id, result['chart'])}))
+        elif args.command == 'rebuild':
+            records = (json.loads(line) for line in sys.stdin if line.strip())
+            count = index.rebuild((r['user_id'], float(r['moon_longitude']), float(r['birth_jd'])) for r in records)
+            print(json.dumps({'users': count}))
+        elif args.command == 'in':
+            print(json.dumps(index.users_in(args.date, args.dasha, args.bhukti)))
+        else:
+            for user_id, dasha, lord, start_jd, end_jd in index.periods_starting(
+                    args.start, args.end, args.lord, args.level, args.dasha):
+                print(json.dumps({'user_id': user_id, 'dasha': dasha, 'lord': lord,
+                                  'start': _date(start_jd), 'end': _date(end_jd)}))
+    except ValueError as e:
+        print(json.dumps({'error': str(e)}))
+        sys.exit(1)
+    finally:
+        index.close()
+
+if __name__ == "__main__":
+    main()
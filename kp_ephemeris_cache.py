@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Cached Planet Positions
+Sidereal planet positions memoized per minute of UT. A lookup between two minutes
+extrapolates from the cached minute with the planet's speed, so repeated "now"
+queries cost no ephemeris calls and stay within a fraction of an arcsecond
+"""
+
+import json
+from datetime import datetime, timezone
+from functools import lru_cache
+
+import swisseph as swe
+
+from kp_ayanamsa import sidereal_calc
+from kp_metrics import count_ephemeris_calls
+from kp_timezones import UNIX_EPOCH_JD, SECONDS_PER_DAY
+
+PLANETS = {
+    'Sun': swe.SUN, 'Moon': swe.MOON, 'Mercury': swe.MERCURY,
+    'Venus': swe.VENUS, 'Mars': swe.MARS, 'Jupiter': swe.JUPITER,
+    'Saturn': swe.SATURN, 'Rahu': swe.MEAN_NODE
+}
+
+CACHE_STEP_SECONDS = 60
+CACHE_SIZE = 4096
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _positions_at_step(step):
+    """(longitude, speed) per planet, Ketu included, at step * CACHE_STEP_SECONDS"""
+    jd_ut = UNIX_EPOCH_JD + step * CACHE_STEP_SECONDS / SECONDS_PER_DAY
+    positions = {}
+    for name, planet_id in PLANETS.items():
+        result = sidereal_calc(jd_ut, planet_id)
+        positions[name] = (result[0], result[3])
+    count_ephemeris_calls('calc_ut', len(PLANETS))
+
+    rahu_longitude, rahu_speed = positions['Rahu']
+    positions['Ketu'] = ((rahu_longitude + 180) % 360, rahu_speed)
+    return positions
+
+def planet_positions(jd_ut):
+    """Sidereal {'longitude', 'speed'} per planet at a UT Julian day"""
+    seconds = (jd_ut - UNIX_EPOCH_JD) * SECONDS_PER_DAY
+    step = round(seconds / CACHE_STEP_SECONDS)
+    offset_days = (seconds - step * CACHE_STEP_SECONDS) / SECONDS_PER_DAY
+    return {name: {'longitude': (longitude + speed * offset_days) % 360, 'speed': speed}
+            for name, (longitude, speed) in _positions_at_step(step).items()}
+
+def current_jd():
+    """UT Julian day of the present moment"""
+    return UNIX_EPOCH_JD + datetime.now(timezone.utc).timestamp() / SECONDS_PER_DAY
+
+def current_positions():
+    """Planet positions now, shared by every caller within the same minute"""
+    return planet_positions(current_jd())
+
+def main():
+    """Print the current cached positions"""
+    print(json.dumps({'jd_ut': current_jd(), 'positions': current_positions()}, indent=2))
+
+if __name__ == "__main__":
+    main()
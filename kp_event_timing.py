@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+KP Event Timing
+Candidate windows for an event signified by a set of houses (2-7-11 for marriage):
+the dasha, bhukti and antara periods whose lords all signify those houses,
+intersected with the windows in which the ruling planets of the moment of judgment
+occupy star or sub arcs whose lords also signify them. Only ruling planets slow
+enough for day-scale windows (the Sun, Mars, Jupiter, Saturn, Rahu and Ketu) are
+followed; a fixed list of transit planets can be given instead. Dasha periods of
+the whole life are expanded at once as arrays by the dasha engine, transit arc
+schedules are root-found per ten-year block and shared by every chart, and the
+conditions are combined with interval algebra. A full-life scan takes well under a
+second once the blocks are warm (warm_transit_blocks, run by the worker at start-up);
+cold, each followed planet first root-finds its blocks, from a fifth of a second for
+the nodes to about two seconds for Jupiter and several for the Sun
+"""
+
+import sys
+import json
+import argparse
+from functools import lru_cache
+
+import numpy as np
+import swisseph as swe
+
+from kp_ayanamsa import sidereal_calc
+from ultimate_kp_system import DASHA_SEQUENCE, get_sign_lord
+from kp_dasha_engine import DAYS_PER_YEAR, VIMSHOTTARI, dasha_from_moon
+from kp_sub_table import SUB_TABLE, SUB_STARTS, sub_index
+from kp_metrics import count_ephemeris_calls
+from kp_timezones import jd_to_local
+from kp_chart_cache import cached_chart
+from kp_ruling_planets import ruling_planets
+from kp_ephemeris_cache import current_jd
+import kp_intervals as intervals
+
+EVENT_HOUSES = {
+    'marriage': [2, 7, 11],
+    'job': [2, 6, 10, 11],
+    'childbirth': [2, 5, 11],
+    'property': [4, 11, 12],
+    'foreign_travel': [3, 9, 12],
+    'education': [4, 9, 11]
+}
+
+DASHA_LEVELS = ['dasha', 'bhukti', 'antara']
+LIFE_YEARS = 120
+
+TRANSIT_BODIES = {'Sun': swe.SUN, 'Mars': swe.MARS, 'Jupiter': swe.JUPITER, 'Saturn': swe.SATURN,
+                  'Rahu': swe.MEAN_NODE, 'Ketu': swe.MEAN_NODE}
+BODY_OFFSETS = {'Ketu': 180.0}
+# transits value that follows the ruling planets of the moment of judgment
+RULING_TRANSITS = 'ruling'
+DEFAULT_TRANSITS = RULING_TRANSITS
+BLOCK_DAYS = 3648  # about ten years of positions per cached block
+# Days between samples, short enough that no planet moves a whole sub arc (at least
+# 40') between two samples
+SAMPLE_DAYS = {'Sun': 0.5, 'Mars': 0.5, 'Jupiter': 2, 'Saturn': 4, 'Rahu': 8, 'Ketu': 8}
+BLOCK_CACHE_SIZE = 256
+# Blocks warmed at worker start-up: births from 1900 to about 2030 followed for LIFE_YEARS
+WARM_YEARS = (1900, 2150)
+REFINE_ITERATIONS = 3
+REFINE_TOLERANCE_DEGREES = 1e-4
+
+LORD_INDEX = {lord: i for i, lord in enumerate(DASHA_SEQUENCE)}
+LORD_YEARS = VIMSHOTTARI.year_array
+CYCLE_YEARS = LORD_YEARS.sum()
+SUB_STAR_LORDS = np.array([LORD_INDEX[sub.star_lord] for sub in SUB_TABLE])
+SUB_SUB_LORDS = np.array([LORD_INDEX[sub.sub_lord] for sub in SUB_TABLE])
+
+def planet_significations(chart):
+    """Houses signified by each planet of a calculate_chart_for_web chart
+
+    In the KP order: houses occupied by the planet's star lord, occupied by the
+    planet, owned by its star lord and owned by the planet. Rahu and Ketu also act
+    for the lord of the sign they occupy.
+    """
+    planets = {p['planet']: p for p in chart['planetary_positions'] if 'longitude' in p}
+    occupied = {name: {p['house']} for name, p in planets.items()}
+    owned = {lord: set() for lord in DASHA_SEQUENCE}
+    for house in chart['houses']:
+        owned[get_sign_lord(house['sign'])].add(house['house'])
+
+    def own_houses(name):
+        return occupied.get(name, set()) | owned.get(name, set())
+
+    significations = {}
+    for name, planet in planets.items():
+        houses = own_houses(name) | own_houses(planet['nakshatra_lord'])
+        if name in ('Rahu', 'Ketu'):
+            houses |= own_houses(get_sign_lord(planet['sign']))
+        significations[name] = sorted(houses)
+    return significations
+
+def dasha_periods(moon_longitude, birth_jd, years=LIFE_YEARS, depth=len(DASHA_LEVELS)):
+    """Vimshottari periods from birth for a number of years, down to depth levels
+
+    Returns (starts, ends, lords): UT Julian day arrays clipped to the span and an
+    (n, depth) array of lord indexes into DASHA_SEQUENCE, sorted by time.
+    """
+    span_end = birth_jd + years * DAYS_PER_YEAR
+    starts, ends, lords = dasha_from_moon(moon_longitude, birth_jd).expand(depth, birth_jd, span_end)
+    return np.maximum(starts, birth_jd), np.minimum(ends, span_end), lords
+
+@lru_cache(maxsize=BLOCK_CACHE_SIZE)
+def _transit_block(planet, block):
+    """(entry times, subs entered, sub at the block start) of a planet's sub arcs over
+    one block of days, from sampled positions interpolated to each boundary"""
+    step = SAMPLE_DAYS[planet]
+    jds = block * BLOCK_DAYS + np.arange(BLOCK_DAYS / step + 1) * step
+    body = TRANSIT_BODIES[planet]
+    offset = BODY_OFFSETS.get(planet, 0.0)
+    longitudes = (np.array([sidereal_calc(jd, body, 0)[0] for jd in jds]) + offset) % 360
+    count_ephemeris_calls('calc_ut', len(jds))
+
+    subs = sub_index(longitudes)
+    changed = np.flatnonzero(subs[1:] != subs[:-1])
+    motion = (longitudes[changed + 1] - longitudes[changed] + 180) % 360 - 180
+    # Moving forward the boundary is the start of the new sub, moving back that of the old
+    boundary = np.where(motion >= 0, SUB_STARTS[subs[changed + 1]], SUB_STARTS[subs[changed]])
+    fraction = np.clip(((boundary - longitudes[changed] + 180) % 360 - 180) / motion, 0, 1)
+    times = jds[changed] + fraction * step
+
+    # Newton steps on the ephemeris speed, kept inside the sample interval (the speed
+    # goes to zero at stations)
+    for i, boundary_longitude in enumerate(boundary):
+        for _ in range(REFINE_ITERATIONS):
+            longitude, _, _, speed = sidereal_calc(times[i], body)[:4]
+            longitude = (longitude + offset) % 360
+            count_ephemeris_calls('calc_ut')
+            error = (boundary_longitude - longitude + 180) % 360 - 180
+            if speed == 0 or abs(error) < REFINE_TOLERANCE_DEGREES:
+                break
+            times[i] = min(max(times[i] + error / speed, jds[changed[i]]), jds[changed[i]] + step)
+    return times, subs[changed + 1], int(subs[0])
+
+def warm_transit_blocks(planets=tuple(TRANSIT_BODIES), first_year=WARM_YEARS[0], last_year=WARM_YEARS[1]):
+    """Fill the block cache over the years charts usually span, so the first
+    event_windows call does not root-find a dozen blocks"""
+    jd_start = swe.julday(first_year, 1, 1, 0)
+    jd_end = swe.julday(last_year + 1, 1, 1, 0)
+    for planet in planets:
+        for block in range(int(jd_start // BLOCK_DAYS), int(jd_end // BLOCK_DAYS) + 1):
+            _transit_block(planet, block)
+
+def transit_schedule(planet, jd_start, jd_end):
+    """(entry times, subs entered, sub at jd_start) of a planet's sub arcs over a span"""
+    blocks = range(int(jd_start // BLOCK_DAYS), int(jd_end // BLOCK_DAYS) + 1)
+    parts = [_transit_block(planet, block) for block in blocks]
+    times = np.concatenate([times for times, _, _ in parts])
+    subs = np.concatenate([subs for _, subs, _ in parts])
+    position = int(np.searchsorted(times, jd_start, side='right'))
+    first = parts[0][2] if position == 0 else int(subs[position - 1])
+    return times[position:], subs[position:], first
+
+def ruling_transits(chart, judgment_jd=None):
+    """(transit planets, ruling planets) for a chart: the ruling planets at the moment
+    of judgment (default now) at the birth place that have transit schedules"""
+    coordinates = chart['coordinates']
+    ruling = ruling_planets(current_jd() if judgment_jd is None else judgment_jd,
+                            coordinates['latitude'], coordinates['longitude'],
+                            chart.get('timezone', {}).get('name'))
+    followed = [planet for planet in ruling['ruling_planets'] if planet in TRANSIT_BODIES]
+    return followed, ruling
+
+def _in_force(starts, jd):
+    return int(np.searchsorted(starts, jd, side='right')) - 1
+
+def event_windows(chart, houses, transits=(), arc='sub', years=LIFE_YEARS,
+                  depth=len(DASHA_LEVELS)):
+    """Candidate windows for an event, in time order
+
+    chart is a calculate_chart_for_web chart and houses the houses the event needs.
+    A window is a span in which the lords of the dasha levels down to depth all
+    signify one of the houses and each planet of transits is in a star (arc='star')
+    or sub (arc='sub') arc whose lord does too.
+    """
+    wanted = set(houses)
+    significations = planet_significations(chart)
+    signifying = {LORD_INDEX[name] for name, signified in significations.items() if wanted & set(signified)}
+
+    moon = next(p for p in chart['planetary_positions'] if p.get('planet') == 'Moon')
+    birth_jd = chart['technical_info']['julian_day']
+    starts, ends, lords = dasha_periods(moon['longitude'], birth_jd, years, depth)
+    keep = np.isin(lords, list(signifying)).all(axis=1)
+    result = intervals.normalize(starts[keep], ends[keep])
+
+    span_end = birth_jd + years * DAYS_PER_YEAR
+    arc_lords = SUB_STAR_LORDS if arc == 'star' else SUB_SUB_LORDS
+    schedules = {}
+    for planet in transits:
+        times, subs, first = transit_schedule(planet, birth_jd, span_end)
+        schedules[planet] = times, subs, first
+        result = intervals.intersect(result, intervals.from_divisions(
+            times, arc_lords[subs], arc_lords[first], signifying, birth_jd, span_end))
+
+    zone_name = chart.get('timezone', {}).get('name') or 'UTC'
+    windows = []
+    for start, end in zip(*result):
+        window = {
+            'start': jd_to_local(zone_name, float(start)).date().isoformat(),
+            'end': jd_to_local(zone_name, float(end)).date().isoformat(),
+            'days': round(float(end - start), 1),
+            'jd_start': float(start),
+            'jd_end': float(end),
+            'dasha': [DASHA_SEQUENCE[lord] for lord in lords[_in_force(starts, start)]]
+        }
+        for planet, (times, subs, first) in schedules.items():
+            position = _in_force(times, start)
+            sub = SUB_TABLE[first if position < 0 else int(subs[position])]
+            window[planet] = {'star_lord': sub.star_lord, 'sub_lord': sub.sub_lord}
+        windows.append(window)
+    return windows
+
+def event_timing(input_data, houses, transits=DEFAULT_TRANSITS, arc='sub', years=LIFE_YEARS,
+                 judgment_jd=None):
+    """Chart from birth data, then its event windows
+
+    transits is RULING_TRANSITS to follow the ruling planets at judgment_jd (default
+    now), or a list of planets from TRANSIT_BODIES.
+    """
+    result = cached_chart(input_data)
+    if not result['success']:
+        return {'success': False, 'error': result['error']}
+    chart = result['chart']
+    response = {'success': True, 'houses': list(houses)}
+    if transits == RULING_TRANSITS:
+        transits, ruling = ruling_transits(chart, judgment_jd)
+        response['ruling_planets'] = ruling['ruling_planets']
+        response['judgment_time'] = ruling['local_time']
+    response['transits'] = list(transits)
+    response['significations'] = planet_significations(chart)
+    response['windows'] = event_windows(chart, houses, transits, arc, years)
+    return response
+
+def main():
+    """Print candidate windows for an event from birth data"""
+    parser = argparse.ArgumentParser(
+        description="KP event timing from dasha periods and transits",
+        epilog="A cold run root-finds transit arcs for each planet followed (seconds); the "
+               "sub-second full-life scan holds once the blocks are warm, as in the worker")
+    parser.add_argument('input', help="birth data as JSON (calculate_chart_for_web format)")
+    parser.add_argument('--event', choices=sorted(EVENT_HOUSES), default='marriage')
+    parser.add_argument('--houses', help="comma-separated houses, overriding --event")
+    parser.add_argument('--transits', default=DEFAULT_TRANSITS,
+                        help=f"'{RULING_TRANSITS}' for the ruling planets at --judgment-jd that have "
+                             f"schedules (default), or comma-separated from {', '.join(TRANSIT_BODIES)}; "
+                             "empty for none")
+    parser.add_argument('--judgment-jd', type=float, help="UT Julian day of judgment (default: now)")
+    parser.add_argument('--arc', choices=['star', 'sub'], default='sub')
+    parser.add_argument('--years', type=float, default=LIFE_YEARS)
+    args = parser.parse_args()
+
+    houses = [int(h) for h in args.houses.split(',')] if args.houses else EVENT_HOUSES[args.event]
+    transits = args.transits
+    if transits != RULING_TRANSITS:
+        transits = [t for t in transits.split(',') if t]
+        unknown = [t for t in transits if t not in TRANSIT_BODIES]
+        if unknown:
+            parser.error(f"unknown transit planet: {', '.join(unknown)}")
+    result = event_timing(json.loads(args.input), houses, transits, args.arc, args.years,
+                          args.judgment_jd)
+    print(json.dumps(result, indent=2))
+    if not result['success']:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Offline Gazetteer for Birth-Place Resolution
+Resolves free-text place names to latitude, longitude and time zone from a bundled
+GeoNames city extract, with a sorted-array prefix index for autocomplete and a
+1° grid index for reverse lookup, memory-mapped so worker start-up stays fast.
+The index is built ahead of time (npm run build:catalogs, or
+`python3 kp_gazetteer.py build`)
+"""
+
+import os
+import re
+import sys
+import gzip
+import json
+import math
+import unicodedata
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, 'data', 'gazetteer')
+CITIES_FILE = os.path.join(DATA_DIR, 'cities.tsv.gz')
+COUNTRIES_FILE = os.path.join(DATA_DIR, 'countries.tsv')
+INDEX_DIR = os.environ.get('KP_GAZETTEER_INDEX', os.path.join(DATA_DIR, 'index'))
+
+# Bump when the index layout changes so stale indexes are rebuilt
+INDEX_VERSION = 2
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+GRID_ROWS = 180
+GRID_COLUMNS = 360
+
+ARRAYS = ('key_blob', 'key_offsets', 'key_city', 'key_primary', 'names', 'country', 'admin1',
+          'latitude', 'longitude', 'timezone', 'population', 'cell_start', 'cell_cities')
+
+def normalize_name(text):
+    """Lower-case ASCII search key: accents folded, punctuation collapsed to spaces"""
+    folded = unicodedata.normalize('NFKD', text)
+    folded = ''.join(c for c in folded if not unicodedata.combining(c)).lower()
+    return re.sub(r'[^a-z0-9]+', ' ', folded).strip()
+
+def _cell(latitude, longitude):
+    row = min(max(int(math.floor(latitude)) + 90, 0), GRID_ROWS - 1)
+    column = int(math.floor(longitude + 180)) % GRID_COLUMNS
+    return row, column
+
+def _source_signature():
+    stat = os.stat(CITIES_FILE)
+    return {'version': INDEX_VERSION, 'source_size': stat.st_size, 'source_mtime': int(stat.st_mtime)}
+
+def _read_tsv(path, opener=open):
+    with opener(path, 'rt', encoding='utf-8') as f:
+        lines = [line.rstrip('\n') for line in f if not line.startswith('#')]
+    header = lines[0].split('\t')
+    return [dict(zip(header, line.split('\t'))) for line in lines[1:] if line]
+
+def build_index(index_dir=INDEX_DIR):
+    """Build the memory-mappable index arrays from the bundled city file"""
+    cities = _read_tsv(CITIES_FILE, gzip.open)
+    countries = {row['iso']: row['name'] for row in _read_tsv(COUNTRIES_FILE)}
+    timezones = sorted({row['timezone'] for row in cities})
+    timezone_ids = {name: i for i, name in enumerate(timezones)}
+
+    count = len(cities)
+    latitude = np.array([float(row['latitude']) for row in cities])
+    longitude = np.array([float(row['longitude']) for row in cities])
+
+    # Name index: one key per primary or alternate name, sorted for searchsorted
+    key_rows = []
+    for i, row in enumerate(cities):
+        seen = set()
+        for name, primary in [(row['name'], 1)] + [(a, 0) for a in row['alternate_names'].split('|') if a]:
+            key = normalize_name(name)
+            if key and key not in seen:
+                seen.add(key)
+                key_rows.append((key.encode('ascii', 'ignore'), i, primary))
+    key_rows.sort()
+
+    # Grid index: cities grouped by 1° cell, with a prefix-sum start offset per cell
+    cells = np.array([r * GRID_COLUMNS + c for r, c in map(_cell, latitude, longitude)], dtype=np.int32)
+    cell_cities = np.argsort(cells, kind='stable').astype(np.int32)
+    cell_start = np.searchsorted(cells[cell_cities], np.arange(GRID_ROWS * GRID_COLUMNS + 1)).astype(np.int32)
+
+    # Sorted keys packed end to end, with each key's start offset (and the total length)
+    key_lengths = np.array([len(k) for k, _, _ in key_rows], dtype=np.int64)
+    arrays = {
+        'key_blob': np.frombuffer(b''.join(k for k, _, _ in key_rows), dtype=np.uint8),
+        'key_offsets': np.concatenate([[0], np.cumsum(key_lengths)]),
+        'key_city': np.array([i for _, i, _ in key_rows], dtype=np.int32),
+        'key_primary': np.array([p for _, _, p in key_rows], dtype=np.uint8),
+        'names': np.array([row['name'].encode('utf-8') for row in cities]),
+        'country': np.array([row['country'].encode('ascii') for row in cities]),
+        'admin1': np.array([row['admin1'].encode('ascii') for row in cities]),
+        'latitude': latitude,
+        'longitude': longitude,
+        'timezone': np.array([timezone_ids[row['timezone']] for row in cities], dtype=np.uint16),
+        'population': np.array([int(row['population']) for row in cities], dtype=np.int64),
+        'cell_start': cell_start,
+        'cell_cities': cell_cities
+    }
+
+    os.makedirs(index_dir, exist_ok=True)
+    for name, array in arrays.items():
+        temporary = os.path.join(index_dir, f'{name}.tmp.npy')
+        np.save(temporary, array)
+        os.replace(temporary, os.path.join(index_dir, f'{name}.npy'))
+
+    # meta.json is written last and marks the index as complete
+    meta = dict(_source_signature(), count=count, timezones=timezones, countries=countries)
+    temporary = os.path.join(index_dir, 'meta.tmp.json')
+    with open(temporary, 'w') as f:
+        json.dump(meta, f)
+    os.replace(temporary, os.path.join(index_dir, 'meta.json'))
+
+class Gazetteer:
+    """Read-only city index over memory-mapped arrays"""
+
+    def __init__(self, index_dir=INDEX_DIR):
+        meta_path = os.path.join(index_dir, 'meta.json')
+        meta = None
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+        # Building takes a while, so it is a deploy step rather than a side effect of a lookup
+        if meta is None or any(meta.get(k) != v for k, v in _source_signature().items()):
+            raise RuntimeError(f"Gazetteer index in {index_dir} is missing or stale; "
+                               "build it with: python3 kp_gazetteer.py build")
+
+        self.timezones = meta['timezones']
+        self.countries = meta['countries']
+        self.country_keys = {}
+        for iso, name in self.countries.items():
+            self.country_keys[normalize_name(name)] = iso
+            self.country_keys[iso.lower()] = iso
+
+        for name in ARRAYS:
+            setattr(self, name, np.load(os.path.join(index_dir, f'{name}.npy'), mmap_mode='r'))
+        self.key_count = len(self.key_offsets) - 1
+
+    def city(self, index, distance_km=None):
+        """Public record for a city row"""
+        country = self.country[index].decode('ascii')
+        record = {
+            'name': self.names[index].decode('utf-8'),
+            'country': country,
+            'country_name': self.countries.get(country, country),
+            'admin1': self.admin1[index].decode('ascii'),
+            'latitude': float(self.latitude[index]),
+            'longitude': float(self.longitude[index]),
+            'timezone': self.timezones[int(self.timezone[index])],
+            'population': int(self.population[index])
+        }
+        if distance_km is not None:
+            record['distance_km'] = round(distance_km, 3)
+        return record
+
+    def _key(self, i):
+        return self.key_blob[self.key_offsets[i]:self.key_offsets[i + 1]].tobytes()
+
+    def _bisect(self, encoded, right=False):
+        """Position of encoded among the sorted packed keys (bisect_left, or bisect_right)"""
+        low, high = 0, self.key_count
+        while low < high:
+            middle = (low + high) // 2
+            key = self._key(middle)
+            if key < encoded or (right and key == encoded):
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _key_range(self, key, prefix=False):
+        encoded = key.encode('ascii', 'ignore')
+        low = self._bisect(encoded)
+        if prefix:
+            high = self._bisect(encoded + b'\xff')
+        else:
+            high = self._bisect(encoded, right=True)
+        return low, high
+
+    def autocomplete(self, prefix, limit=10, country=None):
+        """Cities whose name or alternate name starts with prefix, most populous first"""
+        key = normalize_name(prefix)
+        if not key:
+            return []
+
+        low, high = self._key_range(key, prefix=True)
+        cities = np.asarray(self.key_city[low:high])
+        primary = np.asarray(self.key_primary[low:high]).astype(bool)
+        if country:
+            in_country = np.asarray(self.country)[cities] == country.encode('ascii')
+            cities, primary = cities[in_country], primary[in_country]
+
+        # Matches on a city's own name rank ahead of matches on an alternate name
+        ranked = []
+        primary_cities = np.unique(cities[primary])
+        for group in (primary_cities, np.setdiff1d(cities, primary_cities)):
+            if len(ranked) >= limit:
+                break
+            wanted = limit - len(ranked)
+            population = np.asarray(self.population)[group]
+            if len(group) > wanted:
+                top = np.argpartition(-population, wanted - 1)[:wanted]
+                group, population = group[top], population[top]
+            ranked.extend(int(group[i]) for i in np.argsort(-population, kind='stable'))
+
+        return [self.city(i) for i in ranked]
+
+    def resolve(self, text):
+        """Best city for free text like 'Chennai, Tamil Nadu, India', or None
+
+        The first comma-separated part is matched exactly against primary names,
+        then alternate names; a later part naming a country filters the matches.
+        Ties go to the most populous city.
+        """
+        parts = [normalize_name(part) for part in text.split(',')]
+        if not parts or not parts[0]:
+            return None
+
+        countries = {self.country_keys[p] for p in parts[1:] if p in self.country_keys}
+        low, high = self._key_range(parts[0])
+        if low == high:
+            return None
+
+        cities = np.asarray(self.key_city[low:high])
+        primary = np.asarray(self.key_primary[low:high]).astype(bool)
+        if countries:
+            in_country = np.isin(np.asarray(self.country)[cities],
+                                 [c.encode('ascii') for c in countries])
+            if in_country.any():
+                cities, primary = cities[in_country], primary[in_country]
+        if primary.any():
+            cities = cities[primary]
+
+        best = max(cities, key=lambda i: int(self.population[i]))
+        return self.city(int(best))
+
+    def nearest(self, latitude, longitude, max_km=None):
+        """Nearest city by great-circle distance, searching outward ring by ring over the grid
+
+        The search stops once no cell in the next ring can hold anything closer than
+        the best match, using the narrowest cell width the ring can reach.
+        """
+        row, column = _cell(latitude, longitude)
+        best_index, best_distance = None, math.inf
+
+        for ring in range(0, GRID_COLUMNS // 2 + 1):
+            for dr in range(-ring, ring + 1):
+                r = row + dr
+                if r < 0 or r >= GRID_ROWS:
+                    continue
+                step = 1 if abs(dr) == ring else 2 * ring
+                for dc in sorted({(dc % GRID_COLUMNS) for dc in range(-ring, ring + 1, step or 1)}):
+                    cell = r * GRID_COLUMNS + (column + dc) % GRID_COLUMNS
+                    start, end = self.cell_start[cell], self.cell_start[cell + 1]
+                    if start == end:
+                        continue
+                    candidates = np.asarray(self.cell_cities[start:end])
+                    distances = _haversine_km(latitude, longitude,
+                                              np.asarray(self.latitude)[candidates],
+                                              np.asarray(self.longitude)[candidates])
+                    i = int(np.argmin(distances))
+                    if distances[i] < best_distance:
+                        best_index, best_distance = int(candidates[i]), float(distances[i])
+
+            reach = min(abs(latitude) + ring + 1, 89.9)
+            next_ring_km = ring * KM_PER_DEGREE * math.cos(math.radians(reach))
+            if best_distance <= next_ring_km or (max_km is not None and next_ring_km > max_km):
+                break
+
+        if best_index is None or (max_km is not None and best_distance > max_km):
+            return None
+        return self.city(best_index, best_distance)
+
+def _haversine_km(latitude, longitude, latitudes, longitudes):
+    phi1 = np.radians(latitude)
+    phi2 = np.radians(latitudes)
+    dphi = phi2 - phi1
+    dlambda = np.radians(longitudes - longitude)
+    h = np.sin(dphi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(1.0, np.sqrt(h)))
+
+_gazetteer = None
+
+def get_gazetteer():
+    """Process-wide gazetteer, memory-mapped on first use"""
+    global _gazetteer
+    if _gazetteer is None:
+        _gazetteer = Gazetteer()
+    return _gazetteer
+
+def resolve_place(text):
+    """Resolve free-text place to a city record (lat/lon/timezone), or None"""
+    if not text:
+        return None
+    return get_gazetteer().resolve(text)
+
+def autocomplete(prefix, limit=10, country=None):
+    """Name autocomplete, most populous first"""
+    return get_gazetteer().autocomplete(prefix, limit, country)
+
+def nearest_city(latitude, longitude, max_km=None):
+    """Reverse lookup of the nearest city"""
+    return get_gazetteer().nearest(latitude, longitude, max_km)
+
+def main():
+    """Command line: resolve <place> | complete <prefix> | nearest <lat> <lon> | build"""
+    if len(sys.argv) < 2 or sys.argv[1] not in ('resolve', 'complete', 'nearest', 'build'):
+        print("Usage: python3 kp_gazetteer.py resolve <place> | complete <prefix> | "
+              "nearest <latitude> <longitude> | build", file=sys.stderr)
+        sys.exit(1)
+
+    command = sys.argv[1]
+    if command == 'build':
+        build_index()
+        result = {'index': INDEX_DIR}
+    elif command == 'resolve':
+        result = resolve_place(' '.join(sys.argv[2:]))
+    elif command == 'complete':
+        result = autocomplete(' '.join(sys.argv[2:]))
+    else:
+        result = nearest_city(float(sys.argv[2]), float(sys.argv[3]))
+
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+"""
+Golden-Output Accuracy Harness
+Checks optimized calculation engines against the reference Swiss Ephemeris path
+over a large randomized corpus, with extra cases placed on sign, nakshatra and sub edges.
+The reference subtracts the KP-Newcomb value documented in CALCULATION_VERIFICATION.md
+from tropical swisseph output itself and finds sub lords by walking the Vimshottari
+proportions across each nakshatra, so it shares neither the engines' frame code nor
+their sign, star and sub lord classifiers (kp_sub_table included)
+"""
+
+import sys
+import json
+import random
+import argparse
+import swisseph as swe
+
+CORPUS_SEED = 27
+CORPUS_SIZE = 5000
+BOUNDARY_FRACTION = 0.2
+
+# Placidus is undefined inside the polar circles, keep the corpus where it is valid
+MAX_LATITUDE = 66.0
+
+REFERENCE_PLANETS = {
+    'Sun': swe.SUN, 'Moon': swe.MOON, 'Mercury': swe.MERCURY,
+    'Venus': swe.VENUS, 'Mars': swe.MARS, 'Jupiter': swe.JUPITER,
+    'Saturn': swe.SATURN, 'Rahu': swe.MEAN_NODE
+}
+
+# KP-Newcomb Ayanamsa, 23° 43' 07" as documented in CALCULATION_VERIFICATION.md
+REFERENCE_AYANAMSA = 23.71861111
+
+# Per-field tolerances (degrees, or degrees/day for speed)
+TOLERANCES = {
+    'planet_longitude': 1 / 3600,
+    'speed': 1e-3,
+    'cusp': 1 / 3600,
+    'ascendant': 1 / 3600,
+    'midheaven': 1 / 3600
+}
+
+REFERENCE_SIGNS = ["Aries", "Taurus", "Gemini", "Cancer", "Leo", "Virgo",
+                   "Libra", "Scorpio", "Sagittarius", "Capricorn", "Aquarius", "Pisces"]
+REFERENCE_NAKSHATRAS = [
+    "Ashwini", "Bharani", "Krittika", "Rohini", "Mrigashira", "Ardra",
+    "Punarvasu", "Pushya", "Ashlesha", "Magha", "Purva Phalguni", "Uttara Phalguni",
+    "Hasta", "Chitra", "Swati", "Vishakha", "Anuradha", "Jyeshtha",
+    "Mula", "Purva Ashadha", "Uttara Ashadha", "Shravana", "Dhanishta", "Shatabhisha",
+    "Purva Bhadrapada", "Uttara Bhadrapada", "Revati"
+]
+# Vimshottari lords in dasha order with their years (120 in all)
+REFERENCE_DASHA = [('Ketu', 7), ('Venus', 20), ('Sun', 6), ('Moon', 10), ('Mars', 7),
+                   ('Rahu', 18), ('Jupiter', 16), ('Saturn', 19), ('Mercury', 17)]
+NAKSHATRA_SPAN = 360 / 27
+
+def reference_subs(nakshatra):
+    """(start longitude, sub lord) of the nine subs of a nakshatra: its arc divided in
+    proportion to the dasha years, starting from the star lord"""
+    start = nakshatra * NAKSHATRA_SPAN
+    subs = []
+    for step in range(9):
+        lord, years = REFERENCE_DASHA[(nakshatra + step) % 9]
+        subs.append((start, lord))
+        start += NAKSHATRA_SPAN * years / 120
+    return subs
+
+# Boundaries of every categorical division, as sorted longitudes
+DIVISION_BOUNDARIES = {
+    'sign': [i * 30.0 for i in range(12)],
+    'nakshatra': [i * NAKSHATRA_SPAN for i in range(27)],
+    'star_lord': [i * NAKSHATRA_SPAN for i in range(27)],
+    'pada': [i * NAKSHATRA_SPAN / 4 for i in range(108)],
+    'sub_lord': [start for nakshatra in range(27) for start, _ in reference_subs(nakshatra)]
+}
+# Divisions checked for cusps and the ascendant
+LORD_DIVISIONS = ('sign', 'star_lord', 'sub_lord')
+
+# Optimized engines: name -> callable(case) returning a (possibly partial) result
+ENGINES = {}
+
+def register_engine(name, func):
+    """Register an optimized engine to be checked against the reference path"""
+    ENGINES[name] = func
+    return func
+
+def angular_difference(a, b):
+    """Signed smallest difference a - b in degrees"""
+    return (a - b + 180) % 360 - 180
+
+def distance_to_boundary(longitude, boundaries):
+    """Distance in degrees from longitude to the nearest boundary of a division"""
+    return min(abs(angular_difference(longitude, edge)) for edge in boundaries)
+
+def make_case(jd_ut, latitude, longitude, kind='random'):
+    """Build a corpus case from a UT Julian day rounded to the whole second"""
+    year, month, day, hours = swe.revjul(jd_ut)
+    total_seconds = int(round(hours * 3600))
+    if total_seconds == 86400:
+        year, month, day, _ = swe.revjul(jd_ut + 0.5 / 86400)
+        total_seconds = 0
+    hour, remainder = divmod(total_seconds, 3600)
+    minute, second = divmod(remainder, 60)
+
+    return {
+        'kind': kind,
+        'year': year, 'month': month, 'day': day,
+        'hour': hour, 'minute': minute, 'second': second,
+        'jd_ut': swe.julday(year, month, day, hour + minute / 60 + second / 3600),
+        'latitude': latitude,
+        'longitude': longitude
+    }
+
+def solve_moon_on_boundary(jd_ut, boundaries):
+    """Move jd_ut to the instant the sidereal Moon sits on the nearest division edge"""
+    for _ in range(6):
+        result = swe.calc_ut(jd_ut, swe.MOON, swe.FLG_SPEED)[0]
+        moon = (result[0] - REFERENCE_AYANAMSA) % 360
+        edge = min(boundaries, key=lambda b: abs(angular_difference(moon, b)))
+        jd_ut -= angular_difference(moon, edge) / result[3]
+    return jd_ut
+
+def solve_ascendant_on_boundary(jd_ut, latitude, longitude, boundaries):
+    """Move jd_ut to the instant the sidereal ascendant sits on the nearest division edge"""
+    step = 1 / 1440  # One minute, for a numerical derivative
+    for _ in range(6):
+        asc = (swe.houses(jd_ut, latitude, longitude, b'P')[1][0] - REFERENCE_AYANAMSA) % 360
+        asc_later = swe.houses(jd_ut + step, latitude, longitude, b'P')[1][0] - REFERENCE_AYANAMSA
+        rate = angular_difference(asc_later, asc) / step
+        edge = min(boundaries, key=lambda b: abs(angular_difference(asc, b)))
+        jd_ut -= angular_difference(asc, edge) / rate
+    return jd_ut
+
+def generate_cases(count=CORPUS_SIZE, seed=CORPUS_SEED, boundary_fraction=BOUNDARY_FRACTION):
+    """Generate random cases plus cases whose Moon or ascendant lies on a division edge"""
+    rng = random.Random(seed)
+    jd_start = swe.julday(1900, 1, 1, 0)
+    jd_end = swe.julday(2100, 1, 1, 0)
+    boundary_count = int(count * boundary_fraction)
+    cases = []
+
+    for i in range(count):
+        jd_ut = rng.uniform(jd_start, jd_end)
+        latitude = round(rng.uniform(-MAX_LATITUDE, MAX_LATITUDE), 4)
+        longitude = round(rng.uniform(-180, 180), 4)
+
+        if i < boundary_count:
+            division = rng.choice(list(DIVISION_BOUNDARIES))
+            boundaries = DIVISION_BOUNDARIES[division]
+            if i % 2 == 0:
+                jd_ut = solve_moon_on_boundary(jd_ut, boundaries)
+                kind = f'moon_{division}_edge'
+            else:
+                jd_ut = solve_ascendant_on_boundary(jd_ut, latitude, longitude, boundaries)
+                kind = f'ascendant_{division}_edge'
+            cases.append(make_case(jd_ut, latitude, longitude, kind))
+        else:
+            cases.append(make_case(jd_ut, latitude, longitude))
+
+    return cases
+
+def classify(longitude):
+    """Categorical fields of a sidereal longitude"""
+    longitude %= 360
+    nakshatra = min(int(longitude // NAKSHATRA_SPAN), 26)
+    sub_lord = [lord for start, lord in reference_subs(nakshatra) if start <= longitude][-1]
+    return {
+        'sign': REFERENCE_SIGNS[int(longitude // 30)],
+        'nakshatra': REFERENCE_NAKSHATRAS[nakshatra],
+        'pada': int(longitude % NAKSHATRA_SPAN // (NAKSHATRA_SPAN / 4)) + 1,
+        'star_lord': REFERENCE_DASHA[nakshatra % 9][0],
+        'sub_lord': sub_lord
+    }
+
+def house_of(longitude, cusps):
+    """House (1-12) of a sidereal longitude between Placidus cusps"""
+    for i, cusp in enumerate(cusps):
+        if (longitude - cusp) % 360 < (cusps[(i + 1) % 12] - cusp) % 360:
+            return i + 1
+    return 12
+
+def reference_result(case):
+    """Compute the reference result for a case with the slow per-call swisseph path"""
+    jd_ut = case['jd_ut']
+
+    planets = {}
+    for planet_name, planet_id in REFERENCE_PLANETS.items():
+        result = swe.calc_ut(jd_ut, planet_id, swe.FLG_SPEED)[0]
+        planets[planet_name] = {'longitude': (result[0] - REFERENCE_AYANAMSA) % 360, 'speed': result[3]}
+
+    planets['Ketu'] = {
+        'longitude': (planets['Rahu']['longitude'] + 180) % 360,
+        'speed': -planets['Rahu']['speed']
+    }
+
+    house_cusps, ascmc = swe.houses(jd_ut, case['latitude'], case['longitude'], b'P')[:2]
+    cusps = [(cusp - REFERENCE_AYANAMSA) % 360 for cusp in house_cusps[-12:]]
+    ascendant, midheaven = ((angle - REFERENCE_AYANAMSA) % 360 for angle in ascmc[:2])
+
+    for data in planets.values():
+        data.update(classify(data['longitude']))
+        data['house'] = house_of(data['longitude'], cusps)
+
+    return {
+        'planets': planets,
+        'cusps': cusps,
+        'cusp_lords': [classify(cusp) for cusp in cusps],
+        'ascendant': ascendant,
+        'ascendant_lords': classify(ascendant),
+        'midheaven': midheaven
+    }
+
+def compare_divisions(field, longitude, expected, actual, tolerance, divisions=DIVISION_BOUNDARIES):
+    """Compare categorical fields; a mismatch within tolerance of the division's edge is
+    a boundary skip. Returns (failures, boundary_skips)"""
+    failures = []
+    boundary_skips = 0
+    for division in divisions:
+        if division not in actual or actual[division] == expected[division]:
+            continue
+        if distance_to_boundary(longitude, DIVISION_BOUNDARIES[division]) <= tolerance:
+            boundary_skips += 1
+            continue
+        failures.append({'field': f'{field}.{division}',
+                         'expected': expected[division], 'actual': actual[division]})
+    return failures, boundary_skips
+
+def compare_results(reference, candidate):
+    """Compare every field the candidate provides; returns (failures, boundary_skips)"""
+    failures = []
+    boundary_skips = 0
+
+    for planet, expected in reference['planets'].items():
+        actual = candidate.get('planets', {}).get(planet)
+        if actual is None:
+            continue
+
+        if 'longitude' in actual:
+            diff = angular_difference(actual['longitude'], expected['longitude'])
+            if abs(diff) > TOLERANCES['planet_longitude']:
+                failures.append({'field': f'planets.{planet}.longitude',
+                                 'expected': expected['longitude'], 'actual': actual['longitude'],
+                                 'difference': diff})
+
+        if 'speed' in actual and abs(actual['speed'] - expected['speed']) > TOLERANCES['speed']:
+            failures.append({'field': f'planets.{planet}.speed',
+                             'expected': expected['speed'], 'actual': actual['speed'],
+                             'difference': actual['speed'] - expected['speed']})
+
+        division_failures, skips = compare_divisions(f'planets.{planet}', expected['longitude'], expected,
+                                                     actual, TOLERANCES['planet_longitude'])
+        failures += division_failures
+        boundary_skips += skips
+
+        if 'house' in actual and actual['house'] != expected['house']:
+            if distance_to_boundary(expected['longitude'], reference['cusps']) <= TOLERANCES['cusp']:
+                boundary_skips += 1
+            else:
+                failures.append({'field': f'planets.{planet}.house',
+                                 'expected': expected['house'], 'actual': actual['house']})
+
+    for i, cusp in enumerate(candidate.get('cusps') or []):
+        diff = angular_difference(cusp, reference['cusps'][i])
+        if abs(diff) > TOLERANCES['cusp']:
+            failures.append({'field': f'cusps.{i + 1}', 'expected': reference['cusps'][i],
+                             'actual': cusp, 'difference': diff})
+
+    for i, lords in enumerate(candidate.get('cusp_lords') or []):
+        division_failures, skips = compare_divisions(f'cusps.{i + 1}', reference['cusps'][i],
+                                                     reference['cusp_lords'][i], lords,
+                                                     TOLERANCES['cusp'], LORD_DIVISIONS)
+        failures += division_failures
+        boundary_skips += skips
+
+    if 'ascendant_lords' in candidate:
+        division_failures, skips = compare_divisions('ascendant', reference['ascendant'],
+                                                     reference['ascendant_lords'], candidate['ascendant_lords'],
+                                                     TOLERANCES['ascendant'], LORD_DIVISIONS)
+        failures += division_failures
+        boundary_skips += skips
+
+    for point in ('ascendant', 'midheaven'):
+        if point in candidate:
+            diff = angular_difference(candidate[point], reference[point])
+            if abs(diff) > TOLERANCES[point]:
+                failures.append({'field': point, 'expected': reference[point],
+                                 'actual': candidate[point], 'difference': diff})
+
+    return failures, boundary_skips
+
+def run_harness(engine_names=None, count=CORPUS_SIZE, seed=CORPUS_SEED, max_reported=20):
+    """Check each engine against the reference path and return a report per engine"""
+    cases = generate_cases(count, seed)
+    references = [reference_result(case) for case in cases]
+    report = {}
+
+    for name in engine_names or list(ENGINES):
+        engine = ENGINES[name]
+        engine_report = {'cases': len(cases), 'failed_cases': 0, 'field_failures': 0,
+                         'boundary_skips': 0, 'failures': []}
+
+        for case, reference in zip(cases, references):
+            try:
+                failures, skips = compare_results(reference, engine(case))
+            except Exception as e:
+                failures, skips = [{'field': 'engine', 'error': str(e)}], 0
+
+            engine_report['boundary_skips'] += skips
+            if failures:
+                engine_report['failed_cases'] += 1
+                engine_report['field_failures'] += len(failures)
+                if len(engine_report['failures']) < max_reported:
+                    engine_report['failures'].append({'input': case, 'fields': failures})
+
+        report[name] = engine_report
+
+    return report
+
+def complete_kp_engine(case):
+    """Adapter for complete_kp_analysis.calculate_complete_kp_chart"""
+    from complete_kp_analysis import calculate_complete_kp_chart
+
+    chart = calculate_complete_kp_chart({
+        'year': case['year'], 'month': case['month'], 'day': case['day'],
+        'hour': case['hour'], 'minute': case['minute'], 'second': case['second'],
+        'timezone_offset': 0, 'latitude': case['latitude'], 'longitude': case['longitude'],
+        'place_name': 'Golden corpus'
+    })
+
+    planets = {}
+    for planet, data in chart['rasi_chart'].items():
+        planets[planet] = {
+            'longitude': data['longitude'],
+            'speed': data['speed'],
+            'sign': data['sign'],
+            'nakshatra': data['nakshatra']['nakshatra'],
+            'pada': data['nakshatra']['pada'],
+            'star_lord': data['nakshatra']['star_lord'],
+            'sub_lord': data['sub_lord']['sub_lord']
+        }
+
+    houses = [chart['kp_houses'][f'house_{i}'] for i in range(1, 13)]
+    return {
+        'planets': planets,
+        'cusps': [house['cusp_longitude'] for house in houses],
+        'cusp_lords': [{'sign': house['sign'], 'star_lord': house['nakshatra']['star_lord'],
+                        'sub_lord': house['sub_lord']['sub_lord']} for house in houses]
+    }
+
+register_engine('complete_kp_analysis', complete_kp_engine)
+
+def vector_houses_engine(case):
+    """Adapter for the NumPy house cusps in kp_vector_houses"""
+    from kp_vector_houses import house_cusps
+    from kp_ayanamsa import kp_ayanamsa
+
+    result = house_cusps([case['jd_ut']], [case['latitude']], [case['longitude']], 'P',
+                         kp_ayanamsa(case['jd_ut']))
+    return {
+        'cusps': result['cusps'][0].tolist(),
+        'ascendant': float(result['ascendant'][0]),
+        'midheaven': float(result['midheaven'][0])
+    }
+
+register_engine('vector_houses', vector_houses_engine)
+
+def web_chart_engine(case):
+    """Adapter for web_kp_calculator.calculate_chart_for_web"""
+    from web_kp_calculator import calculate_chart_for_web
+
+    chart = calculate_chart_for_web({
+        'birthDate': f"{case['year']:04d}-{case['month']:02d}-{case['day']:02d}",
+        'birthTime': f"{case['hour']:02d}:{case['minute']:02d}:{case['second']:02d}",
+        'latitude': case['latitude'], 'longitude': case['longitude'], 'timezoneOffset': 0
+    })['chart']
+
+    planets = {}
+    for data in chart['planetary_positions']:
+        planets[data['planet']] = {
+            'longitude': data['longitude'],
+            'speed': data['speed'],
+            'sign': data['sign'],
+            'nakshatra': data['nakshatra'],
+            'pada': data['pada'],
+            'star_lord': data['nakshatra_lord'],
+            'sub_lord': data['sub_lord'],
+            'house': data['house']
+        }
+
+    ascendant = chart['special_points']['ascendant']
+    return {
+        'planets': planets,
+        'cusps': [house['longitude'] for house in chart['houses']],
+        'cusp_lords': [{'sign': house['sign'], 'sub_lord': house['sub_lord']} for house in chart['houses']],
+        'ascendant': ascendant['longitude'],
+        'ascendant_lords': {'sign': ascendant['sign']},
+        'midheaven': chart['special_points']['midheaven']['longitude']
+    }
+
+register_engine('web_kp_calculator', web_chart_engine)
+
+def ascendant_timeline_engine(case):
+    """Adapter for the cached ascendant sub schedule in kp_ascendant_timeline"""
+    from kp_ascendant_timeline import ascendant_sub_at
+
+    sub = ascendant_sub_at(case['jd_ut'], case['latitude'], case['longitude'], 'UTC')
+    return {'ascendant_lords': {'sign': sub.sign, 'star_lord': sub.star_lord, 'sub_lord': sub.sub_lord}}
+
+register_engine('ascendant_timeline', ascendant_timeline_engine)
+
+def main():
+    """Run the harness from the command line"""
+    parser = argparse.ArgumentParser(description="Check optimized engines against reference swisseph results")
+    parser.add_argument('--engine', action='append', dest='engines', choices=sorted(ENGINES),
+                        help="engine to check (repeatable, default all)")
+    parser.add_argument('--count', type=int, default=CORPUS_SIZE, help="number of corpus cases")
+    parser.add_argument('--seed', type=int, default=CORPUS_SEED, help="corpus random seed")
+    parser.add_argument('--json', action='store_true', help="print the full report as JSON")
+    args = parser.parse_args()
+
+    report = run_harness(args.engines, args.count, args.seed)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print("GOLDEN-OUTPUT ACCURACY HARNESS")
+        print("=" * 80)
+        for name, engine_report in report.items():
+            status = "PASS" if engine_report['failed_cases'] == 0 else "FAIL"
+            print(f"{name:30} {status}  cases: {engine_report['cases']}  "
+                  f"failed: {engine_report['failed_cases']}  boundary skips: {engine_report['boundary_skips']}")
+            for failure in engine_report['failures']:
+                print(f"    input: {json.dumps(failure['input'])}")
+                for field in failure['fields']:
+                    print(f"        {json.dumps(field)}")
+
+    return 1 if any(r['failed_cases'] for r in report.values()) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
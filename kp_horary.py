@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+KP Horary (Prashna) Charts
+The querent's number from 1 to 249 fixes the ascendant at the start of that sub.
+The ARMC that puts that point on the horizon at the query latitude is solved in
+closed form, the remaining cusps follow from it, and planets come from the
+per-minute position cache, so a horary chart needs a single houses call
+"""
+
+import sys
+import json
+import argparse
+
+import numpy as np
+import swisseph as swe
+
+from web_kp_calculator import format_dms, get_planet_house
+from kp_ayanamsa import AYANAMSA_NAME, kp_ayanamsa, to_sidereal
+from kp_sub_table import SUB_TABLE, sub_division
+from kp_ascendant_timeline import armc_for_ascendant
+from kp_ephemeris_cache import current_jd, planet_positions
+from kp_gazetteer import resolve_place
+
+def horary_ascendant(number):
+    """Sidereal ascendant of a KP horary number: the start of sub `number`"""
+    if not 1 <= number <= len(SUB_TABLE):
+        raise ValueError(f"Horary number must be between 1 and {len(SUB_TABLE)}")
+    return SUB_TABLE[number - 1].start
+
+def horary_cusps(number, latitude, jd_ut):
+    """Sidereal Placidus cusps (12) with cusp 1 on the horary ascendant, in the frame
+    of the planets at jd_ut"""
+    obliquity = swe.calc_ut(jd_ut, swe.ECL_NUT)[0][0]
+    armc = float(armc_for_ascendant(horary_ascendant(number) + kp_ayanamsa(jd_ut), obliquity, latitude))
+    if np.isnan(armc):
+        raise ValueError("Horary cusps are not defined inside the polar circles")
+
+    cusps, ascmc = swe.houses_armc(armc, latitude, obliquity, b'P')
+    # Cusp 1 is the horary ascendant up to rounding; keep it exact
+    sidereal = to_sidereal(cusps[-12:], jd_ut).tolist()
+    sidereal[0] = horary_ascendant(number)
+    return sidereal, float(to_sidereal(ascmc[1], jd_ut))
+
+def _point(longitude):
+    sub = sub_division(longitude)
+    return {
+        'longitude': longitude,
+        'degree': format_dms(longitude % 30),
+        'sign': sub.sign,
+        'nakshatra': sub.nakshatra,
+        'star_lord': sub.star_lord,
+        'sub_lord': sub.sub_lord
+    }
+
+def horary_chart(number, latitude, longitude, jd_ut=None):
+    """KP horary chart for a number at a place, at jd_ut (default: now)"""
+    jd_ut = current_jd() if jd_ut is None else jd_ut
+    cusps, midheaven = horary_cusps(number, latitude, jd_ut)
+
+    houses = [dict(_point(cusp), house=i) for i, cusp in enumerate(cusps, 1)]
+    planets = []
+    for name, position in planet_positions(jd_ut).items():
+        planet = dict(_point(position['longitude']), planet=name, speed=position['speed'])
+        planet['retrograde'] = position['speed'] < 0 and name not in ('Sun', 'Moon', 'Rahu', 'Ketu')
+        planet['house'] = get_planet_house(position['longitude'], houses)
+        planets.append(planet)
+
+    return {
+        'horary_number': number,
+        'jd_ut': jd_ut,
+        'coordinates': {'latitude': latitude, 'longitude': longitude},
+        'ayanamsa': AYANAMSA_NAME,
+        'ascendant': dict(_point(cusps[0]), sub=number),
+        'midheaven': _point(midheaven),
+        'houses': houses,
+        'planetary_positions': planets
+    }
+
+def main():
+    """Cast a horary chart from the command line"""
+    parser = argparse.ArgumentParser(description="KP horary chart for a number from 1 to 249")
+    parser.add_argument('number', type=int)
+    parser.add_argument('--place', help="query place, looked up in the gazetteer")
+    parser.add_argument('--lat', type=float)
+    parser.add_argument('--lon', type=float)
+    parser.add_argument('--jd', type=float, help="UT Julian day of the query (default: now)")
+    args = parser.parse_args()
+
+    latitude, longitude = args.lat, args.lon
+    if latitude is None or longitude is None:
+        place = resolve_place(args.place)
+        if place is None:
+            print(json.dumps({'error': "Give --lat/--lon or a known --place"}))
+            sys.exit(1)
+        latitude, longitude = place['latitude'], place['longitude']
+
+    try:
+        chart = horary_chart(args.number, latitude, longitude, args.jd)
+    except ValueError as e:
+        print(json.dumps({'error': str(e)}))
+        sys.exit(1)
+    print(json.dumps(chart, indent=2))
+
+if __name__ == "__main__":
+    main()
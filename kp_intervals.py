@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Interval Algebra
+Sets of half-open time intervals [start, end) held as a pair of sorted float64 arrays
+with disjoint, non-touching members. Union, intersection and complement are merges
+over the sorted arrays, so combining conditions over months of boundary catalogs
+costs microseconds rather than a chart per minute
+"""
+
+import numpy as np
+
+def _pair(starts, ends):
+    return np.asarray(starts, dtype=np.float64), np.asarray(ends, dtype=np.float64)
+
+def empty():
+    """The empty interval set"""
+    return _pair([], [])
+
+def normalize(starts, ends):
+    """Interval set from arbitrary intervals: sorted, empty ones dropped, overlapping
+    and touching ones merged"""
+    starts, ends = _pair(starts, ends)
+    keep = ends > starts
+    starts, ends = starts[keep], ends[keep]
+    if not len(starts):
+        return starts, ends
+    order = np.argsort(starts, kind='stable')
+    starts, ends = starts[order], ends[order]
+
+    # A new run begins wherever a start lies beyond every earlier end
+    reach = np.maximum.accumulate(ends)
+    begins = np.concatenate([[True], starts[1:] > reach[:-1]])
+    last = np.concatenate([np.flatnonzero(begins)[1:] - 1, [len(starts) - 1]])
+    return starts[begins], reach[last]
+
+def from_divisions(times, divisions, first, wanted, jd_start, jd_end):
+    """Intervals within [jd_start, jd_end) during which a division in wanted is in force
+
+    times are sorted boundary times, divisions[k] the division entered at times[k] and
+    first the division in force before times[0], as in the crossing catalogs.
+    """
+    times = np.asarray(times, dtype=np.float64)
+    divisions = np.asarray(divisions)
+    low = int(np.searchsorted(times, jd_start, side='right'))
+    high = int(np.searchsorted(times, jd_end, side='left'))
+    in_force = first if low == 0 else divisions[low - 1]
+
+    starts = np.concatenate([[jd_start], times[low:high]])
+    ends = np.concatenate([times[low:high], [jd_end]])
+    codes = np.concatenate([[in_force], divisions[low:high]])
+    keep = np.isin(codes, list(wanted))
+    return normalize(starts[keep], ends[keep])
+
+def union(*sets):
+    """Union of interval sets"""
+    if not sets:
+        return empty()
+    return normalize(np.concatenate([s for s, _ in sets]), np.concatenate([e for _, e in sets]))
+
+def intersect(a, b):
+    """Intersection of two interval sets"""
+    a_starts, a_ends = a
+    b_starts, b_ends = b
+    # b intervals overlapping each a interval form a contiguous run [first, last)
+    first = np.searchsorted(b_ends, a_starts, side='right')
+    last = np.searchsorted(b_starts, a_ends, side='left')
+    counts = np.maximum(last - first, 0)
+    a_index = np.repeat(np.arange(len(a_starts)), counts)
+    b_index = (np.repeat(first - np.cumsum(counts) + counts, counts)
+               + np.arange(counts.sum()))
+    starts = np.maximum(a_starts[a_index], b_starts[b_index])
+    ends = np.minimum(a_ends[a_index], b_ends[b_index])
+    keep = ends > starts
+    return starts[keep], ends[keep]
+
+def intersect_all(*sets):
+    """Intersection of one or more interval sets"""
+    result = sets[0]
+    for other in sets[1:]:
+        result = intersect(result, other)
+    return result
+
+def complement(a, jd_start, jd_end):
+    """[jd_start, jd_end) minus an interval set"""
+    starts, ends = intersect(a, _pair([jd_start], [jd_end]))
+    return normalize(np.concatenate([[jd_start], ends]), np.concatenate([starts, [jd_end]]))
+
+def difference(a, b):
+    """Members of a not covered by b"""
+    starts, ends = a
+    if not len(starts):
+        return a
+    return intersect(a, complement(b, starts[0], ends[-1]))
+
+def total(a):
+    """Summed length of an interval set"""
+    starts, ends = a
+    return float(np.sum(ends - starts))
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Astro-Locality Grid
+For one birth moment, the ascendant sign and sub-lord, the MC sign and the house of
+every planet across a latitude/longitude grid. Planets are computed once, cusps are
+evaluated vectorized per tile of grid rows, and tiles can run in parallel processes
+"""
+
+import os
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import swisseph as swe
+
+from web_kp_calculator import SIGNS, parse_birth_input
+from kp_ayanamsa import kp_ayanamsa, sidereal_calc
+from kp_sub_table import SUB_TABLE, VIMSHOTTARI_ORDER, sub_index
+from kp_vector_houses import house_cusps
+
+PLANETS = {
+    'Sun': swe.SUN, 'Moon': swe.MOON, 'Mercury': swe.MERCURY,
+    'Venus': swe.VENUS, 'Mars': swe.MARS, 'Jupiter': swe.JUPITER,
+    'Saturn': swe.SATURN, 'Rahu': swe.MEAN_NODE
+}
+
+# Sub-lords are reported as indexes into SUB_LORDS; the lord of each of the 249 subs
+SUB_LORDS = VIMSHOTTARI_ORDER
+SUB_LORD_OF_SUB = np.array([SUB_LORDS.index(sub.sub_lord) for sub in SUB_TABLE], dtype=np.int8)
+
+# Grid rows evaluated together; bounds the memory of the (cells, 12) cusp array
+TILE_ROWS = 64
+
+def birth_julian_day(input_data):
+    """UT Julian day of a calculate_chart_for_web style input"""
+    birth = parse_birth_input(input_data)
+    decimal_time = birth['hour'] + birth['minute'] / 60 + birth['second'] / 3600
+    return swe.julday(birth['year'], birth['month'], birth['day'], decimal_time - birth['timezone_offset'])
+
+def planet_longitudes(jd_ut):
+    """Sidereal longitudes of the chart planets plus Ketu, computed once per grid"""
+    longitudes = {name: sidereal_calc(jd_ut, planet_id)[0] for name, planet_id in PLANETS.items()}
+    longitudes['Ketu'] = (longitudes['Rahu'] + 180) % 360
+    return longitudes
+
+def sub_lord_index(longitude):
+    """Vectorized KP sub-lord of sidereal longitudes, as an index into SUB_LORDS"""
+    return SUB_LORD_OF_SUB[sub_index(longitude)]
+
+def planet_houses(planet_longitude, cusps):
+    """Vectorized get_planet_house: house number per row of (cells, 12) cusps"""
+    offset = (planet_longitude - cusps) % 360
+    width = (np.roll(cusps, -1, axis=-1) - cusps) % 360
+    return np.argmax(offset < width, axis=-1) + 1
+
+def evaluate_tile(jd_ut, latitudes, longitudes, planet_array):
+    """Per-cell arrays for one tile: rows of latitudes by columns of longitudes"""
+    lat_grid, lon_grid = np.meshgrid(latitudes, longitudes, indexing='ij')
+    result = house_cusps(jd_ut, lat_grid.ravel(), lon_grid.ravel(), 'P', kp_ayanamsa(jd_ut))
+    shape = lat_grid.shape
+
+    houses = np.stack([planet_houses(longitude, result['cusps']) for longitude in planet_array])
+    return {
+        'ascendant': result['ascendant'].reshape(shape).astype(np.float32),
+        'ascendant_sign': (result['ascendant'] // 30).reshape(shape).astype(np.int8),
+        'ascendant_sub_lord': sub_lord_index(result['ascendant']).reshape(shape).astype(np.int8),
+        'midheaven_sign': (result['midheaven'] // 30).reshape(shape).astype(np.int8),
+        'planet_houses': houses.reshape((len(planet_array),) + shape).astype(np.int8),
+        'fallback': result['fallback'].reshape(shape)
+    }
+
+def _evaluate_tile_args(args):
+    return evaluate_tile(*args)
+
+def grid_axis(start, stop, step):
+    """Inclusive axis of cell centres from start to stop"""
+    count = int(round((stop - start) / step)) + 1
+    return start + step * np.arange(count)
+
+def locality_grid(input_data, lat_range=(-60.0, 60.0), lon_range=(-180.0, 180.0), step=1.0,
+                  tile_rows=TILE_ROWS, workers=1):
+    """Relocation grid for one birth moment
+
+    input_data is a calculate_chart_for_web input (only the birth moment is used).
+    Cells inside the polar circles use Porphyry cusps and are marked in 'fallback'.
+    Signs are 0-11 indexes into SIGNS, sub-lords indexes into SUB_LORDS, houses 1-12.
+    """
+    jd_ut = birth_julian_day(input_data)
+    planets = planet_longitudes(jd_ut)
+    planet_array = np.array(list(planets.values()))
+
+    latitudes = grid_axis(lat_range[0], lat_range[1], step)
+    longitudes = grid_axis(lon_range[0], lon_range[1] - (step if lon_range[1] - lon_range[0] >= 360 else 0), step)
+    tiles = [(jd_ut, latitudes[start:start + tile_rows], longitudes, planet_array)
+             for start in range(0, len(latitudes), tile_rows)]
+
+    if workers > 1 and len(tiles) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_evaluate_tile_args, tiles))
+    else:
+        results = [evaluate_tile(*tile) for tile in tiles]
+
+    # Tiles split the latitude axis, which is the second-to-last axis of every array
+    grid = {key: np.concatenate([r[key] for r in results], axis=-2) for key in results[0]}
+    grid.update({
+        'jd_ut': jd_ut,
+        'latitudes': latitudes,
+        'longitudes': longitudes,
+        'planets': list(planets),
+        'planet_longitudes': planets,
+        'signs': SIGNS,
+        'sub_lords': SUB_LORDS
+    })
+    return grid
+
+def grid_to_json(grid):
+    """Grid with arrays converted to nested lists"""
+    return {key: value.tolist() if isinstance(value, np.ndarray) else value for key, value in grid.items()}
+
+def main():
+    """Compute a locality grid from the command line"""
+    parser = argparse.ArgumentParser(description="Ascendant and house placements across a lat/lon grid")
+    parser.add_argument('input', help="birth data as JSON (calculate_chart_for_web format)")
+    parser.add_argument('--lat', nargs=2, type=float, default=(-60.0, 60.0), metavar=('MIN', 'MAX'))
+    parser.add_argument('--lon', nargs=2, type=float, default=(-180.0, 180.0), metavar=('MIN', 'MAX'))
+    parser.add_argument('--step', type=float, default=1.0, help="grid spacing in degrees")
+    parser.add_argument('--tile-rows', type=int, default=TILE_ROWS, help="latitude rows per tile")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="parallel processes")
+    parser.add_argument('--npz', help="write the arrays to this .npz file instead of printing JSON")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    grid = locality_grid(json.loads(args.input), args.lat, args.lon, args.step, args.tile_rows, args.workers)
+    elapsed = time.perf_counter() - start
+
+    if args.npz:
+        np.savez_compressed(args.npz, **{k: v for k, v in grid.items() if isinstance(v, np.ndarray)})
+        cells = grid['ascendant_sign'].size
+        print(json.dumps({'file': args.npz, 'cells': cells, 'seconds': round(elapsed, 3),
+                          'per_cell_us': round(elapsed / cells * 1e6, 3)}, indent=2))
+    else:
+        print(json.dumps(grid_to_json(grid)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+In-Process Metrics for the Python Calculation Worker
+Request counts, latency histograms, cache hit rates, ephemeris call counts,
+per-body error counts and memory, rendered in Prometheus text format
+"""
+
+import os
+import sys
+import resource
+import threading
+from collections import defaultdict
+
+import kp_timing
+from kp_timing import Histogram, HISTOGRAM_BUCKETS_MS
+
+# Requests are served on one thread, but the prefetch thread counts ephemeris calls
+# and the exporter iterates the dicts, so every update and snapshot takes the lock
+_metrics_lock = threading.Lock()
+_requests = defaultdict(int)
+_request_errors = defaultdict(int)
+_body_errors = defaultdict(int)
+_ephemeris_calls = defaultdict(int)
+_cache_hits = defaultdict(int)
+_cache_misses = defaultdict(int)
+_latency = {}
+
+def observe_request(entry, elapsed_ms, success=True):
+    """Count one request to an entry point and record its latency"""
+    with _metrics_lock:
+        _requests[entry] += 1
+        if not success:
+            _request_errors[entry] += 1
+        histogram = _latency.get(entry)
+        if histogram is None:
+            histogram = _latency[entry] = Histogram()
+        histogram.observe(elapsed_ms)
+
+def count_body_error(body):
+    """Count a per-body calculation failure (the {'error': str(e)} branches)"""
+    with _metrics_lock:
+        _body_errors[body] += 1
+
+def count_ephemeris_calls(function, calls=1):
+    """Count swisseph calls, e.g. count_ephemeris_calls('calc_ut', 8)"""
+    with _metrics_lock:
+        _ephemeris_calls[function] += calls
+
+def count_cache(cache, hit):
+    """Record a cache lookup result"""
+    with _metrics_lock:
+        if hit:
+            _cache_hits[cache] += 1
+        else:
+            _cache_misses[cache] += 1
+
+def reset_metrics():
+    """Zero every counter and histogram"""
+    with _metrics_lock:
+        for counter in (_requests, _request_errors, _body_errors, _ephemeris_calls,
+                        _cache_hits, _cache_misses, _latency):
+            counter.clear()
+
+def _snapshot():
+    """Copies of every counter and histogram, taken together under the lock"""
+    with _metrics_lock:
+        counters = {name: dict(counter) for name, counter in (
+            ('requests', _requests), ('request_errors', _request_errors), ('body_errors', _body_errors),
+            ('ephemeris_calls', _ephemeris_calls), ('cache_hits', _cache_hits),
+            ('cache_misses', _cache_misses))}
+        latency = {entry: histogram.copy() for entry, histogram in _latency.items()}
+    return counters, latency
+
+def current_rss_bytes():
+    """Current resident set size, or None where /proc is unavailable"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+def peak_rss_bytes():
+    """Peak resident set size (ru_maxrss is bytes on macOS, KB on Linux)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def _escape(value):
+    """Escape a Prometheus label value"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _counter_lines(name, help_text, label, values):
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+    for key, value in sorted(values.items()):
+        lines.append(f'{name}{{{label}="{_escape(key)}"}} {value}')
+    return lines
+
+def _histogram_lines(name, help_text, label, histograms):
+    """Histogram series in seconds, converted from millisecond buckets"""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for key, data in sorted(histograms.items()):
+        key = _escape(key)
+        running = 0
+        for bound, bucket_count in zip(HISTOGRAM_BUCKETS_MS + ('+Inf',), data.counts):
+            running += bucket_count
+            le = bound if bound == '+Inf' else repr(bound / 1000)
+            lines.append(f'{name}_bucket{{{label}="{key}",le="{le}"}} {running}')
+        lines.append(f'{name}_sum{{{label}="{key}"}} {data.sum_ms / 1000!r}')
+        lines.append(f'{name}_count{{{label}="{key}"}} {data.count}')
+    return lines
+
+def render_prometheus():
+    """Render every metric in Prometheus text exposition format"""
+    counters, latency = _snapshot()
+    lines = []
+    lines += _counter_lines('kp_requests_total', "Requests per entry point.", 'entry', counters['requests'])
+    lines += _counter_lines('kp_request_errors_total', "Failed requests per entry point.", 'entry',
+                            counters['request_errors'])
+    lines += _histogram_lines('kp_request_duration_seconds', "Request latency per entry point.",
+                              'entry', latency)
+    lines += _counter_lines('kp_body_errors_total', "Per-body calculation errors.", 'body', counters['body_errors'])
+    lines += _counter_lines('kp_ephemeris_calls_total', "Swiss Ephemeris calls.", 'function',
+                            counters['ephemeris_calls'])
+    lines += _counter_lines('kp_cache_hits_total', "Cache hits.", 'cache', counters['cache_hits'])
+    lines += _counter_lines('kp_cache_misses_total', "Cache misses.", 'cache', counters['cache_misses'])
+
+    # Stage histograms are only populated when kp_timing aggregation is enabled
+    stages = dict(kp_timing.histogram_items())
+    lines += _histogram_lines('kp_stage_duration_seconds', "Chart pipeline stage duration.", 'stage', stages)
+
+    rss = current_rss_bytes()
+    lines += ["# HELP kp_process_peak_rss_bytes Peak resident set size.",
+              "# TYPE kp_process_peak_rss_bytes gauge",
+              f"kp_process_peak_rss_bytes {peak_rss_bytes()}"]
+    if rss is not None:
+        lines += ["# HELP kp_process_rss_bytes Current resident set size.",
+                  "# TYPE kp_process_rss_bytes gauge",
+                  f"kp_process_rss_bytes {rss}"]
+
+    return '\n'.join(lines) + '\n'
+
+if __name__ == "__main__":
+    print(render_prometheus(), end='')
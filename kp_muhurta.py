@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Muhurta (Electional) Search
+Each condition of an election (Moon nakshatra, tithi, ascendant sign, weekday,
+daytime, Rahu kalam and the other inauspicious periods) becomes a sorted interval set
+read off a boundary catalog: the persisted Moon pada catalog, a tithi crossing
+catalog, the ascendant crossing times and the vectorized sunrise and sunset solver.
+The conditions are then combined with interval algebra and the surviving windows
+ranked, instead of testing a chart minute by minute
+"""
+
+import sys
+import json
+import time
+import argparse
+from datetime import date, timedelta
+
+import numpy as np
+
+from web_kp_calculator import NAKSHATRAS, SIGNS
+from kp_crossings import TITHI, angle_crossings
+from kp_nakshatra_catalog import get_catalog as get_nakshatra_catalog
+from kp_ascendant_timeline import ascendant_crossings, sidereal_ascendant
+from kp_sub_table import SUB_STARTS
+from kp_panchang import (TITHI_NAMES, RAHU_KALAM_PART, YAMAGANDAM_PART, GULIKA_PART,
+                         sun_table, rise_set, sun_always_up, _daytime_part)
+from kp_timezones import local_datetimes_to_jd, jd_to_local
+from kp_gazetteer import resolve_place
+import kp_intervals as intervals
+
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+SIGN_GROUPS = {
+    'movable': ['Aries', 'Cancer', 'Libra', 'Capricorn'],
+    'fixed': ['Taurus', 'Leo', 'Scorpio', 'Aquarius'],
+    'dual': ['Gemini', 'Virgo', 'Sagittarius', 'Pisces']
+}
+
+KALAMS = {'rahu_kalam': RAHU_KALAM_PART, 'yamagandam': YAMAGANDAM_PART, 'gulika': GULIKA_PART}
+
+DEFAULT_MIN_MINUTES = 10
+DEFAULT_LIMIT = 20
+
+def _indexes(values, names, kind):
+    """0-based indexes for names (case-insensitive) or 1-based numbers"""
+    lookup = {name.lower(): i for i, name in enumerate(names)}
+    indexes = set()
+    for value in values:
+        if isinstance(value, int) and 1 <= value <= len(names):
+            indexes.add(value - 1)
+        elif isinstance(value, str) and value.lower() in lookup:
+            indexes.add(lookup[value.lower()])
+        else:
+            raise ValueError(f"Unknown {kind}: {value}")
+    return indexes
+
+class MuhurtaSearch:
+    """Condition interval sets for one place and range of local days, each computed
+    once and reused across searches"""
+
+    def __init__(self, place, start, days):
+        start = start if isinstance(start, date) else date.fromisoformat(start)
+        self.place = place
+        self.zone_name = place['timezone']
+        self.days = [start + timedelta(days=i) for i in range(days + 1)]
+        # Local midnights of every day and of the day after the range
+        self.midnights = local_datetimes_to_jd(self.zone_name, np.array([np.datetime64(d) for d in self.days]))
+        self.jd_start, self.jd_end = float(self.midnights[0]), float(self.midnights[-1])
+        self._table = None
+        self._sun = None
+        self._tithi = None
+        self._ascendant = None
+
+    def _sunrise_sunset(self):
+        if self._sun is None:
+            self._table = sun_table(self.jd_start - 1, self.jd_end + 2)
+            self._sun = rise_set(self._table, self.midnights, self.place['latitude'], self.place['longitude'])
+        return self._sun
+
+    def nakshatra(self, names):
+        """Moon in any of the given nakshatras"""
+        wanted = _indexes(names, NAKSHATRAS, 'nakshatra')
+        catalog = get_nakshatra_catalog()
+        low = int(np.searchsorted(catalog.times, self.jd_start, side='right'))
+        high = int(np.searchsorted(catalog.times, self.jd_end, side='left'))
+        first = (catalog.codes[low - 1] if low > 0 else catalog.first_code) // 4
+        return intervals.from_divisions(catalog.times[low:high], catalog.codes[low:high] // 4, first,
+                                        wanted, self.jd_start, self.jd_end)
+
+    def tithi(self, values):
+        """Any of the given tithis (names or numbers 1-30)"""
+        wanted = _indexes(values, TITHI_NAMES, 'tithi')
+        if self._tithi is None:
+            angle_rate, step = TITHI
+            self._tithi = angle_crossings(angle_rate, self.jd_start, self.jd_end, step)
+        catalog = self._tithi
+        return intervals.from_divisions(catalog.times, catalog.entered, catalog.first, wanted,
+                                        self.jd_start, self.jd_end)
+
+    def ascendant_sign(self, values):
+        """Ascendant in any of the given signs; 'movable', 'fixed' and 'dual' name groups"""
+        names = [sign for value in values for sign in SIGN_GROUPS.get(str(value).lower(), [value])]
+        wanted = _indexes(names, SIGNS, 'sign')
+        if self._ascendant is None:
+            latitude, longitude = self.place['latitude'], self.place['longitude']
+            times, subs = ascendant_crossings(self.jd_start, self.jd_end, latitude, longitude)
+            # Sign boundaries are sub boundaries, so the sign entered is that of the sub
+            signs = (SUB_STARTS[subs] // 30).astype(int)
+            first = int(sidereal_ascendant(self.jd_start, latitude, longitude) // 30)
+            self._ascendant = times, signs, first
+        times, signs, first = self._ascendant
+        return intervals.from_divisions(times, signs, first, wanted, self.jd_start, self.jd_end)
+
+    def weekday(self, names):
+        """Any of the given weekdays, each running from sunrise to the next sunrise"""
+        wanted = _indexes(names, WEEKDAYS, 'weekday')
+        sunrise, _ = self._sunrise_sunset()
+        # Polar days without a sunrise fall back to the civil day
+        bounds = np.where(np.isnan(sunrise), self.midnights, sunrise)
+        weekdays = np.array([d.weekday() for d in self.days[:-1]])
+        keep = np.isin(weekdays, list(wanted))
+        result = intervals.normalize(bounds[:-1][keep], bounds[1:][keep])
+        return intervals.intersect(result, (np.array([self.jd_start]), np.array([self.jd_end])))
+
+    def daytime(self):
+        """Between sunrise and sunset
+
+        Near the poles a day without a sunset is daytime from sunrise to the next
+        midnight, one without a sunrise from midnight to sunset, and a polar day
+        without either all day; a polar night has no daytime.
+        """
+        sunrise, sunset = self._sunrise_sunset()
+        sunrise, sunset = sunrise[:-1], sunset[:-1]
+        midnights, next_midnights = self.midnights[:-1], self.midnights[1:]
+        starts = np.where(np.isnan(sunrise), midnights, sunrise)
+        ends = np.where(np.isnan(sunset), next_midnights, sunset)
+        polar = np.isnan(sunrise) & np.isnan(sunset)
+        keep = ~polar | sun_always_up(self._table, midnights + 0.5, self.place['latitude'])
+        return intervals.normalize(starts[keep], ends[keep])
+
+    def kalam(self, name):
+        """Rahu kalam, Yamagandam or Gulika kalam of each day"""
+        if name not in KALAMS:
+            raise ValueError(f"Unknown period: {name}")
+        sunrise, sunset = self._sunrise_sunset()
+        weekdays = np.array([d.weekday() for d in self.days[:-1]])
+        starts, ends = _daytime_part(sunrise[:-1], sunset[:-1], weekdays, KALAMS[name])
+        valid = ~np.isnan(starts)
+        return intervals.normalize(starts[valid], ends[valid])
+
+    def windows(self, conditions):
+        """Interval set satisfying every condition
+
+        conditions is a dict with any of nakshatra, tithi, ascendant_sign and weekday
+        (lists of names or numbers), daytime (bool) and avoid (list of rahu_kalam,
+        yamagandam, gulika).
+        """
+        sets = [(np.array([self.jd_start]), np.array([self.jd_end]))]
+        for key, method in (('nakshatra', self.nakshatra), ('tithi', self.tithi),
+                            ('ascendant_sign', self.ascendant_sign), ('weekday', self.weekday)):
+            if conditions.get(key):
+                sets.append(method(conditions[key]))
+        if conditions.get('daytime'):
+            sets.append(self.daytime())
+        result = intervals.intersect_all(*sets)
+        avoid = [self.kalam(name) for name in conditions.get('avoid', [])]
+        return intervals.difference(result, intervals.union(*avoid)) if avoid else result
+
+    def search(self, conditions, min_minutes=DEFAULT_MIN_MINUTES, limit=DEFAULT_LIMIT):
+        """Windows satisfying the conditions, longest first (earliest first on ties)"""
+        starts, ends = self.windows(conditions)
+        minutes = (ends - starts) * 1440
+        keep = np.flatnonzero(minutes >= min_minutes)
+        order = keep[np.lexsort((starts[keep], -minutes[keep]))][:limit]
+        return [{
+            'rank': rank + 1,
+            'start': jd_to_local(self.zone_name, float(starts[i])).isoformat(timespec='minutes'),
+            'end': jd_to_local(self.zone_name, float(ends[i])).isoformat(timespec='minutes'),
+            'minutes': round(float(minutes[i]), 1),
+            'jd_start': float(starts[i]),
+            'jd_end': float(ends[i])
+        } for rank, i in enumerate(order)]
+
+def find_muhurta(place, start, days, conditions, min_minutes=DEFAULT_MIN_MINUTES, limit=DEFAULT_LIMIT):
+    """Ranked windows at a place (a resolve_place record) over local days"""
+    return MuhurtaSearch(place, start, days).search(conditions, min_minutes, limit)
+
+def main():
+    """Search for auspicious windows at a place"""
+    parser = argparse.ArgumentParser(description="Muhurta window search")
+    parser.add_argument('place')
+    parser.add_argument('conditions', help='JSON, e.g. {"nakshatra": ["Rohini"], "avoid": ["rahu_kalam"]}')
+    parser.add_argument('--start', default=date.today().isoformat(), help="first date, YYYY-MM-DD")
+    parser.add_argument('--days', type=int, default=60)
+    parser.add_argument('--min-minutes', type=float, default=DEFAULT_MIN_MINUTES)
+    parser.add_argument('--limit', type=int, default=DEFAULT_LIMIT)
+    args = parser.parse_args()
+
+    place = resolve_place(args.place)
+    if place is None:
+        print(json.dumps({'error': f"Unknown place: {args.place}"}))
+        sys.exit(1)
+    try:
+        conditions = json.loads(args.conditions)
+        started = time.perf_counter()
+        windows = find_muhurta(place, args.start, args.days, conditions, args.min_minutes, args.limit)
+    except ValueError as e:
+        print(json.dumps({'error': str(e)}))
+        sys.exit(1)
+    print(json.dumps({'place': place['name'], 'windows': windows,
+                      'seconds': round(time.perf_counter() - started, 3)}, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Moon Nakshatra and Pada Ingress Catalog
+Every lunar pada ingress from 1900 to 2100, root-found once and stored as a float64
+array of UT Julian days plus a uint8 pada code (nakshatra * 4 + pada - 1). Nakshatra
+and Moon sign ingresses are the padas that start them, so nakshatra-of-the-day, Tara
+Bala and Chandrashtama are bisections and range scans over memory-mapped arrays
+"""
+
+import os
+import sys
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import swisseph as swe
+
+from web_kp_calculator import NAKSHATRAS, SIGNS, STAR_LORDS
+from kp_ayanamsa import AYANAMSA_NAME
+from kp_crossings import moon_longitude, angle_crossings
+from kp_timezones import jd_to_local, local_to_jd
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CATALOG_DIR = os.environ.get('KP_NAKSHATRA_CATALOG', os.path.join(BASE_DIR, 'data', 'nakshatra_catalog'))
+
+# Bump when the catalog layout or generation changes so stale catalogs are rebuilt
+CATALOG_VERSION = 2
+
+FIRST_YEAR = 1900
+LAST_YEAR = 2100
+PADA_STEP = 360 / 108
+PADAS_PER_SIGN = 9
+BUILD_CHUNK_YEARS = 10
+
+TARAS = ['Janma', 'Sampat', 'Vipat', 'Kshema', 'Pratyak', 'Sadhana', 'Naidhana', 'Mitra', 'Parama Mitra']
+FAVOURABLE_TARAS = {'Sampat', 'Kshema', 'Sadhana', 'Mitra', 'Parama Mitra'}
+
+def _signature():
+    return {'version': CATALOG_VERSION, 'ayanamsa': AYANAMSA_NAME, 'first_year': FIRST_YEAR,
+            'last_year': LAST_YEAR, 'swisseph': swe.version}
+
+def _build_chunk(args):
+    jd_start, jd_end = args
+    catalog = angle_crossings(moon_longitude, jd_start, jd_end, PADA_STEP)
+    return catalog.times, catalog.entered.astype(np.uint8), catalog.first
+
+def build_catalog(catalog_dir=CATALOG_DIR, workers=None):
+    """Root-find every pada ingress of the range and write the catalog arrays"""
+    edges = [swe.julday(year, 1, 1, 0) for year in range(FIRST_YEAR, LAST_YEAR + 2, BUILD_CHUNK_YEARS)]
+    edges[-1] = swe.julday(LAST_YEAR + 1, 1, 1, 0)
+    chunks = list(zip(edges[:-1], edges[1:]))
+
+    workers = workers or os.cpu_count() or 1
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_build_chunk, chunks))
+    else:
+        parts = [_build_chunk(chunk) for chunk in chunks]
+
+    arrays = {'times': np.concatenate([times for times, _, _ in parts]),
+              'codes': np.concatenate([codes for _, codes, _ in parts])}
+
+    os.makedirs(catalog_dir, exist_ok=True)
+    for name, array in arrays.items():
+        temporary = os.path.join(catalog_dir, f'{name}.tmp.npy')
+        np.save(temporary, array)
+        os.replace(temporary, os.path.join(catalog_dir, f'{name}.npy'))
+
+    # meta.json is written last and marks the catalog as complete
+    meta = dict(_signature(), start=edges[0], end=edges[-1], first_code=parts[0][2],
+                count=len(arrays['times']))
+    temporary = os.path.join(catalog_dir, 'meta.tmp.json')
+    with open(temporary, 'w') as f:
+        json.dump(meta, f)
+    os.replace(temporary, os.path.join(catalog_dir, 'meta.json'))
+
+def _span(code, start, end):
+    nakshatra, pada = divmod(int(code), 4)
+    return {
+        'nakshatra': NAKSHATRAS[nakshatra],
+        'nakshatra_number': nakshatra + 1,
+        'star_lord': STAR_LORDS[nakshatra],
+        'pada': pada + 1,
+        'sign': SIGNS[int(code) // PADAS_PER_SIGN],
+        'start': start,
+        'end': end
+    }
+
+class NakshatraCatalog:
+    """Read-only pada ingress catalog over memory-mapped arrays"""
+
+    def __init__(self, catalog_dir=CATALOG_DIR):
+        meta_path = os.path.join(catalog_dir, 'meta.json')
+        meta = None
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+        # Building takes minutes, so it is a deploy step rather than a side effect of a request
+        if meta is None or any(meta.get(k) != v for k, v in _signature().items()):
+            raise RuntimeError(f"Nakshatra catalog in {catalog_dir} is missing or stale; "
+                               "build it with: python3 kp_nakshatra_catalog.py build")
+
+        self.start = meta['start']
+        self.end = meta['end']
+        self.first_code = meta['first_code']
+        self.times = np.load(os.path.join(catalog_dir, 'times.npy'), mmap_mode='r')
+        self.codes = np.load(os.path.join(catalog_dir, 'codes.npy'), mmap_mode='r')
+
+    def _check(self, jd_ut):
+        if not self.start <= jd_ut < self.end:
+            raise ValueError(f"Date outside the catalog ({FIRST_YEAR}-{LAST_YEAR})")
+
+    def _bounds(self, position):
+        start = float(self.times[position - 1]) if position > 0 else None
+        end = float(self.times[position]) if position < len(self.times) else None
+        code = self.codes[position - 1] if position > 0 else self.first_code
+        return code, start, end
+
+    def pada_at(self, jd_ut):
+        """Moon's nakshatra and pada at a UT Julian day, with the pada's start and end"""
+        self._check(jd_ut)
+        return _span(*self._bounds(int(np.searchsorted(self.times, jd_ut, side='right'))))
+
+    def nakshatra_at(self, jd_ut):
+        """Moon's nakshatra at a UT Julian day, with the nakshatra's start and end"""
+        self._check(jd_ut)
+        position = int(np.searchsorted(self.times, jd_ut, side='right'))
+        code, start, end = self._bounds(position)
+        # Walk to the first and past the last pada of this nakshatra (at most 3 steps each)
+        pada = int(code) % 4
+        if pada and position - pada > 0:
+            start = float(self.times[position - 1 - pada])
+        last = position + 3 - pada
+        end = float(self.times[last]) if last < len(self.times) else None
+        span = _span(code, start, end)
+        del span['pada']
+        return span
+
+    def padas(self, jd_start, jd_end):
+        """Every pada the Moon occupies during [jd_start, jd_end), with full spans"""
+        self._check(jd_start)
+        first = int(np.searchsorted(self.times, jd_start, side='right'))
+        last = int(np.searchsorted(self.times, jd_end, side='left'))
+        return [_span(*self._bounds(position)) for position in range(first, last + 1)]
+
+    def nakshatras(self, jd_start, jd_end):
+        """Every nakshatra the Moon occupies during [jd_start, jd_end), with full spans"""
+        spans = []
+        jd = jd_start
+        while jd < jd_end:
+            span = self.nakshatra_at(jd)
+            spans.append(span)
+            if span['end'] is None:
+                break
+            jd = span['end']
+        return spans
+
+    def sign_spans(self, jd_start, jd_end):
+        """(sign index, start, end) of the Moon's signs overlapping [jd_start, jd_end)"""
+        self._check(jd_start)
+        # Widen by a sign's worth of padas either side so the edge signs are complete
+        first = max(int(np.searchsorted(self.times, jd_start, side='right')) - PADAS_PER_SIGN, 0)
+        last = min(int(np.searchsorted(self.times, jd_end, side='left')) + PADAS_PER_SIGN, len(self.times))
+
+        spans = []
+        for position in range(first, last + 1):
+            code, start, end = self._bounds(position)
+            sign = int(code) // PADAS_PER_SIGN
+            if spans and spans[-1][0] == sign:
+                spans[-1] = (sign, spans[-1][1], end)
+            else:
+                spans.append((sign, start, end))
+        return [(sign, start, end) for sign, start, end in spans
+                if (end is None or end > jd_start) and (start is None or start < jd_end)]
+
+_catalog = None
+
+def get_catalog():
+    """Process-wide catalog; raises RuntimeError until `kp_nakshatra_catalog.py build` has been run"""
+    global _catalog
+    if _catalog is None:
+        _catalog = NakshatraCatalog()
+    return _catalog
+
+def tara_bala(natal_nakshatra, jd_ut):
+    """Tara of the transiting Moon's nakshatra counted from a natal nakshatra (1-27)"""
+    span = get_catalog().nakshatra_at(jd_ut)
+    tara = TARAS[(span['nakshatra_number'] - natal_nakshatra) % 27 % 9]
+    return dict(span, tara=tara, favourable=tara in FAVOURABLE_TARAS)
+
+def chandrashtama_periods(natal_moon_sign, jd_start, jd_end):
+    """Periods in [jd_start, jd_end) when the Moon transits the 8th sign from the natal
+    Moon sign (0-11), as (start, end) UT Julian days"""
+    eighth = (natal_moon_sign + 7) % 12
+    return [(start, end) for sign, start, end in get_catalog().sign_spans(jd_start, jd_end)
+            if sign == eighth]
+
+def _local_time(zone_name, jd_ut):
+    return None if jd_ut is None else jd_to_local(zone_name, jd_ut).isoformat(timespec='minutes')
+
+def main():
+    """Command line: build | at <jd> | day <YYYY-MM-DD> [zone]"""
+    if len(sys.argv) < 2 or sys.argv[1] not in ('build', 'at', 'day'):
+        print("Usage: python3 kp_nakshatra_catalog.py build | at <jd> | day <YYYY-MM-DD> [zone]",
+              file=sys.stderr)
+        sys.exit(1)
+
+    command = sys.argv[1]
+    if command == 'build':
+        build_catalog()
+        catalog = get_catalog()
+        result = {'catalog': CATALOG_DIR, 'rows': len(catalog.times)}
+    elif command == 'at':
+        catalog = get_catalog()
+        jd = float(sys.argv[2])
+        result = {'pada': catalog.pada_at(jd), 'nakshatra': catalog.nakshatra_at(jd)}
+    else:
+        year, month, day = map(int, sys.argv[2].split('-'))
+        zone_name = sys.argv[3] if len(sys.argv) > 3 else 'Asia/Kolkata'
+        jd_start = local_to_jd(zone_name, year, month, day)
+        # Spans at the edges of the catalog are open-ended (start or end None)
+        result = [dict(span, start_local=_local_time(zone_name, span['start']),
+                       end_local=_local_time(zone_name, span['end']))
+                  for span in get_catalog().nakshatras(jd_start, jd_start + 1)]
+
+    print(json.dumps(result, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Panchang Generator
+Sunrise, sunset, tithi, nakshatra, yoga and karana with end times, and Rahu kalam,
+Yamagandam and Gulika kalam, per (city, date), as columnar arrays.
+
+Tithi, nakshatra, yoga and karana boundaries do not depend on the place, so each is
+one root-found crossing catalog for the whole range, looked up at every city's
+sunrise (at local midnight on polar days and nights, when the Sun does not rise). Sunrise and sunset are solved vectorized for all cities and days from an
+hourly table of the Sun's apparent RA and declination
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import date, timedelta
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import swisseph as swe
+
+from web_kp_calculator import NAKSHATRAS
+from kp_ayanamsa import AYANAMSA_NAME
+from kp_crossings import TITHI, KARANA, NAKSHATRA, YOGA, angle_crossings
+from kp_vector_houses import sidereal_frame
+from kp_timezones import local_datetimes_to_jd, jd_to_local
+from kp_gazetteer import resolve_place
+
+TITHIS = ['Pratipada', 'Dwitiya', 'Tritiya', 'Chaturthi', 'Panchami', 'Shashthi', 'Saptami',
+          'Ashtami', 'Navami', 'Dashami', 'Ekadashi', 'Dwadashi', 'Trayodashi', 'Chaturdashi']
+TITHI_NAMES = ([f"Shukla {name}" for name in TITHIS] + ['Purnima']
+               + [f"Krishna {name}" for name in TITHIS] + ['Amavasya'])
+
+YOGAS = ['Vishkambha', 'Priti', 'Ayushman', 'Saubhagya', 'Shobhana', 'Atiganda', 'Sukarma',
+         'Dhriti', 'Shula', 'Ganda', 'Vriddhi', 'Dhruva', 'Vyaghata', 'Harshana', 'Vajra',
+         'Siddhi', 'Vyatipata', 'Variyana', 'Parigha', 'Shiva', 'Siddha', 'Sadhya', 'Shubha',
+         'Shukla', 'Brahma', 'Indra', 'Vaidhriti']
+
+MOVABLE_KARANAS = ['Bava', 'Balava', 'Kaulava', 'Taitila', 'Garaja', 'Vanija', 'Vishti']
+KARANA_NAMES = (['Kimstughna'] + [MOVABLE_KARANAS[i % 7] for i in range(56)]
+                + ['Shakuni', 'Chatushpada', 'Naga'])
+
+# Which eighth of the daytime (1-8) each period occupies, Monday first as in date.weekday()
+RAHU_KALAM_PART = [2, 7, 5, 6, 4, 3, 8]
+YAMAGANDAM_PART = [4, 3, 2, 1, 7, 6, 5]
+GULIKA_PART = [6, 5, 4, 3, 2, 1, 7]
+
+# Altitude of the Sun's centre at rise and set, refraction included; matches
+# swe.rise_trans with BIT_DISC_CENTER and its default atmosphere
+SUNRISE_ALTITUDE = -0.6099
+SUN_TABLE_STEP_DAYS = 1 / 24
+RISE_ITERATIONS = 4
+SOLAR_DAY_RATE = 360.0  # degrees of hour angle per day for the Sun
+
+DIVISIONS = {'tithi': TITHI, 'nakshatra': NAKSHATRA, 'yoga': YOGA, 'karana': KARANA}
+# Most divisions in force between two sunrises: the one at sunrise and those starting
+# before the next (karanas last about half a day, so up to three of them start)
+DIVISIONS_PER_DAY = {'tithi': 3, 'nakshatra': 3, 'yoga': 3, 'karana': 4}
+DIVISION_NAMES = {'tithi': TITHI_NAMES, 'nakshatra': NAKSHATRAS, 'yoga': YOGAS, 'karana': KARANA_NAMES}
+
+def sun_table(jd_start, jd_end):
+    """Hourly apparent right ascension (unwrapped) and declination of the Sun"""
+    jds = np.arange(jd_start, jd_end + SUN_TABLE_STEP_DAYS, SUN_TABLE_STEP_DAYS)
+    equatorial = np.array([swe.calc_ut(jd, swe.SUN, swe.FLG_EQUATORIAL)[0][:2] for jd in jds])
+    return jds, np.degrees(np.unwrap(np.radians(equatorial[:, 0]))), equatorial[:, 1]
+
+def _sun_at(table, jd_ut):
+    jds, right_ascension, declination = table
+    return np.interp(jd_ut, jds, right_ascension), np.interp(jd_ut, jds, declination)
+
+def _wrap(angle):
+    return (angle + 180) % 360 - 180
+
+def rise_set(table, local_midnight, latitude, longitude):
+    """Sunrise and sunset UT Julian days for arrays of local midnights (NaN if none)
+
+    The Sun's transit nearest to civil noon is found first, then rise and set are
+    refined from it by Newton steps on the hour angle.
+    """
+    transit = local_midnight + 0.5
+    for _ in range(RISE_ITERATIONS):
+        right_ascension, _ = _sun_at(table, transit)
+        armc, _ = sidereal_frame(transit, longitude)
+        transit = transit - _wrap(armc - right_ascension) / SOLAR_DAY_RATE
+
+    phi = np.radians(latitude)
+    events = []
+    for sign in (-1, 1):
+        moment = transit.copy()
+        for _ in range(RISE_ITERATIONS):
+            right_ascension, declination = _sun_at(table, moment)
+            delta = np.radians(declination)
+            cos_arc = ((np.sin(np.radians(SUNRISE_ALTITUDE)) - np.sin(phi) * np.sin(delta))
+                       / (np.cos(phi) * np.cos(delta)))
+            semi_arc = np.degrees(np.arccos(np.where(np.abs(cos_arc) <= 1, cos_arc, np.nan)))
+            armc, _ = sidereal_frame(moment, longitude)
+            moment = moment + _wrap(sign * semi_arc - (armc - right_ascension)) / SOLAR_DAY_RATE
+        events.append(moment)
+    return events[0], events[1]
+
+def sun_always_up(table, jd_ut, latitude):
+    """Whether the Sun stays above the rising altitude all day at UT Julian day(s): a
+    polar day, as opposed to a polar night, where rise_set finds no sunrise"""
+    _, declination = _sun_at(table, jd_ut)
+    phi, delta = np.radians(latitude), np.radians(declination)
+    cos_arc = ((np.sin(np.radians(SUNRISE_ALTITUDE)) - np.sin(phi) * np.sin(delta))
+               / (np.cos(phi) * np.cos(delta)))
+    return cos_arc < -1
+
+def _daytime_part(sunrise, sunset, weekdays, parts):
+    """Start and end of the given eighth of the daytime"""
+    eighth = (sunset - sunrise) / 8
+    start = sunrise + (np.asarray(parts)[weekdays] - 1) * eighth
+    return start, start + eighth
+
+def _city_columns(args):
+    """Columns for one city: arrays over days"""
+    city, days, catalogs, table = args
+    local_midnights = np.array([np.datetime64(day) for day in days + [days[-1] + timedelta(days=1)]])
+    midnights = local_datetimes_to_jd(city['timezone'], local_midnights)
+    sunrise, sunset = rise_set(table, midnights, city['latitude'], city['longitude'])
+    # Days without a sunrise are reckoned from local midnight
+    day_start = np.where(np.isnan(sunrise), midnights, sunrise)
+    today_sunrise, today_sunset = sunrise[:-1], sunset[:-1]
+    weekdays = np.array([day.weekday() for day in days])
+
+    columns = {'sunrise': today_sunrise, 'sunset': today_sunset, 'polar': np.isnan(today_sunrise),
+               'day_start': day_start[:-1], 'next_day_start': day_start[1:]}
+    for name, catalog in catalogs.items():
+        columns[name] = catalog.index_at(day_start[:-1]).astype(np.int8)
+        columns[f'{name}_ends'] = np.stack([catalog.end_after(day_start[:-1], skip=skip)
+                                            for skip in range(DIVISIONS_PER_DAY[name])], axis=-1)
+    for name, parts in (('rahu_kalam', RAHU_KALAM_PART), ('yamagandam', YAMAGANDAM_PART),
+                        ('gulika', GULIKA_PART)):
+        columns[f'{name}_start'], columns[f'{name}_end'] = _daytime_part(
+            today_sunrise, today_sunset, weekdays, parts)
+    return columns
+
+def panchang(cities, start, days, workers=1):
+    """Columnar panchang for cities x days
+
+    cities are dicts with name, latitude, longitude and timezone (as resolve_place
+    returns). Every column is a (cities, days) array; times are UT Julian days (NaN
+    for a sunrise, sunset or kalam that does not happen) and division columns are
+    0-based indexes into the *_NAMES lists. A day runs from day_start, the sunrise or
+    local midnight when polar is set, to next_day_start. *_ends is (cities, days,
+    DIVISIONS_PER_DAY) with the end of the division in force at day_start and of those
+    after it; every end before next_day_start starts another division that day.
+    """
+    start = start if isinstance(start, date) else date.fromisoformat(start)
+    day_list = [start + timedelta(days=i) for i in range(days)]
+
+    # Local days span UT offsets of -12..+14 h; catalogs must reach past the last next
+    # day start far enough to hold DIVISIONS_PER_DAY more boundaries
+    jd_start = swe.julday(start.year, start.month, start.day, 0) - 1
+    jd_end = jd_start + days + 6
+    catalogs = {name: angle_crossings(angle_rate, jd_start, jd_end, step)
+                for name, (angle_rate, step) in DIVISIONS.items()}
+    table = sun_table(jd_start, jd_end)
+
+    tasks = [(city, day_list, catalogs, table) for city in cities]
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            per_city = list(pool.map(_city_columns, tasks, chunksize=max(1, len(tasks) // (4 * workers))))
+    else:
+        per_city = [_city_columns(task) for task in tasks]
+
+    result = {key: np.stack([columns[key] for columns in per_city]) for key in per_city[0]}
+    result.update({
+        'cities': [city['name'] for city in cities],
+        'timezones': [city['timezone'] for city in cities],
+        'dates': [day.isoformat() for day in day_list],
+        'ayanamsa': AYANAMSA_NAME
+    })
+    return result
+
+def _local(jd_ut, zone_name):
+    return None if np.isnan(jd_ut) else jd_to_local(zone_name, float(jd_ut)).isoformat(timespec='minutes')
+
+def panchang_rows(result):
+    """Per (city, date) dicts with names and local times, for display"""
+    rows = []
+    for c, city in enumerate(result['cities']):
+        zone_name = result['timezones'][c]
+        for d, day in enumerate(result['dates']):
+            row = {'city': city, 'date': day,
+                   'sunrise': _local(result['sunrise'][c, d], zone_name),
+                   'sunset': _local(result['sunset'][c, d], zone_name),
+                   'polar': bool(result['polar'][c, d])}
+            next_day_start = result['next_day_start'][c, d]
+            for name, names in DIVISION_NAMES.items():
+                index = int(result[name][c, d])
+                ends = result[f'{name}_ends'][c, d]
+                row[name] = [{'name': names[index], 'ends': _local(ends[0], zone_name)}]
+                # Further divisions begin before the next day starts
+                for k in range(1, len(ends)):
+                    if not ends[k - 1] < next_day_start:
+                        break
+                    row[name].append({'name': names[(index + k) % len(names)],
+                                      'ends': _local(ends[k], zone_name)})
+            for name in ('rahu_kalam', 'yamagandam', 'gulika'):
+                row[name] = {'start': _local(result[f'{name}_start'][c, d], zone_name),
+                             'end': _local(result[f'{name}_end'][c, d], zone_name)}
+            rows.append(row)
+    return rows
+
+def main():
+    """Generate a panchang for cities over a date range"""
+    parser = argparse.ArgumentParser(description="Panchang for cities and a date range")
+    parser.add_argument('cities', nargs='*', help="city names, looked up in the gazetteer")
+    parser.add_argument('--cities-file', help="file with one city name per line")
+    parser.add_argument('--start', default=date.today().isoformat(), help="first date, YYYY-MM-DD")
+    parser.add_argument('--days', type=int, default=1)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--npz', help="write the columns to this .npz file instead of printing JSON rows")
+    args = parser.parse_args()
+
+    names = list(args.cities)
+    if args.cities_file:
+        with open(args.cities_file, encoding='utf-8') as f:
+            names += [line.strip() for line in f if line.strip()]
+
+    cities = []
+    for name in names:
+        place = resolve_place(name)
+        if place is None:
+            print(json.dumps({'error': f"Unknown city: {name}"}))
+            sys.exit(1)
+        cities.append(place)
+    if not cities:
+        parser.error("no cities given")
+
+    started = time.perf_counter()
+    result = panchang(cities, args.start, args.days, args.workers)
+    elapsed = time.perf_counter() - started
+
+    if args.npz:
+        np.savez_compressed(args.npz, **{k: v for k, v in result.items() if isinstance(v, np.ndarray)},
+                            cities=np.array(result['cities']), timezones=np.array(result['timezones']),
+                            dates=np.array(result['dates']))
+        print(json.dumps({'file': args.npz, 'cities': len(cities), 'days': args.days,
+                          'seconds': round(elapsed, 3)}, indent=2))
+    else:
+        print(json.dumps(panchang_rows(result), indent=2, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
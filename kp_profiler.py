@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+On-Demand Profiling for Slow Chart Requests
+Wraps calculation entry points in cProfile when asked, or in a low-overhead stack
+sampler that keeps the profile only when a request exceeds a latency threshold
+
+Environment:
+    KP_PROFILE=1             profile every request with cProfile
+    KP_PROFILE_SLOW_MS=250   sample every request, keep profiles slower than 250 ms
+    KP_PROFILE_SAMPLE_MS=1   stack sampling interval
+    KP_PROFILE_DIR=profiles  output directory (rotated)
+    KP_PROFILE_KEEP=50       number of profiles kept
+"""
+
+import os
+import sys
+import json
+import time
+import pstats
+import cProfile
+import threading
+from collections import Counter
+from datetime import datetime
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+PROFILE_ALWAYS = os.environ.get('KP_PROFILE') == '1'
+SLOW_THRESHOLD_MS = float(os.environ.get('KP_PROFILE_SLOW_MS', '0'))
+SAMPLE_INTERVAL = float(os.environ.get('KP_PROFILE_SAMPLE_MS', '1')) / 1000
+PROFILE_DIR = os.environ.get('KP_PROFILE_DIR', os.path.join(BASE_DIR, 'profiles'))
+PROFILE_KEEP = int(os.environ.get('KP_PROFILE_KEEP', '50'))
+
+_sequence = 0
+_sequence_lock = threading.Lock()
+
+class StackSampler:
+    """Samples one thread's Python stack from a persistent background thread
+
+    The sampler thread sleeps on an event between requests, so arming and
+    disarming it costs two event operations per request.
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.armed = threading.Event()
+        self.lock = threading.Lock()
+        self.samples = Counter()
+        self.target = None
+        self.thread = None
+
+    def start(self):
+        """Begin sampling the calling thread"""
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name='kp-sampler', daemon=True)
+            self.thread.start()
+        with self.lock:
+            self.samples = Counter()
+            self.target = threading.get_ident()
+        self.armed.set()
+
+    def stop(self):
+        """Stop sampling and return the collapsed stack counts"""
+        self.armed.clear()
+        with self.lock:
+            samples, self.samples = self.samples, Counter()
+            self.target = None
+        return samples
+
+    def _run(self):
+        while True:
+            self.armed.wait()
+            with self.lock:
+                frame = sys._current_frames().get(self.target)
+                if frame is not None:
+                    self.samples[collapse_stack(frame)] += 1
+            time.sleep(self.interval)
+
+def collapse_stack(frame):
+    """Render a frame chain as a root-first 'a;b;c' flame graph stack"""
+    parts = []
+    while frame is not None:
+        code = frame.f_code
+        parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ';'.join(reversed(parts))
+
+_sampler = None
+
+def _get_sampler():
+    global _sampler
+    if _sampler is None:
+        _sampler = StackSampler()
+    return _sampler
+
+def _next_stem(entry):
+    global _sequence
+    with _sequence_lock:
+        _sequence += 1
+        sequence = _sequence
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+    return f"{stamp}_{entry}_{os.getpid()}_{sequence:05d}"
+
+def rotate_profiles(directory=PROFILE_DIR, keep=PROFILE_KEEP):
+    """Delete the oldest profiles so at most `keep` remain"""
+    stems = {}
+    for filename in os.listdir(directory):
+        stem, _ = os.path.splitext(filename)
+        path = os.path.join(directory, filename)
+        stems.setdefault(stem, []).append(path)
+
+    ordered = sorted(stems, key=lambda stem: min(os.path.getmtime(p) for p in stems[stem]))
+    for stem in ordered[:max(len(ordered) - keep, 0)]:
+        for path in stems[stem]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+def write_profile(entry, input_data, trigger, elapsed_ms, profile=None, samples=None):
+    """Store a profile next to a JSON file describing the request that produced it"""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    stem = os.path.join(PROFILE_DIR, _next_stem(entry))
+
+    if profile is not None:
+        profile.dump_stats(stem + '.pstats')
+    if samples is not None:
+        with open(stem + '.collapsed', 'w') as f:
+            for stack, count in samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+    with open(stem + '.json', 'w') as f:
+        json.dump({
+            'entry': entry,
+            'trigger': trigger,
+            'elapsed_ms': round(elapsed_ms, 3),
+            'threshold_ms': SLOW_THRESHOLD_MS or None,
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'input': input_data
+        }, f, indent=2, default=str)
+
+    rotate_profiles()
+    return stem
+
+def run_profiled(entry, func, input_data, force=False):
+    """Call func(input_data), profiling it when requested or when it turns out slow
+
+    cProfile is used when force is set (the request 'profile' flag) or KP_PROFILE=1.
+    Otherwise, with KP_PROFILE_SLOW_MS set, the stack sampler runs and its profile
+    is written only if the call exceeds the threshold.
+    """
+    if force or PROFILE_ALWAYS:
+        profile = cProfile.Profile()
+        start = time.perf_counter()
+        try:
+            return profile.runcall(func, input_data)
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            write_profile(entry, input_data, 'requested', elapsed_ms, profile=profile)
+
+    if SLOW_THRESHOLD_MS <= 0:
+        return func(input_data)
+
+    sampler = _get_sampler()
+    sampler.start()
+    start = time.perf_counter()
+    try:
+        return func(input_data)
+    finally:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        samples = sampler.stop()
+        if elapsed_ms > SLOW_THRESHOLD_MS:
+            write_profile(entry, input_data, 'slow', elapsed_ms, samples=samples)
+
+def main():
+    """Print the top functions of a stored .pstats profile"""
+    if len(sys.argv) != 2:
+        print("Usage: python3 kp_profiler.py <profile.pstats>", file=sys.stderr)
+        sys.exit(1)
+
+    pstats.Stats(sys.argv[1]).sort_stats('cumulative').print_stats(30)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+KP Ruling Planets
+Day lord, Moon sign/star/sub lords and ascendant sign/star/sub lords for a moment
+and place. The Moon comes from the per-minute position cache shared by every place,
+the ascendant sub from the cached per-location day schedule and sunrise from a
+per-day cache, so repeated queries make no ephemeris calls
+"""
+
+import sys
+import json
+import argparse
+from datetime import timedelta
+from functools import lru_cache
+
+import swisseph as swe
+
+from ultimate_kp_system import get_sign_lord
+from kp_sub_table import sub_division
+from kp_ephemeris_cache import current_jd, planet_positions
+from kp_ascendant_timeline import ascendant_sub_at
+from kp_timezones import resolve_zone, local_to_jd, jd_to_local
+from kp_gazetteer import resolve_place
+
+# Lords of the weekdays, Monday first as in date.weekday()
+DAY_LORDS = ['Moon', 'Mars', 'Mercury', 'Jupiter', 'Venus', 'Saturn', 'Sun']
+
+SUNRISE_CACHE_SIZE = 4096
+
+@lru_cache(maxsize=SUNRISE_CACHE_SIZE)
+def _sunrise(day, zone_name, latitude, longitude):
+    """UT Julian day of the first sunrise of a local day, or None if the Sun does not rise"""
+    jd_midnight = local_to_jd(zone_name, day.year, day.month, day.day)
+    result, times = swe.rise_trans(jd_midnight, swe.SUN, swe.CALC_RISE | swe.BIT_DISC_CENTER,
+                                   (longitude, latitude, 0))
+    if result != 0 or times[0] - jd_midnight >= 1:
+        return None
+    return times[0]
+
+def day_lord(jd_ut, latitude, longitude, zone_name):
+    """Lord of the weekday, which in KP runs from sunrise to sunrise"""
+    day = jd_to_local(zone_name, jd_ut).date()
+    sunrise = _sunrise(day, zone_name, round(latitude, 2), round(longitude, 2))
+    # Polar days without a sunrise keep the civil weekday
+    if sunrise is not None and jd_ut < sunrise:
+        day -= timedelta(days=1)
+    return DAY_LORDS[day.weekday()]
+
+def _lords(sub):
+    return {
+        'sign': sub.sign,
+        'sign_lord': get_sign_lord(sub.sign),
+        'nakshatra': sub.nakshatra,
+        'star_lord': sub.star_lord,
+        'sub_lord': sub.sub_lord
+    }
+
+def ruling_planets(jd_ut, latitude, longitude, timezone_name=None):
+    """KP ruling planets at a UT moment and place
+
+    'ruling_planets' lists each planet once, in the order ascendant sign, star and
+    sub lords, Moon sign, star and sub lords, day lord.
+    """
+    zone_name = resolve_zone(timezone_name, latitude, longitude)
+    moon = _lords(sub_division(planet_positions(jd_ut)['Moon']['longitude']))
+    ascendant = _lords(ascendant_sub_at(jd_ut, latitude, longitude, zone_name))
+    lord_of_day = day_lord(jd_ut, latitude, longitude, zone_name)
+
+    ordered = [ascendant['sign_lord'], ascendant['star_lord'], ascendant['sub_lord'],
+               moon['sign_lord'], moon['star_lord'], moon['sub_lord'], lord_of_day]
+    return {
+        'jd_ut': jd_ut,
+        'local_time': jd_to_local(zone_name, jd_ut).isoformat(timespec='seconds'),
+        'timezone': zone_name,
+        'coordinates': {'latitude': latitude, 'longitude': longitude},
+        'day_lord': lord_of_day,
+        'moon': moon,
+        'ascendant': ascendant,
+        'ruling_planets': list(dict.fromkeys(ordered))
+    }
+
+def current_ruling_planets(latitude, longitude, timezone_name=None):
+    """Ruling planets now"""
+    return ruling_planets(current_jd(), latitude, longitude, timezone_name)
+
+def main():
+    """Print the ruling planets for a place (default: now)"""
+    parser = argparse.ArgumentParser(description="KP ruling planets for a moment and place")
+    parser.add_argument('--place', help="place, looked up in the gazetteer")
+    parser.add_argument('--lat', type=float)
+    parser.add_argument('--lon', type=float)
+    parser.add_argument('--timezone', help="IANA zone; defaults to the zone at the coordinates")
+    parser.add_argument('--jd', type=float, help="UT Julian day (default: now)")
+    args = parser.parse_args()
+
+    latitude, longitude, zone_name = args.lat, args.lon, args.timezone
+    if latitude is None or longitude is None:
+        place = resolve_place(args.place)
+        if place is None:
+            print(json.dumps({'error': "Give --lat/--lon or a known --place"}))
+            sys.exit(1)
+        latitude, longitude = place['latitude'], place['longitude']
+        zone_name = zone_name or place['timezone']
+
+    try:
+        result = ruling_planets(current_jd() if args.jd is None else args.jd, latitude, longitude, zone_name)
+    except ValueError as e:
+        print(json.dumps({'error': str(e)}))
+        sys.exit(1)
+    print(json.dumps(result, indent=2))
+
+if __name__ == "__main__":
+    main()
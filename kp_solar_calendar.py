@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Solar Ingress (Sankranti) Catalog and Tamil Month Calendar
+Every sidereal solar pada ingress from 1800 to 2200 is root-found once and stored as
+float64 UT Julian days plus uint8 pada codes; sign (Sankranti) and nakshatra ingresses
+are the padas that start them. Civil month start dates follow from each ingress and
+the place's sunrise and sunset, cached per city and year, so calendar queries are
+table lookups
+"""
+
+import os
+import sys
+import json
+from bisect import bisect_right
+from datetime import date, timedelta
+from functools import lru_cache
+
+import numpy as np
+import swisseph as swe
+
+from web_kp_calculator import NAKSHATRAS, SIGNS
+from kp_ayanamsa import AYANAMSA_NAME
+from kp_crossings import sun_longitude, angle_crossings
+from kp_timezones import jd_to_local, local_to_jd
+from kp_gazetteer import resolve_place
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CATALOG_DIR = os.environ.get('KP_SOLAR_CATALOG', os.path.join(BASE_DIR, 'data', 'solar_catalog'))
+
+# Bump when the catalog layout or generation changes so stale catalogs are rebuilt
+CATALOG_VERSION = 2
+
+FIRST_YEAR = 1800
+LAST_YEAR = 2200
+PADA_STEP = 360 / 108
+PADAS_PER_SIGN = 9
+PADAS_PER_NAKSHATRA = 4
+SAMPLE_DAYS = 1.0
+
+TAMIL_MONTHS = ['Chithirai', 'Vaikasi', 'Aani', 'Aadi', 'Aavani', 'Purattasi',
+                'Aippasi', 'Karthigai', 'Margazhi', 'Thai', 'Maasi', 'Panguni']
+
+# Which civil day a solar month starts on, given the ingress (UT JD) and that local day's
+# sunrise and sunset: True when the ingress day itself is day 1, else the next day is
+RULES = {
+    # Tamil: ingress before sunset
+    'tamil': lambda ingress, sunrise, sunset: ingress < sunset,
+    # Malayalam: ingress before the end of the first three fifths of the daytime
+    'malayalam': lambda ingress, sunrise, sunset: ingress < sunrise + 0.6 * (sunset - sunrise),
+    # Month begins with the first sunrise after the ingress
+    'sunrise': lambda ingress, sunrise, sunset: ingress < sunrise
+}
+
+MONTH_CACHE_SIZE = 8192
+
+def _signature():
+    return {'version': CATALOG_VERSION, 'ayanamsa': AYANAMSA_NAME, 'first_year': FIRST_YEAR,
+            'last_year': LAST_YEAR, 'swisseph': swe.version}
+
+def build_catalog(catalog_dir=CATALOG_DIR):
+    """Root-find every solar pada ingress of the range and write the catalog arrays"""
+    jd_start = swe.julday(FIRST_YEAR, 1, 1, 0)
+    jd_end = swe.julday(LAST_YEAR + 1, 1, 1, 0)
+    catalog = angle_crossings(sun_longitude, jd_start, jd_end, PADA_STEP, SAMPLE_DAYS)
+    arrays = {'times': catalog.times, 'codes': catalog.entered.astype(np.uint8)}
+
+    os.makedirs(catalog_dir, exist_ok=True)
+    for name, array in arrays.items():
+        temporary = os.path.join(catalog_dir, f'{name}.tmp.npy')
+        np.save(temporary, array)
+        os.replace(temporary, os.path.join(catalog_dir, f'{name}.npy'))
+
+    # meta.json is written last and marks the catalog as complete
+    meta = dict(_signature(), start=jd_start, end=jd_end, first_code=catalog.first,
+                count=len(catalog.times))
+    temporary = os.path.join(catalog_dir, 'meta.tmp.json')
+    with open(temporary, 'w') as f:
+        json.dump(meta, f)
+    os.replace(temporary, os.path.join(catalog_dir, 'meta.json'))
+
+class SolarIngressCatalog:
+    """Read-only solar pada ingress catalog over memory-mapped arrays"""
+
+    def __init__(self, catalog_dir=CATALOG_DIR):
+        meta_path = os.path.join(catalog_dir, 'meta.json')
+        meta = None
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+        # Building takes minutes, so it is a deploy step rather than a side effect of a request
+        if meta is None or any(meta.get(k) != v for k, v in _signature().items()):
+            raise RuntimeError(f"Solar ingress catalog in {catalog_dir} is missing or stale; "
+                               "build it with: python3 kp_solar_calendar.py build")
+
+        self.start = meta['start']
+        self.end = meta['end']
+        self.first_code = meta['first_code']
+        self.times = np.load(os.path.join(catalog_dir, 'times.npy'), mmap_mode='r')
+        self.codes = np.load(os.path.join(catalog_dir, 'codes.npy'), mmap_mode='r')
+
+    def _check(self, jd_ut):
+        if not self.start <= jd_ut < self.end:
+            raise ValueError(f"Date outside the catalog ({FIRST_YEAR}-{LAST_YEAR})")
+
+    def _ingresses(self, jd_start, jd_end, padas_per_division):
+        """(division index, UT JD) of ingresses into whole divisions during [jd_start, jd_end)"""
+        self._check(jd_start)
+        first = int(np.searchsorted(self.times, jd_start, side='left'))
+        last = int(np.searchsorted(self.times, jd_end, side='left'))
+        codes = np.asarray(self.codes[first:last], dtype=np.int64)
+        starts = np.flatnonzero(codes % padas_per_division == 0)
+        return [(int(codes[i]) // padas_per_division, float(self.times[first + i])) for i in starts]
+
+    def sign_ingresses(self, jd_start, jd_end):
+        """(sign index, UT JD) of every Sankranti during [jd_start, jd_end)"""
+        return self._ingresses(jd_start, jd_end, PADAS_PER_SIGN)
+
+    def nakshatra_ingresses(self, jd_start, jd_end):
+        """(nakshatra index, UT JD) of every solar nakshatra ingress during [jd_start, jd_end)"""
+        return self._ingresses(jd_start, jd_end, PADAS_PER_NAKSHATRA)
+
+    def sun_pada_at(self, jd_ut):
+        """Sun's pada code (nakshatra * 4 + pada - 1) at a UT Julian day"""
+        self._check(jd_ut)
+        position = int(np.searchsorted(self.times, jd_ut, side='right'))
+        return int(self.codes[position - 1]) if position > 0 else self.first_code
+
+_catalog = None
+
+def get_catalog():
+    """Process-wide catalog; raises RuntimeError until `kp_solar_calendar.py build` has been run"""
+    global _catalog
+    if _catalog is None:
+        _catalog = SolarIngressCatalog()
+    return _catalog
+
+def _sun_event(jd_ut, latitude, longitude, flag):
+    result, times = swe.rise_trans(jd_ut, swe.SUN, flag | swe.BIT_DISC_CENTER, (longitude, latitude, 0))
+    return times[0] if result == 0 else None
+
+@lru_cache(maxsize=MONTH_CACHE_SIZE)
+def _month_starts(year, latitude, longitude, zone_name, rule):
+    """(civil start date, sign index, ingress UT JD) of the solar months whose ingress
+    falls in a Gregorian year, at a place"""
+    decide = RULES[rule]
+    jd_start = local_to_jd(zone_name, year, 1, 1)
+    jd_end = local_to_jd(zone_name, year + 1, 1, 1)
+
+    months = []
+    for sign, ingress in get_catalog().sign_ingresses(jd_start, jd_end):
+        day = jd_to_local(zone_name, ingress).date()
+        midnight = local_to_jd(zone_name, day.year, day.month, day.day)
+        sunrise = _sun_event(midnight, latitude, longitude, swe.CALC_RISE)
+        sunset = _sun_event(midnight, latitude, longitude, swe.CALC_SET)
+        # Without a sunrise or sunset (polar day or night) the ingress day is day 1
+        same_day = sunrise is None or sunset is None or decide(ingress, sunrise, sunset)
+        months.append((day if same_day else day + timedelta(days=1), sign, ingress))
+    return tuple(months)
+
+def _place_key(place):
+    return round(place['latitude'], 2), round(place['longitude'], 2), place['timezone']
+
+def month_table(place, year, rule='tamil'):
+    """Solar months starting in a Gregorian year at a place (a resolve_place record)"""
+    latitude, longitude, zone_name = _place_key(place)
+    months = _month_starts(year, latitude, longitude, zone_name, rule)
+    following = _month_starts(year + 1, latitude, longitude, zone_name, rule)[0]
+    table = []
+    for (start, sign, ingress), (next_start, _, _) in zip(months, months[1:] + (following,)):
+        table.append({
+            'month': TAMIL_MONTHS[sign],
+            'sign': SIGNS[sign],
+            'sankranti_ut': ingress,
+            'sankranti_local': jd_to_local(zone_name, ingress).isoformat(timespec='minutes'),
+            'start_date': start.isoformat(),
+            'days': (next_start - start).days
+        })
+    return table
+
+def solar_date(day, place, rule='tamil'):
+    """Solar month and day number of a civil date at a place"""
+    day = day if isinstance(day, date) else date.fromisoformat(day)
+    latitude, longitude, zone_name = _place_key(place)
+    months = (_month_starts(day.year - 1, latitude, longitude, zone_name, rule)
+              + _month_starts(day.year, latitude, longitude, zone_name, rule))
+    index = bisect_right([start for start, _, _ in months], day) - 1
+    start, sign, ingress = months[index]
+    return {
+        'date': day.isoformat(),
+        'month': TAMIL_MONTHS[sign],
+        'sign': SIGNS[sign],
+        'day': (day - start).days + 1,
+        'month_start': start.isoformat()
+    }
+
+def sun_nakshatra_ingresses(year):
+    """The Sun's nakshatra ingresses in a Gregorian year (UT)"""
+    jd_start = swe.julday(year, 1, 1, 0)
+    return [{'nakshatra': NAKSHATRAS[index], 'ingress_ut': jd}
+            for index, jd in get_catalog().nakshatra_ingresses(jd_start, swe.julday(year + 1, 1, 1, 0))]
+
+def main():
+    """Command line: build | months <place> <year> [rule] | date <place> <YYYY-MM-DD> [rule]"""
+    if len(sys.argv) < 2 or sys.argv[1] not in ('build', 'months', 'date'):
+        print("Usage: python3 kp_solar_calendar.py build | months <place> <year> [rule] | "
+              "date <place> <YYYY-MM-DD> [rule]", file=sys.stderr)
+        sys.exit(1)
+
+    if sys.argv[1] == 'build':
+        build_catalog()
+        print(json.dumps({'catalog': CATALOG_DIR, 'rows': len(get_catalog().times)}, indent=2))
+        return
+
+    place = resolve_place(sys.argv[2])
+    if place is None:
+        print(json.dumps({'error': f"Unknown place: {sys.argv[2]}"}))
+        sys.exit(1)
+    rule = sys.argv[4] if len(sys.argv) > 4 else 'tamil'
+    if sys.argv[1] == 'months':
+        result = month_table(place, int(sys.argv[3]), rule)
+    else:
+        result = solar_date(sys.argv[3], place, rule)
+    print(json.dumps(result, indent=2))
+
+if __name__ == "__main__":
+    main()
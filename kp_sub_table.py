@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+KP Sub Table
+The 249 Krishnamurti sub divisions of the zodiac: each nakshatra split among the
+nine Vimshottari lords in proportion to their dasha years (starting from the star
+lord), with the subs that straddle a sign boundary split in two
+"""
+
+import json
+from collections import namedtuple
+
+import numpy as np
+
+SIGNS = ["Aries", "Taurus", "Gemini", "Cancer", "Leo", "Virgo",
+         "Libra", "Scorpio", "Sagittarius", "Capricorn", "Aquarius", "Pisces"]
+
+NAKSHATRAS = [
+    "Ashwini", "Bharani", "Krittika", "Rohini", "Mrigashira", "Ardra",
+    "Punarvasu", "Pushya", "Ashlesha", "Magha", "Purva Phalguni", "Uttara Phalguni",
+    "Hasta", "Chitra", "Swati", "Vishakha", "Anuradha", "Jyeshtha",
+    "Mula", "Purva Ashadha", "Uttara Ashadha", "Shravana", "Dhanishta", "Shatabhisha",
+    "Purva Bhadrapada", "Uttara Bhadrapada", "Revati"
+]
+
+VIMSHOTTARI_ORDER = ['Ketu', 'Venus', 'Sun', 'Moon', 'Mars', 'Rahu', 'Jupiter', 'Saturn', 'Mercury']
+VIMSHOTTARI_YEARS = {
+    'Ketu': 7, 'Venus': 20, 'Sun': 6, 'Moon': 10, 'Mars': 7,
+    'Rahu': 18, 'Jupiter': 16, 'Saturn': 19, 'Mercury': 17
+}
+
+# Boundaries are whole arcseconds: a nakshatra is 48000", so a year of dasha is 400"
+ARCSEC_PER_SIGN = 30 * 3600
+ARCSEC_PER_NAKSHATRA = 48000
+ARCSEC_PER_YEAR = ARCSEC_PER_NAKSHATRA // sum(VIMSHOTTARI_YEARS.values())
+
+SubDivision = namedtuple('SubDivision', 'number start end sign nakshatra star_lord sub_lord')
+
+def _build_sub_table():
+    """All 249 subs in zodiac order, boundaries in degrees"""
+    table = []
+    for nakshatra_index, nakshatra in enumerate(NAKSHATRAS):
+        star_lord = VIMSHOTTARI_ORDER[nakshatra_index % 9]
+        start = nakshatra_index * ARCSEC_PER_NAKSHATRA
+        first = VIMSHOTTARI_ORDER.index(star_lord)
+
+        for sub_lord in VIMSHOTTARI_ORDER[first:] + VIMSHOTTARI_ORDER[:first]:
+            end = start + VIMSHOTTARI_YEARS[sub_lord] * ARCSEC_PER_YEAR
+            sign_end = (start // ARCSEC_PER_SIGN + 1) * ARCSEC_PER_SIGN
+            for piece_start, piece_end in ([(start, sign_end), (sign_end, end)] if end > sign_end
+                                           else [(start, end)]):
+                table.append(SubDivision(len(table) + 1, piece_start / 3600, piece_end / 3600,
+                                         SIGNS[piece_start // ARCSEC_PER_SIGN], nakshatra,
+                                         star_lord, sub_lord))
+            start = end
+    return tuple(table)
+
+SUB_TABLE = _build_sub_table()
+SUB_STARTS = np.array([sub.start for sub in SUB_TABLE])
+
+def sub_index(longitude):
+    """Vectorized 0-based index into SUB_TABLE of sidereal longitudes"""
+    return np.searchsorted(SUB_STARTS, np.asarray(longitude) % 360, side='right') - 1
+
+def sub_division(longitude):
+    """The SubDivision containing a sidereal longitude"""
+    return SUB_TABLE[int(sub_index(longitude))]
+
+def main():
+    """Print the sub table as JSON"""
+    print(json.dumps([sub._asdict() for sub in SUB_TABLE], indent=2))
+
+if __name__ == "__main__":
+    main()
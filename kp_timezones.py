@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Offline Time-Zone History Engine
+Converts local birth times to UT with full zoneinfo history (Madras time, war time,
+foreign zones) and memoized per-year transition tables for vectorized bulk conversion
+"""
+
+import os
+import sys
+import json
+import math
+import zoneinfo
+from bisect import bisect_right
+from functools import lru_cache
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from kp_gazetteer import nearest_city
+
+# Used when a request has neither a zone name nor an explicit offset nor coordinates
+DEFAULT_ZONE = 'Asia/Kolkata'
+
+UNIX_EPOCH_JD = 2440587.5
+SECONDS_PER_DAY = 86400
+
+# Transitions are located by sampling the UTC offset at this step, then bisecting
+SAMPLE_STEP = 6 * 3600
+
+@lru_cache(maxsize=None)
+def get_zone(zone_name):
+    """Cached ZoneInfo instance"""
+    return zoneinfo.ZoneInfo(zone_name)
+
+def _zone_tab_path():
+    for directory in zoneinfo.TZPATH:
+        path = os.path.join(directory, 'zone1970.tab')
+        if os.path.exists(path):
+            return path
+    try:
+        import tzdata
+        path = os.path.join(os.path.dirname(tzdata.__file__), 'zoneinfo', 'zone1970.tab')
+        if os.path.exists(path):
+            return path
+    except ImportError:
+        pass
+    return None
+
+def _parse_iso6709(coordinates):
+    """Parse zone1970.tab coordinates such as +0656+07951 or +064900-0075000"""
+    split = max(coordinates.rfind('+'), coordinates.rfind('-'))
+    values = []
+    for part, degree_digits in ((coordinates[:split], 2), (coordinates[split:], 3)):
+        sign = -1 if part[0] == '-' else 1
+        digits = part[1:]
+        degrees = int(digits[:degree_digits])
+        minutes = int(digits[degree_digits:degree_digits + 2])
+        seconds = int(digits[degree_digits + 2:] or 0)
+        values.append(sign * (degrees + minutes / 60 + seconds / 3600))
+    return values
+
+@lru_cache(maxsize=1)
+def load_zone_coordinates():
+    """(zone name, latitude, longitude) of each zone's principal city from zone1970.tab"""
+    path = _zone_tab_path()
+    if path is None:
+        return []
+
+    zones = []
+    with open(path) as f:
+        for line in f:
+            if line.startswith('#') or not line.strip():
+                continue
+            fields = line.rstrip('\n').split('\t')
+            latitude, longitude = _parse_iso6709(fields[1])
+            zones.append((fields[2], latitude, longitude))
+    return zones
+
+def _great_circle(lat1, lon1, lat2, lon2):
+    """Central angle in radians between two points"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    h = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * math.asin(min(1.0, math.sqrt(h)))
+
+# A gazetteer city this close decides the zone; farther out (open sea, empty land)
+# the nearest zone1970.tab principal city is used
+NEAREST_CITY_KM = 300
+
+@lru_cache(maxsize=4096)
+def zone_for_coordinates(latitude, longitude):
+    """Zone of the nearest gazetteer city, else of the nearest zone principal city
+
+    This is an approximation near borders; callers that know the zone name
+    should pass it instead.
+    """
+    city = nearest_city(latitude, longitude, max_km=NEAREST_CITY_KM)
+    if city is not None:
+        return city['timezone']
+
+    zones = load_zone_coordinates()
+    if not zones:
+        return DEFAULT_ZONE
+    return min(zones, key=lambda z: _great_circle(latitude, longitude, z[1], z[2]))[0]
+
+def resolve_zone(zone_name=None, latitude=None, longitude=None, default=DEFAULT_ZONE):
+    """Pick the zone for a birth: explicit name, then coordinates, then the default"""
+    if zone_name:
+        get_zone(zone_name)  # Raises for unknown zones
+        return zone_name
+    if latitude is not None and longitude is not None:
+        return zone_for_coordinates(round(latitude, 4), round(longitude, 4))
+    return default
+
+def utc_offset_hours(zone_name, year, month, day, hour=0, minute=0, second=0):
+    """UTC offset in hours of a local wall-clock time (earlier offset when ambiguous)"""
+    local = datetime(year, month, day, hour, minute, second, tzinfo=get_zone(zone_name))
+    return local.utcoffset().total_seconds() / 3600
+
+def _offset_at(zone, utc_seconds):
+    return int(datetime.fromtimestamp(utc_seconds, zone).utcoffset().total_seconds())
+
+@lru_cache(maxsize=8192)
+def year_transitions(zone_name, year):
+    """Transitions during a year as a tuple of (UTC instant, offset before, offset after) in seconds"""
+    zone = get_zone(zone_name)
+    start = int(datetime(year, 1, 1, tzinfo=timezone.utc).timestamp())
+    end = int(datetime(year + 1, 1, 1, tzinfo=timezone.utc).timestamp())
+
+    transitions = []
+    previous_time = start
+    previous_offset = _offset_at(zone, start)
+
+    for sample_time in range(start + SAMPLE_STEP, end + 1, SAMPLE_STEP):
+        offset = _offset_at(zone, sample_time)
+        if offset == previous_offset:
+            previous_time = sample_time
+            continue
+
+        # Bisect to the exact second the offset changes
+        low, high = previous_time, sample_time
+        while high - low > 1:
+            middle = (low + high) // 2
+            if _offset_at(zone, middle) == previous_offset:
+                low = middle
+            else:
+                high = middle
+
+        transitions.append((high, previous_offset, offset))
+        previous_time, previous_offset = sample_time, offset
+
+    return tuple(transitions)
+
+def transition_table(zone_name, first_year, last_year):
+    """Local-time boundaries and offsets covering first_year..last_year
+
+    Returns (boundaries, offsets): local wall-clock seconds B and offsets O such that
+    a local time L uses offsets[searchsorted(B, L, 'right')]. Each boundary sits at
+    the transition instant plus the larger of the two offsets, which resolves
+    ambiguous and skipped wall times with the earlier offset like zoneinfo's fold=0.
+    """
+    zone = get_zone(zone_name)
+    first_instant = int(datetime(first_year, 1, 1, tzinfo=timezone.utc).timestamp())
+    offsets = [_offset_at(zone, first_instant)]
+    boundaries = []
+
+    for year in range(first_year, last_year + 1):
+        for instant, before, after in year_transitions(zone_name, year):
+            boundaries.append(instant + max(before, after))
+            offsets.append(after)
+
+    return np.array(boundaries, dtype=np.int64), np.array(offsets, dtype=np.int64)
+
+def local_to_utc_seconds(zone_name, local_seconds):
+    """Vectorized local wall-clock seconds (naive Unix epoch) to UTC Unix seconds"""
+    local_seconds = np.asarray(local_seconds, dtype=np.int64)
+    if local_seconds.size == 0:
+        return local_seconds.copy()
+
+    years = local_seconds.astype('datetime64[s]').astype('datetime64[Y]').astype(np.int64) + 1970
+    # One year of margin either side covers offsets that move a time across New Year
+    boundaries, offsets = transition_table(zone_name, int(years.min()) - 1, int(years.max()) + 1)
+    index = np.searchsorted(boundaries, local_seconds, side='right')
+    return local_seconds - offsets[index]
+
+def local_datetimes_to_jd(zone_name, local_datetimes):
+    """Vectorized numpy datetime64 local times to UT Julian days"""
+    local_seconds = np.asarray(local_datetimes, dtype='datetime64[s]').astype(np.int64)
+    return local_to_utc_seconds(zone_name, local_seconds) / SECONDS_PER_DAY + UNIX_EPOCH_JD
+
+def local_to_jd(zone_name, year, month, day, hour=0, minute=0, second=0):
+    """UT Julian day of a single local wall-clock time"""
+    naive = datetime(year, month, day, hour, minute, second)
+    local_seconds = int((naive - datetime(1970, 1, 1)).total_seconds())
+    boundaries, offsets = transition_table(zone_name, year - 1, year + 1)
+    utc_seconds = local_seconds - int(offsets[bisect_right(boundaries.tolist(), local_seconds)])
+    return utc_seconds / SECONDS_PER_DAY + UNIX_EPOCH_JD
+
+def jd_to_local(zone_name, jd_ut):
+    """Aware local datetime of a UT Julian day"""
+    instant = datetime.fromtimestamp((jd_ut - UNIX_EPOCH_JD) * SECONDS_PER_DAY, tz=timezone.utc)
+    return instant.astimezone(get_zone(zone_name))
+
+def main():
+    """Show the UTC offset of a local time: <YYYY-MM-DD> <HH:MM:SS> [zone | lat lon]"""
+    if len(sys.argv) not in (3, 4, 5):
+        print("Usage: python3 kp_timezones.py <date> <time> [zone | <latitude> <longitude>]", file=sys.stderr)
+        sys.exit(1)
+
+    year, month, day = map(int, sys.argv[1].split('-'))
+    hour, minute, second = (list(map(int, sys.argv[2].split(':'))) + [0, 0])[:3]
+
+    if len(sys.argv) == 5:
+        zone_name = resolve_zone(latitude=float(sys.argv[3]), longitude=float(sys.argv[4]))
+    else:
+        zone_name = resolve_zone(sys.argv[3] if len(sys.argv) == 4 else None)
+
+    offset = utc_offset_hours(zone_name, year, month, day, hour, minute, second)
+    utc = datetime(year, month, day, hour, minute, second) - timedelta(hours=offset)
+    print(json.dumps({
+        'zone': zone_name,
+        'utc_offset_hours': offset,
+        'utc': utc.isoformat(),
+        'julian_day_ut': local_to_jd(zone_name, year, month, day, hour, minute, second)
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Lightweight Per-Stage Timing Instrumentation
+Context-manager timers around chart pipeline stages, collected per request
+and aggregated into in-process histograms
+"""
+
+import os
+import json
+import time
+import threading
+
+# Histogram bucket upper bounds in milliseconds (the last bucket is +Inf)
+HISTOGRAM_BUCKETS_MS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 1000)
+
+_histograms_enabled = os.environ.get('KP_TIMINGS') == '1'
+_histograms = {}
+_histograms_lock = threading.Lock()
+_local = threading.local()
+
+class Histogram:
+    """Cumulative-friendly latency histogram with fixed millisecond buckets"""
+
+    __slots__ = ('counts', 'count', 'sum_ms')
+
+    def __init__(self):
+        self.counts = [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+
+    def observe(self, elapsed_ms):
+        """Record one observation"""
+        index = 0
+        for bound in HISTOGRAM_BUCKETS_MS:
+            if elapsed_ms <= bound:
+                break
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.sum_ms += elapsed_ms
+
+    def copy(self):
+        """Independent snapshot of the histogram"""
+        snapshot = Histogram()
+        snapshot.counts = list(self.counts)
+        snapshot.count = self.count
+        snapshot.sum_ms = self.sum_ms
+        return snapshot
+
+    def to_dict(self):
+        """Cumulative bucket counts keyed by upper bound, Prometheus style"""
+        buckets = {}
+        running = 0
+        for bound, bucket_count in zip(HISTOGRAM_BUCKETS_MS + ('+Inf',), self.counts):
+            running += bucket_count
+            buckets[str(bound)] = running
+        return {'count': self.count, 'sum_ms': round(self.sum_ms, 6), 'buckets': buckets}
+
+class _NullStage:
+    """Shared no-op timer returned when nothing is listening"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+_NULL_STAGE = _NullStage()
+
+class _StageTimer:
+    """Times one stage and reports it to the request collector and the histograms"""
+
+    __slots__ = ('name', 'collector', 'start')
+
+    def __init__(self, name, collector):
+        self.name = name
+        self.collector = collector
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        elapsed_ms = (time.perf_counter() - self.start) * 1000
+        if self.collector is not None:
+            self.collector[self.name] = self.collector.get(self.name, 0.0) + elapsed_ms
+        if _histograms_enabled:
+            record(self.name, elapsed_ms)
+        return False
+
+def stage(name):
+    """Context manager timing a pipeline stage; a shared no-op when timing is off"""
+    collector = getattr(_local, 'collector', None)
+    if collector is None and not _histograms_enabled:
+        return _NULL_STAGE
+    return _StageTimer(name, collector)
+
+class collect_timings:
+    """Collect per-stage durations for the current request when enabled
+
+    Yields a dict of stage name -> total milliseconds, or None when disabled.
+    Repeated stages (e.g. one calc_ut per planet) are summed.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = bool(enabled)
+        self.previous = None
+
+    def __enter__(self):
+        if not self.enabled:
+            return None
+        self.previous = getattr(_local, 'collector', None)
+        _local.collector = {}
+        return _local.collector
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.enabled:
+            collector = _local.collector
+            _local.collector = self.previous
+            for name in collector:
+                collector[name] = round(collector[name], 4)
+        return False
+
+def record(name, elapsed_ms):
+    """Add one observation to the named histogram"""
+    with _histograms_lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = Histogram()
+        histogram.observe(elapsed_ms)
+
+def enable_histograms(enabled=True):
+    """Turn histogram aggregation on or off for this process"""
+    global _histograms_enabled
+    _histograms_enabled = enabled
+
+def histograms_enabled():
+    """Whether stage timings are being aggregated"""
+    return _histograms_enabled
+
+def dump_histograms():
+    """Snapshot of every stage histogram"""
+    with _histograms_lock:
+        return {name: histogram.to_dict() for name, histogram in sorted(_histograms.items())}
+
+def histogram_items():
+    """(stage name, Histogram snapshot) pairs, for exporters that render their own format"""
+    with _histograms_lock:
+        return sorted((name, histogram.copy()) for name, histogram in _histograms.items())
+
+def reset_histograms():
+    """Discard all aggregated timings"""
+    with _histograms_lock:
+        _histograms.clear()
+
+def main():
+    """Time a few default charts and print the aggregated histograms"""
+    # Import by name so the calculator and this script share one module instance
+    import kp_timing
+    from web_kp_calculator import calculate_chart_for_web
+
+    kp_timing.enable_histograms()
+    for _ in range(100):
+        calculate_chart_for_web({})
+
+    print(json.dumps(kp_timing.dump_histograms(), indent=2))
+
+if __name__ == "__main__":
+    main()
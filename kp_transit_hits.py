@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Transit-over-Natal Hit Finder
+Finds, for many charts at once, the days on which transiting Saturn, Jupiter or Rahu
+cross a natal planet, a natal cusp, or the boundaries of the sub arc holding one.
+Every chart's sensitive points go into one sorted array; each transit planet's motion
+over a day is an interval on that array, so searchsorted finds all users hit that day
+"""
+
+import sys
+import json
+import argparse
+from datetime import date, timedelta
+
+import numpy as np
+
+from web_kp_calculator import SIGNS, calculate_chart_for_web
+from kp_sub_table import SUB_TABLE, SUB_STARTS, sub_index
+from kp_ephemeris_cache import planet_positions
+from kp_timezones import UNIX_EPOCH_JD
+
+TRANSIT_PLANETS = ['Saturn', 'Jupiter', 'Rahu']
+NATAL_PLANETS = ['Sun', 'Moon', 'Mercury', 'Venus', 'Mars', 'Jupiter', 'Saturn', 'Rahu', 'Ketu']
+
+# What a sensitive point marks: the natal longitude itself or an edge of its sub arc
+POINT_KINDS = ['conjunction', 'sub_arc_start', 'sub_arc_end']
+
+SUB_ENDS = np.array([sub.end for sub in SUB_TABLE])
+
+class NatalPointIndex:
+    """Sensitive points of many charts, sorted by sidereal longitude"""
+
+    def __init__(self, charts):
+        """charts: iterable of (chart_id, chart) with chart in calculate_chart_for_web format"""
+        natal, owners, targets = [], [], []
+        self.chart_ids = []
+
+        for chart_id, chart in charts:
+            for target, longitude in _natal_points(chart):
+                natal.append(longitude)
+                owners.append(len(self.chart_ids))
+                targets.append(target)
+            self.chart_ids.append(chart_id)
+
+        # Each natal point contributes itself and both edges of its sub arc
+        natal = np.asarray(natal, dtype=np.float64) % 360
+        subs = sub_index(natal)
+        longitudes = np.concatenate([natal, SUB_STARTS[subs], SUB_ENDS[subs] % 360])
+        order = np.argsort(longitudes, kind='stable')
+        point_count = len(natal)
+
+        self.longitudes = longitudes[order]
+        self.owners = np.tile(np.asarray(owners, dtype=np.int32), 3)[order]
+        self.targets = np.tile(np.asarray(targets, dtype=object), 3)[order]
+        self.kinds = np.repeat(np.arange(3, dtype=np.int8), point_count)[order]
+        self.sub_lords = np.tile(np.asarray([SUB_TABLE[i].sub_lord for i in subs], dtype=object), 3)[order]
+
+    def __len__(self):
+        return len(self.longitudes)
+
+def _natal_points(chart):
+    """(target name, sidereal longitude) of the natal planets and cusps of a chart"""
+    points = [(p['planet'], p['longitude']) for p in chart.get('planetary_positions', [])
+              if p.get('planet') in NATAL_PLANETS and 'longitude' in p]
+    points += [(f"house_{h['house']}", h['longitude']) for h in chart.get('houses', []) if 'longitude' in h]
+    return points
+
+def daily_longitudes(planet, start, days):
+    """Sidereal longitude and speed of a planet at 0h UT on days+1 consecutive days"""
+    jd_start = UNIX_EPOCH_JD + (start - date(1970, 1, 1)).days
+    positions = [planet_positions(jd_start + day)[planet] for day in range(days + 1)]
+    return (jd_start + np.arange(days + 1),
+            np.array([p['longitude'] for p in positions]),
+            np.array([p['speed'] for p in positions]))
+
+def _ranges(index, low, high):
+    """Point index ranges [first, last) inside the half-open arcs [low, high) (no wrap)"""
+    return (np.searchsorted(index.longitudes, low, side='left'),
+            np.searchsorted(index.longitudes, high, side='left'))
+
+def sweep_planet(index, planet, start, days):
+    """All hits of one transit planet: (day numbers, point indexes, crossing UT Julian
+    days, retrograde flags)
+
+    The day's arc runs from one midnight position to the next, half-open so a point on
+    a midnight position is hit on one day only. Arcs that pass 0 degrees are swept as
+    two pieces.
+    """
+    jds, longitudes, _ = daily_longitudes(planet, start, days)
+    begin, end = longitudes[:-1], longitudes[1:]
+    motion = (end - begin + 180) % 360 - 180
+    low = np.where(motion >= 0, begin, end)
+    high = low + np.abs(motion)
+
+    wraps = high >= 360
+    day_numbers = np.concatenate([np.arange(days), np.flatnonzero(wraps)])
+    first, last = _ranges(index, np.concatenate([low, np.zeros(wraps.sum())]),
+                          np.concatenate([np.minimum(high, 360.0), high[wraps] - 360]))
+
+    # Expand every [first, last) range into its point indexes, all days at once
+    counts = last - first
+    hit_days = np.repeat(day_numbers, counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    points = np.repeat(first, counts) + offsets
+
+    # Time of the crossing within the day, assuming uniform motion over the day
+    travelled = (index.longitudes[points] - begin[hit_days]) % 360
+    travelled = np.where(motion[hit_days] >= 0, travelled, (360 - travelled) % 360)
+    fraction = np.clip(travelled / np.maximum(np.abs(motion[hit_days]), 1e-12), 0, 1)
+    return hit_days, points, jds[hit_days] + fraction, motion[hit_days] < 0
+
+def transit_hits(charts, start, days, planets=TRANSIT_PLANETS):
+    """Event stream of transit hits, in time order
+
+    Yields dicts with chart_id, transit planet, natal target (planet or 'house_N'),
+    kind (conjunction or sub arc edge), the point's longitude, sub lord of the natal
+    point's arc, crossing date and approximate UT Julian day, and direction of motion.
+    """
+    index = charts if isinstance(charts, NatalPointIndex) else NatalPointIndex(charts)
+    start = start if isinstance(start, date) else date.fromisoformat(start)
+
+    sweeps = [(planet,) + sweep_planet(index, planet, start, days) for planet in planets]
+    events = [(jd, day, planet, point, retrograde)
+              for planet, hit_days, points, jd_hits, retrograde_hits in sweeps
+              for jd, day, point, retrograde in zip(jd_hits.tolist(), hit_days.tolist(),
+                                                    points.tolist(), retrograde_hits.tolist())]
+    events.sort(key=lambda event: event[0])
+
+    for jd, day, planet, point, retrograde in events:
+        longitude = float(index.longitudes[point])
+        yield {
+            'chart_id': index.chart_ids[index.owners[point]],
+            'transit': planet,
+            'target': index.targets[point],
+            'kind': POINT_KINDS[index.kinds[point]],
+            'longitude': longitude,
+            'sign': SIGNS[int(longitude // 30)],
+            'sub_lord': index.sub_lords[point],
+            'date': (start + timedelta(days=day)).isoformat(),
+            'jd_ut': jd,
+            'direction': 'retrograde' if retrograde else 'direct'
+        }
+
+def _read_charts(lines):
+    """(id, chart) pairs from NDJSON lines holding either a chart or chart input"""
+    for number, line in enumerate(lines):
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        chart = record.get('chart')
+        if chart is None:
+            result = calculate_chart_for_web(record.get('input', {}))
+            if not result['success']:
+                continue
+            chart = result['chart']
+        yield record.get('id', number), chart
+
+def main():
+    """Write the hits for charts read from NDJSON as an NDJSON event stream"""
+    parser = argparse.ArgumentParser(description="Transit hits on natal points for many charts")
+    parser.add_argument('charts', help='NDJSON file of {"id", "chart"} or {"id", "input"} records, - for stdin')
+    parser.add_argument('--start', default=date.today().isoformat(), help="first day, YYYY-MM-DD")
+    parser.add_argument('--days', type=int, default=1)
+    parser.add_argument('--planets', nargs='+', default=TRANSIT_PLANETS)
+    args = parser.parse_args()
+
+    stream = sys.stdin if args.charts == '-' else open(args.charts, encoding='utf-8')
+    with stream:
+        index = NatalPointIndex(_read_charts(stream))
+
+    for event in transit_hits(index, args.start, args.days, args.planets):
+        print(json.dumps(event))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Shared Current-Transits Snapshot
+Current transits computed once per time bucket and served to every request from the
+shared snapshot. The next bucket is computed ahead in a background thread, so a request
+at a bucket boundary normally finds it ready and never waits on the ephemeris. Requests
+get copies, so a caller that edits its result cannot change the shared snapshot
+"""
+
+import os
+import json
+import time
+import threading
+from datetime import datetime, timezone
+
+from ultimate_kp_system import calculate_current_transits
+from web_kp_calculator import SIGNS, format_dms, get_nakshatra_info, get_sub_lord
+from kp_ayanamsa import AYANAMSA_NAME, KP_AYANAMSA
+
+BUCKET_SECONDS = int(os.environ.get('KP_TRANSIT_BUCKET_SECONDS', '60'))
+
+AYANAMSA = {'system': AYANAMSA_NAME, 'value': KP_AYANAMSA, 'formatted': format_dms(KP_AYANAMSA)}
+
+def _position(planet, longitude, speed, retrograde):
+    sign_num = int(longitude // 30)
+    nak_info = get_nakshatra_info(longitude)
+    return {
+        'planet': planet,
+        'degree': format_dms(longitude % 30),
+        'decimal_degrees': round(longitude % 30, 2),
+        'sign': SIGNS[sign_num],
+        'sign_number': sign_num + 1,
+        'longitude': longitude,
+        'speed': round(speed, 4),
+        'retrograde': retrograde,
+        'nakshatra': nak_info['nakshatra'],
+        'nakshatra_lord': nak_info['star_lord'],
+        'pada': nak_info['pada'],
+        'sub_lord': get_sub_lord(longitude)
+    }
+
+def transit_positions(transits):
+    """Transits as chart planetary_positions entries (as in calculate_chart_for_web, without
+    houses), Ketu included"""
+    positions = [_position(planet, data['longitude'], data['speed'], data['retrograde'])
+                 for planet, data in transits.items() if 'error' not in data]
+    rahu = transits.get('Rahu', {})
+    if 'longitude' in rahu:
+        positions.append(_position('Ketu', (rahu['longitude'] + 180) % 360, -rahu['speed'], False))
+    return positions
+
+class TransitSnapshotService:
+    """Per-bucket transit snapshots with background prefetch of the next bucket"""
+
+    def __init__(self, bucket_seconds=BUCKET_SECONDS, prefetch=True, clock=time.time):
+        self.bucket_seconds = bucket_seconds
+        self.prefetch = prefetch
+        self.clock = clock
+        self._snapshots = {}
+        self._lock = threading.Lock()
+        self._prefetching = set()
+
+    def _compute(self, bucket):
+        start = bucket * self.bucket_seconds
+        # calculate_current_transits reads the fields of a naive UT datetime
+        moment = datetime.fromtimestamp(start, tz=timezone.utc).replace(tzinfo=None)
+        transits = calculate_current_transits(moment)
+        return {
+            'bucket_start': start,
+            'valid_until': start + self.bucket_seconds,
+            'transits': transits,
+            'positions': transit_positions(transits),
+            'ayanamsa': AYANAMSA
+        }
+
+    def _get(self, bucket):
+        with self._lock:
+            snapshot = self._snapshots.get(bucket)
+            # Only the current and next bucket are ever needed
+            for old in [b for b in self._snapshots if b < bucket]:
+                del self._snapshots[old]
+        if snapshot is None:
+            snapshot = self._compute(bucket)
+            with self._lock:
+                snapshot = self._snapshots.setdefault(bucket, snapshot)
+        return snapshot
+
+    def _prefetch(self, bucket):
+        with self._lock:
+            if bucket in self._snapshots or bucket in self._prefetching:
+                return
+            self._prefetching.add(bucket)
+
+        def run():
+            try:
+                snapshot = self._compute(bucket)
+                with self._lock:
+                    self._snapshots.setdefault(bucket, snapshot)
+            finally:
+                with self._lock:
+                    self._prefetching.discard(bucket)
+
+        threading.Thread(target=run, name='kp-transit-prefetch', daemon=True).start()
+
+    def snapshot(self):
+        """The current bucket's transits with 'age_seconds' and 'valid_until' (Unix seconds)"""
+        now = self.clock()
+        bucket = int(now // self.bucket_seconds)
+        snapshot = self._get(bucket)
+        if self.prefetch:
+            self._prefetch(bucket + 1)
+
+        return dict(snapshot,
+                    transits={planet: dict(data) for planet, data in snapshot['transits'].items()},
+                    positions=[dict(position) for position in snapshot['positions']],
+                    ayanamsa=dict(snapshot['ayanamsa']),
+                    bucket_seconds=self.bucket_seconds,
+                    age_seconds=round(now - snapshot['bucket_start'], 3),
+                    calculation_time=datetime.fromtimestamp(snapshot['bucket_start'], tz=timezone.utc).isoformat())
+
+_service = None
+
+def get_transit_service():
+    """Process-wide snapshot service"""
+    global _service
+    if _service is None:
+        _service = TransitSnapshotService()
+    return _service
+
+def current_transits_snapshot():
+    """Current transits from the shared snapshot"""
+    return get_transit_service().snapshot()
+
+def main():
+    """Print the current snapshot"""
+    print(json.dumps(TransitSnapshotService(prefetch=False).snapshot(), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,518 @@
+#!/usr/bin/env python3
+"""
+Vectorized Ascendant, MC and House Cusps
+NumPy implementation of sidereal time, obliquity, Ascendant, MC and Placidus, Koch,
+Porphyry, Regiomontanus, Campanus, Equal and Whole Sign cusps over arrays of
+(jd, latitude, longitude), for batch recomputation and grids where one swe.houses
+call per chart is too slow
+"""
+
+import json
+import time
+import argparse
+from functools import lru_cache
+
+import numpy as np
+import swisseph as swe
+
+J2000 = 2451545.0
+DAYS_PER_CENTURY = 36525.0
+ARCSEC = 1 / 3600
+
+# Placidus Newton iterations at most, and the step (radians) counted as converged
+PLACIDUS_ITERATIONS = 30
+PLACIDUS_TOLERANCE = 1e-11
+
+# Below this many charts, per-call NumPy overhead exceeds swisseph's per-chart cost
+SWISSEPH_BATCH_LIMIT = 32
+
+# Swiss Ephemeris switches to a long-term sidereal time model outside 1850-2050;
+# there the difference from it is sampled from swe.sidtime every
+# SIDEREAL_SAMPLE_DAYS, a year of samples at a time, and interpolated
+SIDEREAL_MODEL_START = 2396758.5
+SIDEREAL_MODEL_END = 2469807.5
+SIDEREAL_SAMPLE_DAYS = 10
+DAYS_PER_YEAR = 365.25
+
+# IAU 1980 nutation, largest terms (Meeus table 22.A): multipliers of D, M, M', F, Omega,
+# then longitude and obliquity coefficients in 0.0001" (constant, per century)
+NUTATION_TERMS = np.array([
+    [0, 0, 0, 0, 1, -171996, -174.2, 92025, 8.9],
+    [-2, 0, 0, 2, 2, -13187, -1.6, 5736, -3.1],
+    [0, 0, 0, 2, 2, -2274, -0.2, 977, -0.5],
+    [0, 0, 0, 0, 2, 2062, 0.2, -895, 0.5],
+    [0, 1, 0, 0, 0, 1426, -3.4, 54, -0.1],
+    [0, 0, 1, 0, 0, 712, 0.1, -7, 0],
+    [-2, 1, 0, 2, 2, -517, 1.2, 224, -0.6],
+    [0, 0, 0, 2, 1, -386, -0.4, 200, 0],
+    [0, 0, 1, 2, 2, -301, 0, 129, -0.1],
+    [-2, -1, 0, 2, 2, 217, -0.5, -95, 0.3],
+    [-2, 0, 1, 0, 0, -158, 0, 0, 0],
+    [-2, 0, 0, 2, 1, 129, 0.1, -70, 0],
+    [0, 0, -1, 2, 2, 123, 0, -53, 0],
+    [2, 0, 0, 0, 0, 63, 0, 0, 0],
+    [0, 0, 1, 0, 1, 63, 0.1, -33, 0],
+    [2, 0, -1, 2, 2, -59, 0, 26, 0],
+    [0, 0, -1, 0, 1, -58, -0.1, 32, 0],
+    [0, 0, 1, 2, 1, -51, 0, 27, 0],
+    [-2, 0, 2, 0, 0, 48, 0, 0, 0],
+    [0, 0, -2, 2, 1, 46, 0, -24, 0],
+    [2, 0, 0, 2, 2, -38, 0, 16, 0],
+    [0, 0, 2, 2, 2, -31, 0, 13, 0],
+    [0, 0, 2, 0, 0, 29, 0, 0, 0],
+    [-2, 0, 1, 2, 2, 29, 0, -12, 0],
+    [0, 0, 0, 2, 0, 26, 0, 0, 0],
+    [-2, 0, 0, 2, 0, -22, 0, 0, 0],
+    [0, 0, -1, 2, 1, 21, 0, -10, 0],
+    [0, 2, 0, 0, 0, 17, -0.1, 0, 0],
+    [2, 0, -1, 0, 1, 16, 0, -8, 0],
+    [-2, 2, 0, 2, 2, -16, 0.1, 7, 0],
+    [0, 1, 0, 0, 1, -15, 0, 9, 0]
+])
+
+def nutation(jd):
+    """Nutation in longitude and obliquity, in degrees"""
+    t = (jd - J2000) / DAYS_PER_CENTURY
+    arguments = np.radians(np.stack([
+        297.85036 + 445267.111480 * t - 0.0019142 * t ** 2 + t ** 3 / 189474,
+        357.52772 + 35999.050340 * t - 0.0001603 * t ** 2 - t ** 3 / 300000,
+        134.96298 + 477198.867398 * t + 0.0086972 * t ** 2 + t ** 3 / 56250,
+        93.27191 + 483202.017538 * t - 0.0036825 * t ** 2 + t ** 3 / 327270,
+        125.04452 - 1934.136261 * t + 0.0020708 * t ** 2 + t ** 3 / 450000
+    ], axis=-1) % 360)
+
+    angle = arguments @ NUTATION_TERMS[:, :5].T
+    sine, cosine = np.sin(angle), np.cos(angle)
+    delta_psi = sine @ NUTATION_TERMS[:, 5] + t * (sine @ NUTATION_TERMS[:, 6])
+    delta_epsilon = cosine @ NUTATION_TERMS[:, 7] + t * (cosine @ NUTATION_TERMS[:, 8])
+    return delta_psi * 1e-4 * ARCSEC, delta_epsilon * 1e-4 * ARCSEC
+
+def mean_obliquity(jd):
+    """Mean obliquity of the ecliptic (IAU 2006), in degrees"""
+    t = (jd - J2000) / DAYS_PER_CENTURY
+    return (84381.406 - 46.836769 * t - 0.0001831 * t ** 2 + 0.00200340 * t ** 3
+            - 5.76e-7 * t ** 4 - 4.34e-8 * t ** 5) * ARCSEC
+
+def _apparent_sidereal_degrees(jd_ut):
+    days = jd_ut - J2000
+    t = days / DAYS_PER_CENTURY
+
+    era = 360 * ((0.7790572732640 + 0.00273781191135448 * days + days) % 1.0)
+    precession = (0.014506 + 4612.156534 * t + 1.3915817 * t ** 2 - 0.00000044 * t ** 3
+                  - 0.000029956 * t ** 4 - 0.0000000368 * t ** 5) * ARCSEC
+
+    delta_psi, delta_epsilon = nutation(jd_ut)
+    obliquity = mean_obliquity(jd_ut) + delta_epsilon
+    return era + precession + delta_psi * np.cos(np.radians(obliquity)), obliquity
+
+@lru_cache(maxsize=None)
+def _long_term_samples(year_index):
+    """(nodes, corrections) for one year-long chunk outside the 1850-2050 window"""
+    start = J2000 + year_index * DAYS_PER_YEAR
+    nodes = np.arange(start, start + DAYS_PER_YEAR + SIDEREAL_SAMPLE_DAYS, SIDEREAL_SAMPLE_DAYS)
+    # Samples on both edges of the window keep interpolation from spanning it
+    if start < SIDEREAL_MODEL_START:
+        nodes = np.append(nodes[nodes < SIDEREAL_MODEL_START], SIDEREAL_MODEL_START - 1e-6)
+    else:
+        nodes = np.insert(nodes[nodes > SIDEREAL_MODEL_END], 0, SIDEREAL_MODEL_END)
+
+    ours = _apparent_sidereal_degrees(nodes)[0]
+    theirs = np.array([swe.sidtime(jd) * 15 for jd in nodes])
+    return nodes, (theirs - ours + 180) % 360 - 180
+
+def _long_term_correction(jd_ut):
+    """Degrees to add to our sidereal time to follow swisseph's long-term model"""
+    chunks = [_long_term_samples(int(i)) for i in np.unique(np.floor((jd_ut - J2000) / DAYS_PER_YEAR))]
+    nodes = np.concatenate([n for n, _ in chunks])
+    corrections = np.concatenate([c for _, c in chunks])
+    order = np.argsort(nodes, kind='stable')
+    return np.interp(jd_ut, nodes[order], corrections[order])
+
+def sidereal_frame(jd_ut, longitude):
+    """ARMC and true obliquity in degrees
+
+    Greenwich apparent sidereal time is the Earth rotation angle plus the IAU 2006
+    precession polynomial and the equation of the equinoxes. UT stands in for TT
+    in the slow terms, which moves the result by far less than a milliarcsecond.
+    Outside 1850-2050 the swisseph long-term model is followed via a sampled
+    correction, so results stay consistent with swe.houses.
+    """
+    jd_ut = np.asarray(jd_ut, dtype=np.float64)
+
+    # Grids share a moment across many places: evaluate each distinct moment once
+    moments, inverse = np.unique(jd_ut, return_inverse=True)
+    if moments.size < jd_ut.size:
+        gast, obliquity = (values[inverse].reshape(jd_ut.shape)
+                           for values in _apparent_sidereal_degrees(moments))
+    else:
+        gast, obliquity = _apparent_sidereal_degrees(jd_ut)
+
+    outside = (jd_ut < SIDEREAL_MODEL_START) | (jd_ut >= SIDEREAL_MODEL_END)
+    if outside.any():
+        gast = np.array(gast)
+        gast[outside] += _long_term_correction(jd_ut[outside])
+
+    armc = (gast + np.asarray(longitude, dtype=np.float64)) % 360
+    return armc, obliquity
+
+def midheaven(armc, obliquity):
+    """Ecliptic longitude of the MC"""
+    ramc = np.radians(armc)
+    return np.degrees(np.arctan2(np.sin(ramc), np.cos(ramc) * np.cos(np.radians(obliquity)))) % 360
+
+def ascendant(armc, obliquity, latitude):
+    """Ecliptic longitude of the Ascendant
+
+    Inside the polar circles the horizon can meet the ecliptic west of the MC;
+    as in swisseph the opposite point is then used, keeping Asc in the MC's east.
+    """
+    ramc = np.radians(armc)
+    epsilon = np.radians(obliquity)
+    phi = np.radians(latitude)
+    asc = np.degrees(np.arctan2(
+        np.cos(ramc),
+        -(np.sin(ramc) * np.cos(epsilon) + np.tan(phi) * np.sin(epsilon)))) % 360
+    west = (asc - midheaven(armc, obliquity)) % 360 > 180
+    return np.where(west, (asc + 180) % 360, asc)
+
+def _ecliptic_from_ra(ra, epsilon):
+    """Longitude of the ecliptic point with right ascension ra (radians)"""
+    return np.arctan2(np.sin(ra), np.cos(ra) * np.cos(epsilon))
+
+# Every cusp function takes the frame plus Asc and MC already shifted by ayanamsa,
+# and returns ((N, 12) cusps, fallback mask)
+
+def _from_quadrants(asc, mc, intermediate):
+    """Assemble (N, 12) cusps from Asc, MC and cusps 11, 12, 2, 3"""
+    cusps = np.empty(asc.shape + (12,))
+    cusps[..., 0] = asc
+    cusps[..., 1] = intermediate[2]
+    cusps[..., 2] = intermediate[3]
+    cusps[..., 3] = mc + 180
+    cusps[..., 9] = mc
+    cusps[..., 10] = intermediate[11]
+    cusps[..., 11] = intermediate[12]
+    for house in (4, 5, 6, 7, 8):
+        cusps[..., house] = cusps[..., house - 6] + 180
+    return cusps % 360
+
+def porphyry_cusps(armc, obliquity, latitude, asc, mc, ayanamsa=0.0):
+    """Quadrants between the angles trisected along the ecliptic"""
+    east = (asc - mc) % 360          # MC to Asc
+    west = (mc + 180 - asc) % 360    # Asc to IC
+    return _from_quadrants(asc, mc, {
+        11: mc + east / 3, 12: mc + 2 * east / 3,
+        2: asc + west / 3, 3: asc + 2 * west / 3
+    }), np.zeros(asc.shape, dtype=bool)
+
+def equal_cusps(armc, obliquity, latitude, asc, mc, ayanamsa=0.0):
+    """Thirty-degree houses from the Ascendant"""
+    return (asc[..., None] + 30.0 * np.arange(12)) % 360, np.zeros(asc.shape, dtype=bool)
+
+def whole_sign_cusps(armc, obliquity, latitude, asc, mc, ayanamsa=0.0):
+    """Signs as houses, the first being the Ascendant's sign"""
+    return (np.floor(asc / 30)[..., None] * 30 + 30.0 * np.arange(12)) % 360, np.zeros(asc.shape, dtype=bool)
+
+def placidus_cusps(armc, obliquity, latitude, asc, mc, ayanamsa=0.0):
+    """Placidus cusps by Newton iteration on the semi-arcs
+
+    Cusp 11 lies a third of its diurnal semi-arc from the meridian, cusp 12 two
+    thirds; cusps 2 and 3 divide the nocturnal semi-arc after the Ascendant. For
+    an ecliptic point tan(declination) = tan(obliquity) sin(RA), so each cusp's
+    RA solves RA = RAMC + base + fraction * asin(tan(latitude) tan(obliquity) sin(RA)).
+    Where a cusp is circumpolar the system is undefined and Porphyry cusps are
+    returned, flagged in the fallback mask.
+    """
+    shape = np.shape(armc)
+    ramc = np.radians(armc).ravel()
+    epsilon = np.broadcast_to(np.radians(obliquity), shape).ravel()
+    k = np.broadcast_to(np.tan(np.radians(latitude)), shape).ravel() * np.tan(epsilon)
+
+    # RA offset from RAMC = base + fraction * ascensional difference
+    steps = {11: (np.pi / 6, 1 / 3), 12: (np.pi / 3, 2 / 3),
+             2: (2 * np.pi / 3, 2 / 3), 3: (5 * np.pi / 6, 1 / 3)}
+
+    # Like swisseph, treat Placidus as undefined anywhere inside the polar circles,
+    # even at moments when every cusp happens to exist
+    intermediate = {}
+    polar = np.abs(np.broadcast_to(latitude, shape).ravel()) >= 90 - np.degrees(epsilon)
+    failed = polar.copy()
+    for house, (base, fraction) in steps.items():
+        start = ramc + base
+        ra = start.copy()
+        # Only charts still moving are iterated, so a few slow ones cost little
+        active = np.flatnonzero(~failed)
+        for _ in range(PLACIDUS_ITERATIONS):
+            if active.size == 0:
+                break
+            x, ka = ra[active], k[active]
+            product = ka * np.sin(x)
+            undefined = np.abs(product) >= 1
+            product = np.clip(product, -1, 1)
+            root = np.sqrt(np.maximum(1 - product ** 2, 1e-12))
+            residual = x - start[active] - fraction * np.arcsin(product)
+            slope = 1 - fraction * ka * np.cos(x) / root
+            # A flat slope means a cusp at the edge of circumpolarity: take a plain fixed-point step
+            step = np.where(np.abs(slope) > 0.1, residual / np.where(slope == 0, 1, slope), residual)
+            ra[active] = x - step
+            failed[active[undefined]] = True
+            active = active[(np.abs(step) >= PLACIDUS_TOLERANCE) & ~undefined]
+        failed[active] = True
+        intermediate[house] = np.degrees(_ecliptic_from_ra(ra, epsilon)).reshape(shape) - ayanamsa
+
+    cusps = _from_quadrants(asc, mc, intermediate)
+    return _with_fallback(cusps, failed.reshape(shape), armc, obliquity, latitude, asc, mc)
+
+def _cusp_on_pole(ra, epsilon, tan_pole):
+    """Ecliptic longitude rising at oblique ascension ra under a pole of given tangent"""
+    return np.degrees(np.arctan2(np.sin(ra), np.cos(ra) * np.cos(epsilon) - tan_pole * np.sin(epsilon)))
+
+# House circle angle from the meridian for cusps 11, 12, 2 and 3
+QUADRANT_ANGLES = {11: np.pi / 6, 12: np.pi / 3, 2: 2 * np.pi / 3, 3: 5 * np.pi / 6}
+
+def koch_cusps(armc, obliquity, latitude, asc, mc, ayanamsa=0.0):
+    """Koch cusps: the MC degree's semi-arcs trisected in oblique ascension
+
+    Undefined where the MC degree is circumpolar and, as in swisseph, anywhere
+    inside the polar circles; Porphyry cusps are returned there.
+    """
+    ramc = np.radians(armc)
+    epsilon = np.radians(obliquity)
+    tan_phi = np.tan(np.radians(latitude))
+    mc_declination = np.arcsin(np.sin(epsilon) * np.sin(np.radians(mc + ayanamsa)))
+    product = tan_phi * np.tan(mc_declination)
+
+    failed = (np.abs(product) >= 1) | (np.abs(latitude) >= 90 - obliquity)
+    difference = np.arcsin(np.clip(product, -1, 1))
+    shares = {11: -2 / 3, 12: -1 / 3, 2: 1 / 3, 3: 2 / 3}
+    intermediate = {house: _cusp_on_pole(ramc + QUADRANT_ANGLES[house] + share * difference,
+                                         epsilon, tan_phi) - ayanamsa
+                    for house, share in shares.items()}
+
+    cusps = _from_quadrants(asc, mc, intermediate)
+    return _with_fallback(cusps, failed, armc, obliquity, latitude, asc, mc)
+
+def regiomontanus_cusps(armc, obliquity, latitude, asc, mc, ayanamsa=0.0):
+    """Regiomontanus cusps: the celestial equator divided into 30-degree arcs"""
+    ramc = np.radians(armc)
+    epsilon = np.radians(obliquity)
+    tan_phi = np.tan(np.radians(latitude))
+    intermediate = {house: _cusp_on_pole(ramc + angle, epsilon, tan_phi * np.sin(angle)) - ayanamsa
+                    for house, angle in QUADRANT_ANGLES.items()}
+    return _follow_ascendant(intermediate, ramc, epsilon, tan_phi, asc, mc, ayanamsa)
+
+def campanus_cusps(armc, obliquity, latitude, asc, mc, ayanamsa=0.0):
+    """Campanus cusps: the prime vertical divided into 30-degree arcs"""
+    ramc = np.radians(armc)
+    epsilon = np.radians(obliquity)
+    phi = np.radians(latitude)
+    intermediate = {}
+    for house, angle in QUADRANT_ANGLES.items():
+        ra = ramc + np.arctan2(np.sin(angle) * np.cos(phi), np.cos(angle))
+        tan_pole = np.tan(np.arcsin(np.sin(phi) * np.sin(angle)))
+        intermediate[house] = _cusp_on_pole(ra, epsilon, tan_pole) - ayanamsa
+    return _follow_ascendant(intermediate, ramc, epsilon, np.tan(phi), asc, mc, ayanamsa)
+
+def _follow_ascendant(intermediate, ramc, epsilon, tan_phi, asc, mc, ayanamsa):
+    """Turn the other cusps with the Ascendant where the polar flip moved it
+
+    The flip keeps Asc east of the MC; as in swisseph the cusp-10 slot of a
+    flipped Regiomontanus or Campanus chart then holds the IC, keeping the
+    houses in order.
+    """
+    rising = _cusp_on_pole(ramc + np.pi / 2, epsilon, tan_phi) - ayanamsa
+    flipped = np.abs((rising - asc + 180) % 360 - 180) > 90
+    if flipped.any():
+        intermediate = {house: np.where(flipped, cusp + 180, cusp) for house, cusp in intermediate.items()}
+        mc = np.where(flipped, mc + 180, mc)
+    return _from_quadrants(asc, mc, intermediate), np.zeros(np.shape(asc), dtype=bool)
+
+def _with_fallback(cusps, failed, armc, obliquity, latitude, asc, mc):
+    """Replace the cusps of failed charts with Porphyry cusps"""
+    if failed.any():
+        fallback, _ = porphyry_cusps(armc, obliquity, latitude, asc, mc)
+        cusps = np.where(failed[..., None], fallback, cusps)
+    return cusps, failed
+
+# House system code (as in swe.houses) -> cusp function
+HOUSE_SYSTEMS = {
+    'P': placidus_cusps,
+    'K': koch_cusps,
+    'O': porphyry_cusps,
+    'R': regiomontanus_cusps,
+    'C': campanus_cusps,
+    'E': equal_cusps,
+    'W': whole_sign_cusps
+}
+
+HOUSE_SYSTEM_NAMES = {
+    'P': 'Placidus',
+    'K': 'Koch',
+    'O': 'Porphyry',
+    'R': 'Regiomontanus',
+    'C': 'Campanus',
+    'E': 'Equal',
+    'W': 'Whole Sign'
+}
+
+def _angles(jd_ut, latitude, longitude, ayanamsa):
+    jd_ut, latitude, longitude, ayanamsa = np.broadcast_arrays(
+        np.asarray(jd_ut, dtype=np.float64),
+        np.asarray(latitude, dtype=np.float64),
+        np.asarray(longitude, dtype=np.float64),
+        np.asarray(ayanamsa, dtype=np.float64))
+
+    armc, obliquity = sidereal_frame(jd_ut, longitude)
+    asc = (ascendant(armc, obliquity, latitude) - ayanamsa) % 360
+    mc = (midheaven(armc, obliquity) - ayanamsa) % 360
+    return armc, obliquity, latitude, asc, mc
+
+def house_cusps(jd_ut, latitude, longitude, system='P', ayanamsa=0.0):
+    """Cusps, Ascendant and MC for arrays of (jd_ut, latitude, longitude)
+
+    Longitudes are tropical minus ayanamsa (a scalar, or an array broadcasting with
+    jd_ut for the ayanamsa at each moment), matching the per-chart code. Whole Sign
+    houses are taken from the sign of the shifted Ascendant. Returns a dict of
+    arrays: cusps (N, 12), ascendant, midheaven, armc, obliquity and fallback, the
+    latter marking charts where Placidus or Koch was undefined and Porphyry was used.
+    """
+    armc, obliquity, latitude, asc, mc = _angles(jd_ut, latitude, longitude, ayanamsa)
+    cusps, fallback = HOUSE_SYSTEMS[system](armc, obliquity, latitude, asc, mc, ayanamsa)
+
+    return {
+        'cusps': cusps,
+        'ascendant': asc,
+        'midheaven': mc,
+        'armc': armc,
+        'obliquity': obliquity,
+        'fallback': fallback
+    }
+
+def _house_systems_swisseph(jd_ut, latitude, longitude, systems, ayanamsa):
+    """compute_house_systems for a handful of charts via swe.houses_armc
+
+    For one chart NumPy's per-call overhead outweighs the arithmetic, so the
+    shared ARMC and obliquity are handed to swisseph instead.
+    """
+    jd_ut, latitude, longitude, ayanamsa = np.broadcast_arrays(
+        np.asarray(jd_ut, dtype=np.float64),
+        np.asarray(latitude, dtype=np.float64),
+        np.asarray(longitude, dtype=np.float64),
+        np.asarray(ayanamsa, dtype=np.float64))
+    shape = jd_ut.shape
+    count = jd_ut.size
+
+    armc = np.empty(count)
+    obliquity = np.empty(count)
+    asc = np.empty(count)
+    mc = np.empty(count)
+    cusps = np.empty((count, 12, len(systems)))
+    fallback = np.zeros((count, len(systems)), dtype=bool)
+
+    for i, (jd, phi, lam, shift) in enumerate(zip(jd_ut.ravel(), latitude.ravel(), longitude.ravel(),
+                                                  ayanamsa.ravel())):
+        armc[i] = (swe.sidtime(jd) * 15 + lam) % 360
+        obliquity[i] = swe.calc_ut(jd, swe.ECL_NUT)[0][0]
+        porphyry, ascmc = swe.houses_armc(armc[i], phi, obliquity[i], b'O')[:2]
+        asc[i] = (ascmc[0] - shift) % 360
+        mc[i] = (ascmc[1] - shift) % 360
+
+        for k, system in enumerate(systems):
+            if system == 'W':
+                cusps[i, :, k] = (np.floor(asc[i] / 30) * 30 + 30.0 * np.arange(12)) % 360
+                continue
+            try:
+                system_cusps = swe.houses_armc(armc[i], phi, obliquity[i], system.encode())[0]
+            except swe.Error:
+                system_cusps, fallback[i, k] = porphyry, True
+            cusps[i, :, k] = (np.array(system_cusps[-12:]) - shift) % 360
+
+    return {
+        'systems': systems,
+        'cusps': cusps.reshape(shape + (12, len(systems))),
+        'ascendant': asc.reshape(shape),
+        'midheaven': mc.reshape(shape),
+        'armc': armc.reshape(shape),
+        'obliquity': obliquity.reshape(shape),
+        'fallback': fallback.reshape(shape + (len(systems),))
+    }
+
+def compute_house_systems(jd_ut, latitude, longitude, systems=tuple(HOUSE_SYSTEMS), ayanamsa=0.0):
+    """Several house systems at once from one shared ARMC, obliquity, Asc and MC
+
+    Returns the same dict as house_cusps, except cusps has shape (N, 12, k) and
+    fallback (N, k), with k following the order of systems. Batches of up to
+    SWISSEPH_BATCH_LIMIT charts go through swe.houses_armc, larger ones through
+    the NumPy cusp functions.
+    """
+    systems = tuple(systems)
+    unknown = [system for system in systems if system not in HOUSE_SYSTEMS]
+    if unknown:
+        raise ValueError(f"Unknown house systems: {', '.join(unknown)}")
+
+    if np.broadcast(np.asarray(jd_ut), np.asarray(latitude), np.asarray(longitude)).size <= SWISSEPH_BATCH_LIMIT:
+        return _house_systems_swisseph(jd_ut, latitude, longitude, systems, ayanamsa)
+
+    armc, obliquity, latitude, asc, mc = _angles(jd_ut, latitude, longitude, ayanamsa)
+    results = [HOUSE_SYSTEMS[system](armc, obliquity, latitude, asc, mc, ayanamsa) for system in systems]
+
+    return {
+        'systems': systems,
+        'cusps': np.stack([cusps for cusps, _ in results], axis=-1),
+        'ascendant': asc,
+        'midheaven': mc,
+        'armc': armc,
+        'obliquity': obliquity,
+        'fallback': np.stack([fallback for _, fallback in results], axis=-1)
+    }
+
+def compare_with_swisseph(count=2000, seed=34, systems=tuple(HOUSE_SYSTEMS), max_latitude=66.0):
+    """Largest deviation in arcseconds from swe.houses per system over random charts"""
+    rng = np.random.default_rng(seed)
+    jd = rng.uniform(2415020.5, 2488069.5, count)  # 1900-2100
+    latitude = rng.uniform(-max_latitude, max_latitude, count)
+    longitude = rng.uniform(-180, 180, count)
+
+    result = compute_house_systems(jd, latitude, longitude, systems)
+    if count <= SWISSEPH_BATCH_LIMIT:
+        raise ValueError(f"Compare more than {SWISSEPH_BATCH_LIMIT} charts to exercise the NumPy path")
+    report = {}
+    for k, system in enumerate(result['systems']):
+        worst = 0.0
+        for i in range(count):
+            cusps, ascmc = swe.houses(jd[i], latitude[i], longitude[i], system.encode())[:2]
+            expected = np.array(list(cusps[-12:]) + [ascmc[0], ascmc[1]])
+            actual = np.append(result['cusps'][i, :, k], [result['ascendant'][i], result['midheaven'][i]])
+            worst = max(worst, float(np.abs((actual - expected + 180) % 360 - 180).max()) * 3600)
+        report[system] = round(worst, 4)
+    return report
+
+def main():
+    """Check against swe.houses and time a large batch"""
+    parser = argparse.ArgumentParser(description="Vectorized house cusps")
+    parser.add_argument('--check', type=int, default=2000, help="charts compared with swe.houses")
+    parser.add_argument('--batch', type=int, default=100000, help="charts in the timed batch")
+    parser.add_argument('--system', default='P', choices=sorted(HOUSE_SYSTEMS))
+    args = parser.parse_args()
+
+    deviation = compare_with_swisseph(args.check)
+
+    rng = np.random.default_rng(0)
+    jd = rng.uniform(2415020.5, 2488069.5, args.batch)
+    latitude = rng.uniform(-89, 89, args.batch)
+    longitude = rng.uniform(-180, 180, args.batch)
+    start = time.perf_counter()
+    result = house_cusps(jd, latitude, longitude, args.system)
+    elapsed = time.perf_counter() - start
+
+    print(json.dumps({
+        'max_deviation_arcsec': deviation,
+        'batch': args.batch,
+        'system': args.system,
+        'batch_seconds': round(elapsed, 4),
+        'per_chart_us': round(elapsed / args.batch * 1e6, 3),
+        'fallback_charts': int(result['fallback'].sum())
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Long-Lived KP Calculation Worker
+Reads newline-delimited JSON requests on stdin and writes one JSON response per line,
+so the web server pays interpreter and ephemeris start-up once instead of per chart
+
+Request:   {"id": 1, "entry": "chart", "input": {...}, "profile": false}
+Response:  {"id": 1, "success": true, "result": {...}}
+Control:   {"id": 2, "control": "metrics" | "timings" | "ping" | "shutdown"}
+"""
+
+import sys
+import json
+import time
+import argparse
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import kp_timing
+import kp_metrics
+from kp_profiler import run_profiled
+from web_kp_calculator import calculate_chart_for_web
+from kp_chart_cache import cached_chart
+from complete_kp_analysis import calculate_complete_kp_chart
+from ultimate_kp_system import calculate_vimshottari_dasha, calculate_current_transits
+from kp_locality_grid import locality_grid, grid_to_json
+from kp_ruling_planets import ruling_planets, current_ruling_planets
+from kp_transit_snapshot import current_transits_snapshot
+from kp_event_timing import EVENT_HOUSES, DEFAULT_TRANSITS, event_timing, warm_transit_blocks
+from kp_birth_sensitivity import DEFAULT_MINUTES, birth_time_sensitivity
+
+def _dasha_entry(input_data):
+    birth_date = datetime.fromisoformat(input_data['birth_date'])
+    return calculate_vimshottari_dasha(input_data['moon_longitude'], birth_date)
+
+def _transits_entry(input_data):
+    date = input_data.get('date')
+    if date:
+        return calculate_current_transits(datetime.fromisoformat(date))
+    # "Now" is served from the shared per-bucket snapshot
+    return current_transits_snapshot()['transits']
+
+def _current_transits_entry(input_data):
+    return current_transits_snapshot()
+
+def _locality_grid_entry(input_data):
+    grid = locality_grid(input_data['birth'],
+                         tuple(input_data.get('lat_range', (-60.0, 60.0))),
+                         tuple(input_data.get('lon_range', (-180.0, 180.0))),
+                         input_data.get('step', 1.0))
+    return grid_to_json(grid)
+
+def _ruling_planets_entry(input_data):
+    latitude, longitude = float(input_data['latitude']), float(input_data['longitude'])
+    if input_data.get('jd') is None:
+        return current_ruling_planets(latitude, longitude, input_data.get('timezone'))
+    return ruling_planets(float(input_data['jd']), latitude, longitude, input_data.get('timezone'))
+
+def _event_timing_entry(input_data):
+    houses = input_data.get('houses') or EVENT_HOUSES[input_data.get('event', 'marriage')]
+    return event_timing(input_data['birth'], houses, input_data.get('transits', DEFAULT_TRANSITS),
+                        input_data.get('arc', 'sub'), judgment_jd=input_data.get('judgment_jd'))
+
+def _birth_sensitivity_entry(input_data):
+    return birth_time_sensitivity(input_data['birth'], input_data.get('minutes', DEFAULT_MINUTES),
+                                  input_data.get('system', 'vimshottari'))
+
+ENTRY_POINTS = {
+    'chart': cached_chart,
+    'complete_chart': calculate_complete_kp_chart,
+    'dasha': _dasha_entry,
+    'transits': _transits_entry,
+    'current_transits': _current_transits_entry,
+    'locality_grid': _locality_grid_entry,
+    'ruling_planets': _ruling_planets_entry,
+    'event_timing': _event_timing_entry,
+    'birth_sensitivity': _birth_sensitivity_entry
+}
+
+def handle_request(request):
+    """Dispatch one calculation request and record its metrics"""
+    entry = request.get('entry', 'chart')
+    func = ENTRY_POINTS.get(entry)
+    if func is None:
+        return {'success': False, 'error': f"Unknown entry point: {entry}"}
+
+    input_data = request.get('input') or {}
+    force_profile = request.get('profile') or (isinstance(input_data, dict) and input_data.get('profile'))
+
+    start = time.perf_counter()
+    try:
+        result = run_profiled(entry, func, input_data, force_profile)
+        # Entry points that report failure in-band still count as errors
+        success = not (isinstance(result, dict) and result.get('success') is False)
+        response = {'success': True, 'result': result}
+    except Exception as e:
+        success = False
+        response = {'success': False, 'error': str(e)}
+
+    kp_metrics.observe_request(entry, (time.perf_counter() - start) * 1000, success)
+    return response
+
+def handle_control(command):
+    """Answer a control message"""
+    if command == 'metrics':
+        return {'success': True, 'metrics': kp_metrics.render_prometheus()}
+    if command == 'timings':
+        return {'success': True, 'timings': kp_timing.dump_histograms()}
+    if command == 'ping':
+        return {'success': True, 'pong': True}
+    if command == 'shutdown':
+        return {'success': True, 'shutdown': True}
+    return {'success': False, 'error': f"Unknown control message: {command}"}
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Serves GET /metrics in Prometheus text format"""
+
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = kp_metrics.render_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_metrics_server(port, host='127.0.0.1'):
+    """Serve /metrics from a daemon thread on a local port"""
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name='kp-metrics', daemon=True)
+    thread.start()
+    return server
+
+def serve(stdin=sys.stdin, stdout=sys.stdout):
+    """Process requests until EOF or a shutdown control message"""
+    for line in stdin:
+        line = line.strip()
+        if not line:
+            continue
+
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError as e:
+            response = {'success': False, 'error': f"Invalid JSON: {e}"}
+            request = {}
+        else:
+            if not isinstance(request, dict):
+                response = {'success': False, 'error': "Request must be a JSON object"}
+                request = {}
+            elif 'control' in request:
+                response = handle_control(request['control'])
+            else:
+                response = handle_request(request)
+
+        if 'id' in request:
+            response = {'id': request['id'], **response}
+
+        stdout.write(json.dumps(response, ensure_ascii=False, default=str) + '\n')
+        stdout.flush()
+
+        if response.get('shutdown'):
+            break
+
+def main():
+    """Run the worker on stdin/stdout"""
+    parser = argparse.ArgumentParser(description="Long-lived KP calculation worker")
+    parser.add_argument('--metrics-port', type=int, help="serve Prometheus metrics on this local port")
+    parser.add_argument('--no-cache', action='store_true', help="calculate every chart, bypassing the chart cache")
+    parser.add_argument('--stage-histograms', action='store_true',
+                        help="aggregate per-stage timings (also enabled by KP_TIMINGS=1)")
+    parser.add_argument('--no-warm', action='store_true',
+                        help="skip filling the event timing transit cache at start-up")
+    args = parser.parse_args()
+
+    if args.no_cache:
+        ENTRY_POINTS['chart'] = calculate_chart_for_web
+
+    if args.stage_histograms:
+        kp_timing.enable_histograms()
+
+    if args.metrics_port:
+        start_metrics_server(args.metrics_port)
+
+    # About twenty seconds of root finding for every transit planet, in the background so
+    # requests are served meanwhile
+    if not args.no_warm:
+        threading.Thread(target=warm_transit_blocks, name='kp-transit-warm', daemon=True).start()
+
+    serve()
+
+if __name__ == "__main__":
+    main()
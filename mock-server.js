@@ -2,6 +2,7 @@ import express from 'express';
 import cors from 'cors';
 import { spawn } from 'child_process';
 import path from 'path';
+import { getWorker } from './kp-worker-client.js';
 
 const app = express();
 const PORT = 5001;
@@ -143,54 +144,14 @@ app.post('/api/horoscopes/simple', async (req, res) => {
       birthPlace: birthPlace || 'Tamil Nadu, India'
     };
     
-    // Call Python script with Swiss Ephemeris
-    const pythonProcess = spawn('python3', ['web_kp_calculator.py', JSON.stringify(inputData)]);
-    
-    let pythonOutput = '';
-    let pythonError = '';
-    
-    pythonProcess.stdout.on('data', (data) => {
-      pythonOutput += data.toString();
-    });
-    
-    pythonProcess.stderr.on('data', (data) => {
-      pythonError += data.toString();
-    });
-    
-    pythonProcess.on('close', (code) => {
-      if (code === 0 && pythonOutput) {
-        try {
-          const result = JSON.parse(pythonOutput);
-          console.log('✅ Swiss Ephemeris calculation successful');
-          if (!res.headersSent) {
-            res.json(result);
-          }
-        } catch (parseError) {
-          console.error('❌ Failed to parse Python output:', parseError);
-          if (!res.headersSent) {
-            res.json(getFallbackChart(name, birthDate, birthTime, birthPlace));
-          }
-        }
-      } else {
-        console.error('❌ Python script error:', pythonError);
-        console.log('🔄 Using fallback calculation...');
-        if (!res.headersSent) {
-          res.json(getFallbackChart(name, birthDate, birthTime, birthPlace));
-        }
-      }
-    });
-    
-    // Timeout after 30 seconds
-    setTimeout(() => {
-      pythonProcess.kill();
-      console.log('⏰ Python calculation timeout, using fallback');
-      if (!res.headersSent) {
-        res.json(getFallbackChart(name, birthDate, birthTime, birthPlace));
-      }
-    }, 30000);
+    // Calculate in the long-lived Python worker (Swiss Ephemeris)
+    const result = await getWorker().request('chart', inputData);
+    console.log('✅ Swiss Ephemeris calculation successful');
+    res.json(result);
     
   } catch (error) {
-    console.error('❌ Error calling Swiss Ephemeris:', error);
+    console.error('❌ Error calling Swiss Ephemeris:', error.message);
+    console.log('🔄 Using fallback calculation...');
     res.json(getFallbackChart(name, birthDate, birthTime, birthPlace));
   }
 });
@@ -232,58 +193,18 @@ function getFallbackChart(name, birthDate, birthTime, birthPlace) {
   };
 }
 
-// Current transits endpoint
+// Current transits endpoint, served from the worker's shared per-minute snapshot
 app.get('/api/transits/current', async (req, res) => {
-  console.log('🌟 Calculating current planetary transits...');
-  
   try {
-    const inputData = {
-      name: 'Current Transits',
-      birthDate: new Date().toISOString().split('T')[0],
-      birthTime: new Date().toTimeString().split(' ')[0],
-      birthPlace: 'Current Planetary Positions'
-    };
-    
-    const pythonProcess = spawn('python3', ['web_kp_calculator.py', JSON.stringify(inputData)]);
-    
-    let pythonOutput = '';
-    
-    pythonProcess.stdout.on('data', (data) => {
-      pythonOutput += data.toString();
-    });
-    
-    pythonProcess.on('close', (code) => {
-      if (code === 0 && pythonOutput) {
-        try {
-          const result = JSON.parse(pythonOutput);
-          if (!res.headersSent) {
-            res.json({
-              success: true,
-              transits: result.chart.planetary_positions,
-              calculation_time: new Date().toISOString(),
-              ayanamsa: result.chart.ayanamsa
-            });
-          }
-        } catch (parseError) {
-          if (!res.headersSent) {
-            res.json({
-              success: false,
-              error: 'Failed to parse transit data',
-              fallback_message: 'Swiss Ephemeris not available'
-            });
-          }
-        }
-      } else {
-        if (!res.headersSent) {
-          res.json({
-            success: false,
-            error: 'Failed to calculate transits',
-            fallback_message: 'Swiss Ephemeris not available'
-          });
-        }
-      }
+    const snapshot = await getWorker().request('current_transits');
+    res.json({
+      success: true,
+      transits: snapshot.positions,
+      calculation_time: snapshot.calculation_time,
+      valid_until: snapshot.valid_until,
+      age_seconds: snapshot.age_seconds,
+      ayanamsa: snapshot.ayanamsa
     });
-    
   } catch (error) {
     res.json({
       success: false,
@@ -354,12 +275,24 @@ app.post('/api/horoscopes/advanced', async (req, res) => {
   }
 });
 
+// Prometheus metrics of the Python calculation worker
+app.get('/metrics', async (req, res) => {
+  try {
+    const response = await getWorker().control('metrics');
+    res.type('text/plain; version=0.0.4; charset=utf-8').send(response.metrics);
+  } catch (error) {
+    res.status(503).type('text/plain').send(`# worker unavailable: ${error.message}\n`);
+  }
+});
+
 // Mock logout endpoint
 app.post('/api/auth/logout', (req, res) => {
   res.json({ success: true });
 });
 
 app.listen(PORT, () => {
+  // Start the worker now so the first chart does not pay its start-up
+  getWorker();
   console.log(`🚀 Mock API server running on http://localhost:${PORT}`);
   console.log(`🔗 Frontend should connect to this server for API calls`);
   console.log(`👤 Mock admin user: admin@localhost.com`);
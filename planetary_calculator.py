@@ -9,8 +9,9 @@ import json
 from datetime import datetime
 import swisseph as swe
 
-# KP-Newcomb Ayanamsa value
-KP_NEWCOMB_AYANAMSA = 23.71861111
+from kp_timezones import resolve_zone, utc_offset_hours
+from kp_gazetteer import resolve_place
+from kp_ayanamsa import KP_AYANAMSA
 
 # Planet IDs for Swiss Ephemeris
 PLANETS = {
@@ -29,8 +30,8 @@ PLANETS = {
 SIGNS = ["Aries", "Taurus", "Gemini", "Cancer", "Leo", "Virgo",
          "Libra", "Scorpio", "Sagittarius", "Capricorn", "Aquarius", "Pisces"]
 
-def calculate_julian_day(date_str, time_str):
-    """Calculate Julian Day using Swiss Ephemeris method"""
+def calculate_julian_day(date_str, time_str, timezone_name=None):
+    """Calculate Julian Day (UT) from a local date and time in the given zone"""
     try:
         # Parse date (YYYY-MM-DD format)
         if '/' in date_str:
@@ -48,8 +49,10 @@ def calculate_julian_day(date_str, time_str):
         minute = int(time_parts[1])
         second = int(time_parts[2]) if len(time_parts) > 2 else 0
         
-        # Calculate decimal time
+        # Calculate decimal time, converted from local time to UT
+        zone = resolve_zone(timezone_name)
         decimal_time = hour + minute/60 + second/3600
+        decimal_time -= utc_offset_hours(zone, year, month, day, hour, minute, second)
         
         # Use Swiss Ephemeris julday function
         jd = swe.julday(year, month, day, decimal_time)
@@ -76,7 +79,7 @@ def calculate_planetary_positions(jd):
                     tropical_lon = result[0]
                 
                 # Apply KP Ayanamsa to get sidereal longitude
-                sidereal_lon = (tropical_lon - KP_NEWCOMB_AYANAMSA) % 360
+                sidereal_lon = (tropical_lon - KP_AYANAMSA) % 360
                 if sidereal_lon < 0:
                     sidereal_lon += 360
                 
@@ -124,8 +127,11 @@ def main():
     time_str = sys.argv[2]
     place = sys.argv[3]
     
+    # Local time is interpreted in the zone of the birth place, when known
+    resolved = resolve_place(place)
+    
     # Calculate Julian Day
-    jd = calculate_julian_day(date_str, time_str)
+    jd = calculate_julian_day(date_str, time_str, resolved and resolved['timezone'])
     if jd is None:
         print(json.dumps({"error": "Failed to calculate Julian Day"}))
         sys.exit(1)
@@ -140,7 +146,8 @@ def main():
         "birth_date": date_str,
         "birth_time": time_str,
         "birth_place": place,
-        "ayanamsa": KP_NEWCOMB_AYANAMSA,
+        "resolved_place": resolved,
+        "ayanamsa": KP_AYANAMSA,
         "planetary_positions": positions
     }
     
@@ -14,6 +14,10 @@ echo "DATABASE_URL=sqlite:local.db" > .env
 echo "🗄️ Creating database tables..."
 NODE_ENV=development npm run db:push
 
+# Build the Moon nakshatra and solar ingress catalogs and the gazetteer index (read-only at runtime)
+echo "🌙 Building ephemeris catalogs..."
+npm run build:catalogs
+
 # Add sample data
 echo "📊 Adding sample data..."
 node add-dummy-data.js
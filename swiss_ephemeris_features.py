@@ -6,8 +6,7 @@ Clean working demonstration
 
 import swisseph as swe
 
-# KP-Newcomb Ayanamsa value: 23° 43' 04"
-KP_AYANAMSA = 23 + 43/60 + 4/3600
+from kp_ayanamsa import KP_AYANAMSA, sidereal_calc
 
 def format_degrees(decimal_degrees):
     """Convert decimal degrees to degrees, minutes, seconds format"""
@@ -31,9 +30,6 @@ def main():
     print(f"Julian Day (UTC): {jd_utc:.6f}")
     print()
     
-    # Set KP Ayanamsa
-    swe.set_sid_mode(swe.SIDM_USER, 0, KP_AYANAMSA)
-    
     print("1. PLANETARY POSITIONS WITH ADVANCED DATA")
     print("-" * 60)
     
@@ -45,12 +41,12 @@ def main():
     
     for name, planet_id in planets.items():
         # Get position with speed data
-        result = swe.calc_ut(jd_utc, planet_id, swe.FLG_SPEED | swe.FLG_SIDEREAL)
+        result = sidereal_calc(jd_utc, planet_id)
         
-        longitude = result[0][0]
-        latitude = result[0][1]
-        distance = result[0][2]
-        speed = result[0][3]
+        longitude = result[0]
+        latitude = result[1]
+        distance = result[2]
+        speed = result[3]
         
         # Calculate sign position
         sign_num = int(longitude // 30)
@@ -83,8 +79,6 @@ def main():
         ayanamsa_value = swe.get_ayanamsa_ut(jd_utc)
         print(f"{system_name:20}: {format_degrees(ayanamsa_value)}")
     
-    # Reset to KP
-    swe.set_sid_mode(swe.SIDM_USER, 0, KP_AYANAMSA)
     print(f"{'KP (Custom)':20}: {format_degrees(KP_AYANAMSA)}")
     
     print("\n3. HOUSE SYSTEMS (Placidus)")
@@ -98,7 +92,7 @@ def main():
         house_cusps = houses_result[0]
         ascmc = houses_result[1]
         
-        for i, cusp in enumerate(house_cusps[1:], 1):
+        for i, cusp in enumerate(house_cusps[-12:], 1):  # pyswisseph >= 2.10 returns 12 cusps, older versions 13
             cusp_sidereal = cusp - KP_AYANAMSA
             if cusp_sidereal < 0:
                 cusp_sidereal += 360
@@ -132,7 +126,7 @@ def main():
     
     # Sun in different coordinate systems
     sun_tropical = swe.calc_ut(jd_utc, swe.SUN)[0][0]
-    sun_sidereal = swe.calc_ut(jd_utc, swe.SUN, swe.FLG_SIDEREAL)[0][0]
+    sun_sidereal = sidereal_calc(jd_utc, swe.SUN)[0]
     sun_equatorial = swe.calc_ut(jd_utc, swe.SUN, swe.FLG_EQUATORIAL)[0]
     
     print(f"Sun Tropical:        {format_degrees(sun_tropical)}")
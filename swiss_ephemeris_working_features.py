@@ -9,8 +9,7 @@ import json
 import swisseph as swe
 from datetime import datetime
 
-# KP-Newcomb Ayanamsa value: 23° 43' 04"
-KP_AYANAMSA = 23 + 43/60 + 4/3600
+from kp_ayanamsa import sidereal_calc
 
 def format_degrees(decimal_degrees):
     """Convert decimal degrees to degrees, minutes, seconds format"""
@@ -100,8 +99,7 @@ def demo_coordinate_systems():
     print(f"Tropical:     {sun_tropical[0]:7.3f}° longitude")
     
     # Sidereal (with our KP Ayanamsa)
-    swe.set_sid_mode(swe.SIDM_USER, 0, KP_AYANAMSA)
-    sun_sidereal = swe.calc_ut(jd_utc, swe.SUN, swe.FLG_SIDEREAL)[0]
+    sun_sidereal = sidereal_calc(jd_utc, swe.SUN)
     print(f"Sidereal:     {sun_sidereal[0]:7.3f}° longitude")
     
     # Heliocentric (Sun as center)
@@ -202,8 +200,6 @@ def main():
     print("Birth: 03/11/1990, 11:31:29 AM IST, Tamil Nadu")
     print()
     
-    swe.set_sid_mode(swe.SIDM_USER, 0, KP_AYANAMSA)
-    
     demo_planetary_speeds_and_distances()
     demo_coordinate_systems()
     demo_time_calculations()
@@ -8,9 +8,11 @@ import sys
 import json
 import swisseph as swe
 from datetime import datetime, timedelta
+from itertools import islice
 
-# KP-Newcomb Ayanamsa value: 23° 43' 04"
-KP_AYANAMSA = 23 + 43/60 + 4/3600
+from kp_metrics import count_body_error, count_ephemeris_calls
+from kp_dasha_engine import VIMSHOTTARI, dasha_from_moon
+from kp_ayanamsa import sidereal_calc
 
 SIGNS = ["Aries", "Taurus", "Gemini", "Cancer", "Leo", "Virgo",
          "Libra", "Scorpio", "Sagittarius", "Capricorn", "Aquarius", "Pisces"]
@@ -23,67 +25,27 @@ NAKSHATRAS = [
     "Purva Bhadrapada", "Uttara Bhadrapada", "Revati"
 ]
 
-# Vimshottari Dasha periods (in years)
-DASHA_PERIODS = {
-    'Ketu': 7, 'Venus': 20, 'Sun': 6, 'Moon': 10, 'Mars': 7,
-    'Rahu': 18, 'Jupiter': 16, 'Saturn': 19, 'Mercury': 17
-}
-
-# Dasha sequence
-DASHA_SEQUENCE = ['Ketu', 'Venus', 'Sun', 'Moon', 'Mars', 'Rahu', 'Jupiter', 'Saturn', 'Mercury']
+# Vimshottari Dasha periods (in years) and sequence, from the dasha engine's table
+DASHA_PERIODS = dict(VIMSHOTTARI.years)
+DASHA_SEQUENCE = list(VIMSHOTTARI.lords)
 
 def calculate_vimshottari_dasha(moon_longitude, birth_date):
-    """Calculate Vimshottari Dasha system"""
-    
-    # Find Moon's nakshatra
-    nakshatra_span = 360 / 27  # 13.333...
-    moon_nakshatra = int(moon_longitude / nakshatra_span)
-    
-    # Distance Moon has traveled in current nakshatra
-    distance_in_nak = moon_longitude % nakshatra_span
+    """Calculate Vimshottari Dasha system: the rest of the birth dasha and the next five"""
     
-    # Find ruling planet of Moon's nakshatra
-    ruling_planets = ['Ketu', 'Venus', 'Sun', 'Moon', 'Mars', 'Rahu', 'Jupiter', 'Saturn', 'Mercury']
-    moon_dasha_lord = ruling_planets[moon_nakshatra % 9]
+    # Periods counted in days from birth
+    dasha = dasha_from_moon(moon_longitude, 0.0)
     
-    # Calculate remaining period in current dasha
-    total_nak_period = DASHA_PERIODS[moon_dasha_lord] * 365.25  # Convert to days
-    period_per_degree = total_nak_period / nakshatra_span
-    remaining_days = (nakshatra_span - distance_in_nak) * period_per_degree
-    
-    # Start building dasha periods
     dasha_periods = []
-    current_date = birth_date
-    
-    # Add remaining period of birth dasha
-    end_date = current_date + timedelta(days=remaining_days)
-    dasha_periods.append({
-        'planet': moon_dasha_lord,
-        'start_date': current_date.strftime('%Y-%m-%d'),
-        'end_date': end_date.strftime('%Y-%m-%d'),
-        'duration_years': remaining_days / 365.25,
-        'is_birth_dasha': True
-    })
-    
-    # Add next 5 complete dashas
-    current_date = end_date
-    current_planet_index = (DASHA_SEQUENCE.index(moon_dasha_lord) + 1) % 9
-    
-    for _ in range(5):
-        planet = DASHA_SEQUENCE[current_planet_index]
-        duration_days = DASHA_PERIODS[planet] * 365.25
-        end_date = current_date + timedelta(days=duration_days)
-        
+    for period in islice(dasha.periods(1), 6):
+        planet = period['lords'][0]
+        is_birth_dasha = not dasha_periods
         dasha_periods.append({
             'planet': planet,
-            'start_date': current_date.strftime('%Y-%m-%d'),
-            'end_date': end_date.strftime('%Y-%m-%d'),
-            'duration_years': DASHA_PERIODS[planet],
-            'is_birth_dasha': False
+            'start_date': (birth_date + timedelta(days=period['start'])).strftime('%Y-%m-%d'),
+            'end_date': (birth_date + timedelta(days=period['end'])).strftime('%Y-%m-%d'),
+            'duration_years': period['end'] / 365.25 if is_birth_dasha else DASHA_PERIODS[planet],
+            'is_birth_dasha': is_birth_dasha
         })
-        
-        current_date = end_date
-        current_planet_index = (current_planet_index + 1) % 9
     
     return dasha_periods
 
@@ -175,9 +137,6 @@ def calculate_current_transits(current_date):
     current_jd = swe.julday(current_date.year, current_date.month, current_date.day, 
                            current_date.hour + current_date.minute/60)
     
-    # Set KP Ayanamsa
-    swe.set_sid_mode(swe.SIDM_USER, 0, KP_AYANAMSA)
-    
     transits = {}
     planets = {
         'Sun': swe.SUN, 'Moon': swe.MOON, 'Mercury': swe.MERCURY,
@@ -187,9 +146,9 @@ def calculate_current_transits(current_date):
     
     for planet_name, planet_id in planets.items():
         try:
-            result = swe.calc_ut(current_jd, planet_id, swe.FLG_SPEED | swe.FLG_SIDEREAL)
-            longitude = result[0][0]
-            speed = result[0][3]
+            result = sidereal_calc(current_jd, planet_id)
+            longitude = result[0]
+            speed = result[3]
             
             sign_num = int(longitude // 30)
             degrees_in_sign = longitude % 30
@@ -203,8 +162,11 @@ def calculate_current_transits(current_date):
             }
             
         except Exception as e:
+            count_body_error(planet_name)
             transits[planet_name] = {'error': str(e)}
     
+    count_ephemeris_calls('calc_ut', len(planets))
+    
     return transits
 
 def analyze_planet_strength(planet_data, house_position):
@@ -349,8 +311,6 @@ def main():
     jd_utc = swe.julday(year, month, day, decimal_time - tz_offset)
     birth_date = datetime(year, month, day, hour, minute, second)
     
-    swe.set_sid_mode(swe.SIDM_USER, 0, KP_AYANAMSA)
-    
     # Calculate planetary positions (reusing previous function logic)
     planets = {'Sun': swe.SUN, 'Moon': swe.MOON, 'Mercury': swe.MERCURY,
                'Venus': swe.VENUS, 'Mars': swe.MARS, 'Jupiter': swe.JUPITER,
@@ -358,9 +318,9 @@ def main():
     
     planet_positions = {}
     for planet_name, planet_id in planets.items():
-        result = swe.calc_ut(jd_utc, planet_id, swe.FLG_SPEED | swe.FLG_SIDEREAL)
-        longitude = result[0][0]
-        speed = result[0][3]
+        result = sidereal_calc(jd_utc, planet_id)
+        longitude = result[0]
+        speed = result[3]
         
         planet_positions[planet_name] = {
             'longitude': longitude,
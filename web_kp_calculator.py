@@ -9,8 +9,13 @@ import json
 import swisseph as swe
 from datetime import datetime
 
-# KP-Newcomb Ayanamsa value: 23° 43' 04"
-KP_AYANAMSA = 23 + 43/60 + 4/3600
+from kp_timing import stage, collect_timings
+from kp_metrics import count_body_error, count_ephemeris_calls
+from kp_timezones import resolve_zone, utc_offset_hours
+from kp_gazetteer import resolve_place
+from kp_vector_houses import HOUSE_SYSTEM_NAMES, compute_house_systems
+from kp_ayanamsa import AYANAMSA_NAME, kp_ayanamsa, sidereal_calc, to_sidereal
+from kp_sub_table import sub_division
 
 SIGNS = ["Aries", "Taurus", "Gemini", "Cancer", "Leo", "Virgo",
          "Libra", "Scorpio", "Sagittarius", "Capricorn", "Aquarius", "Pisces"]
@@ -23,6 +28,9 @@ NAKSHATRAS = [
     "Purva Bhadrapada", "Uttara Bhadrapada", "Revati"
 ]
 
+# Bump whenever chart output changes, so cached charts are recalculated
+ENGINE_VERSION = '10'
+
 STAR_LORDS = [
     'Ketu', 'Venus', 'Sun', 'Moon', 'Mars', 'Rahu', 'Jupiter', 'Saturn', 'Mercury',
     'Ketu', 'Venus', 'Sun', 'Moon', 'Mars', 'Rahu', 'Jupiter', 'Saturn', 'Mercury',
@@ -54,58 +62,121 @@ def get_nakshatra_info(longitude):
     }
 
 def get_sub_lord(longitude):
-    """Calculate KP Sub-Lord"""
-    # Simplified sub-lord calculation
-    sub_lord_divisions = {
-        'Ketu': 7, 'Venus': 20, 'Sun': 6, 'Moon': 10, 'Mars': 7,
-        'Rahu': 18, 'Jupiter': 16, 'Saturn': 19, 'Mercury': 17
-    }
+    """Calculate KP Sub-Lord from the 249-sub table"""
+    return sub_division(longitude).sub_lord
+
+def parse_birth_input(input_data):
+    """Normalize the astronomical inputs of a web chart request
+
+    Everything the chart depends on (besides ENGINE_VERSION) is returned here,
+    so this is also the basis of the chart cache key.
+    """
+    birth_date_str = input_data.get('birthDate', '1990-11-03')
+    birth_time_str = input_data.get('birthTime', '11:31:29')
     
-    total_years = sum(sub_lord_divisions.values())  # 120 years
-    cycle_position = (longitude / 360) * total_years
+    # Parse date and time
+    year, month, day = map(int, birth_date_str.split('-'))
     
-    cumulative_years = 0
-    planets_in_order = ['Ketu', 'Venus', 'Sun', 'Moon', 'Mars', 'Rahu', 'Jupiter', 'Saturn', 'Mercury']
+    if ':' in birth_time_str:
+        time_parts = birth_time_str.split(':')
+        hour = int(time_parts[0])
+        minute = int(time_parts[1]) if len(time_parts) > 1 else 0
+        second = int(time_parts[2]) if len(time_parts) > 2 else 0
+    else:
+        hour, minute, second = 11, 31, 29  # Default
     
-    for planet in planets_in_order:
-        planet_years = sub_lord_divisions[planet]
-        if cycle_position < cumulative_years + planet_years:
-            return planet
-        cumulative_years += planet_years
+    # Explicit coordinates, then the birth place looked up in the gazetteer,
+    # else the default (Tamil Nadu)
+    has_coordinates = input_data.get('latitude') is not None and input_data.get('longitude') is not None
+    place = None if has_coordinates else resolve_place(input_data.get('birthPlace'))
+    if has_coordinates:
+        latitude = float(input_data['latitude'])
+        longitude = float(input_data['longitude'])
+    elif place:
+        latitude = place['latitude']
+        longitude = place['longitude']
+    else:
+        latitude = 6 + 55/60 + 55/3600
+        longitude = 79 + 50/60 + 52/3600
     
-    return 'Ketu'  # Fallback
+    # Time zone: explicit offset, IANA zone name, the resolved place's zone, zone at
+    # the coordinates, else Indian civil time with its history (Madras time before
+    # 1906, war time 1941-1945)
+    if input_data.get('timezoneOffset') is not None:
+        timezone_name = None
+        timezone_offset = float(input_data['timezoneOffset'])
+    else:
+        timezone_name = resolve_zone(input_data.get('timezone') or (place and place['timezone']),
+                                     latitude if has_coordinates else None,
+                                     longitude if has_coordinates else None)
+        timezone_offset = utc_offset_hours(timezone_name, year, month, day, hour, minute, second)
+    
+    return {
+        'year': year, 'month': month, 'day': day,
+        'hour': hour, 'minute': minute, 'second': second,
+        'timezone': timezone_name,
+        'timezone_offset': timezone_offset,
+        'resolved_place': place and f"{place['name']}, {place['country']}",
+        'latitude': latitude,
+        'longitude': longitude,
+        'ayanamsa': AYANAMSA_NAME,
+        'house_system': 'P',
+        'house_systems': parse_house_systems(input_data.get('house_systems'))
+    }
+
+def parse_house_systems(requested):
+    """Normalize a house_systems option (codes like 'K' or names like 'Koch') to codes"""
+    if not requested:
+        return None
+
+    by_name = {name.lower(): code for code, name in HOUSE_SYSTEM_NAMES.items()}
+    codes = []
+    for system in requested:
+        code = system if system in HOUSE_SYSTEM_NAMES else by_name.get(str(system).lower())
+        if code is None:
+            raise ValueError(f"Unknown house system: {system}")
+        if code not in codes:
+            codes.append(code)
+    return codes
 
 def calculate_chart_for_web(input_data):
-    """Calculate complete chart for web display"""
+    """Calculate complete chart for web display
+
+    Set 'debug_timings': true in input_data to get per-stage durations in
+    chart['technical_info']['timings_ms'].
+    """
+    with collect_timings(input_data.get('debug_timings')) as timings:
+        with stage('total'):
+            result = _calculate_chart(input_data)
+
+    if timings is not None and result['chart']:
+        result['chart']['technical_info']['timings_ms'] = timings
+
+    return result
+
+def _calculate_chart(input_data):
+    """Calculate the chart, timing each pipeline stage"""
     try:
         # Parse input data
+        birth = parse_birth_input(input_data)
         birth_date_str = input_data.get('birthDate', '1990-11-03')
         birth_time_str = input_data.get('birthTime', '11:31:29')
         name = input_data.get('name', 'Unknown')
         place = input_data.get('birthPlace', 'Tamil Nadu, India')
         
-        # Parse date and time
-        year, month, day = map(int, birth_date_str.split('-'))
-        
-        if ':' in birth_time_str:
-            time_parts = birth_time_str.split(':')
-            hour = int(time_parts[0])
-            minute = int(time_parts[1]) if len(time_parts) > 1 else 0
-            second = int(time_parts[2]) if len(time_parts) > 2 else 0
-        else:
-            hour, minute, second = 11, 31, 29  # Default
-        
-        # Default coordinates (Tamil Nadu)
-        latitude = 6 + 55/60 + 55/3600
-        longitude = 79 + 50/60 + 52/3600
-        timezone_offset = 5.5  # IST
+        year, month, day = birth['year'], birth['month'], birth['day']
+        hour, minute, second = birth['hour'], birth['minute'], birth['second']
+        latitude = birth['latitude']
+        longitude = birth['longitude']
+        timezone_offset = birth['timezone_offset']
         
         # Calculate Julian Day (UTC)
-        decimal_time = hour + minute/60 + second/3600
-        jd_utc = swe.julday(year, month, day, decimal_time - timezone_offset)
+        with stage('julian_day'):
+            decimal_time = hour + minute/60 + second/3600
+            jd_utc = swe.julday(year, month, day, decimal_time - timezone_offset)
         
-        # Set KP Ayanamsa
-        swe.set_sid_mode(swe.SIDM_USER, 0, KP_AYANAMSA)
+        # KP Ayanamsa
+        ayanamsa = kp_ayanamsa(jd_utc)
         
         # Calculate planetary positions
         planets = {
@@ -124,10 +195,15 @@ def calculate_chart_for_web(input_data):
                 'latitude': latitude,
                 'longitude': longitude
             },
+            'resolvedPlace': birth['resolved_place'],
+            'timezone': {
+                'name': birth['timezone'],
+                'utc_offset_hours': timezone_offset
+            },
             'ayanamsa': {
-                'system': 'KP-Newcomb',
-                'value': KP_AYANAMSA,
-                'formatted': format_dms(KP_AYANAMSA)
+                'system': AYANAMSA_NAME,
+                'value': ayanamsa,
+                'formatted': format_dms(ayanamsa)
             },
             'planetary_positions': [],
             'houses': [],
@@ -143,16 +219,18 @@ def calculate_chart_for_web(input_data):
         
         for planet_name, planet_id in planets.items():
             try:
-                result = swe.calc_ut(jd_utc, planet_id, swe.FLG_SPEED | swe.FLG_SIDEREAL)
-                longitude_planet = result[0][0]
-                speed = result[0][3]
+                with stage('calc_ut'):
+                    result = sidereal_calc(jd_utc, planet_id)
+                longitude_planet = result[0]
+                speed = result[3]
                 
                 sign_num = int(longitude_planet // 30)
                 degrees_in_sign = longitude_planet % 30
                 
                 # Get nakshatra info
-                nak_info = get_nakshatra_info(longitude_planet)
-                sub_lord = get_sub_lord(longitude_planet)
+                with stage('classification'):
+                    nak_info = get_nakshatra_info(longitude_planet)
+                    sub_lord = get_sub_lord(longitude_planet)
                 
                 # Determine retrograde status
                 retrograde = speed < 0 if planet_name not in ['Sun', 'Moon', 'Rahu'] else False
@@ -176,11 +254,14 @@ def calculate_chart_for_web(input_data):
                 planetary_positions.append(planet_data)
                 
             except Exception as e:
+                count_body_error(planet_name)
                 planetary_positions.append({
                     'planet': planet_name,
                     'error': str(e)
                 })
         
+        count_ephemeris_calls('calc_ut', len(planets))
+        
         # Add Ketu
         try:
             rahu_data = next(p for p in planetary_positions if p['planet'] == 'Rahu')
@@ -189,8 +270,9 @@ def calculate_chart_for_web(input_data):
                 ketu_sign_num = int(ketu_longitude // 30)
                 ketu_degrees_in_sign = ketu_longitude % 30
                 
-                ketu_nak_info = get_nakshatra_info(ketu_longitude)
-                ketu_sub_lord = get_sub_lord(ketu_longitude)
+                with stage('classification'):
+                    ketu_nak_info = get_nakshatra_info(ketu_longitude)
+                    ketu_sub_lord = get_sub_lord(ketu_longitude)
                 
                 ketu_data = {
                     'planet': 'Ketu',
@@ -214,46 +296,43 @@ def calculate_chart_for_web(input_data):
         
         # Calculate houses
         try:
-            houses_result = swe.houses(jd_utc, latitude, longitude, b'P')
+            with stage('houses'):
+                count_ephemeris_calls('houses')
+                houses_result = swe.houses(jd_utc, latitude, longitude, b'P')
             house_cusps = houses_result[0]
             ascmc = houses_result[1]
             
             houses_data = []
             
-            for i, cusp in enumerate(house_cusps[1:], 1):  # Skip index 0
-                cusp_sidereal = cusp - KP_AYANAMSA
-                if cusp_sidereal < 0:
-                    cusp_sidereal += 360
+            with stage('classification'):
+                for i, cusp in enumerate(house_cusps[-12:], 1):  # pyswisseph >= 2.10 returns 12 cusps, older versions 13
+                    cusp_sidereal = float(to_sidereal(cusp, jd_utc))
                 
-                sign_num = int(cusp_sidereal // 30)
-                degrees_in_sign = cusp_sidereal % 30
+                    sign_num = int(cusp_sidereal // 30)
+                    degrees_in_sign = cusp_sidereal % 30
                 
-                house_data = {
-                    'house': i,
-                    'cusp_degree': format_dms(degrees_in_sign),
-                    'sign': SIGNS[sign_num],
-                    'longitude': cusp_sidereal,
-                    'sub_lord': get_sub_lord(cusp_sidereal)
-                }
+                    house_data = {
+                        'house': i,
+                        'cusp_degree': format_dms(degrees_in_sign),
+                        'sign': SIGNS[sign_num],
+                        'longitude': cusp_sidereal,
+                        'sub_lord': get_sub_lord(cusp_sidereal)
+                    }
                 
-                houses_data.append(house_data)
+                    houses_data.append(house_data)
             
             chart_data['houses'] = houses_data
             
             # Now assign planets to houses
-            for planet_data in planetary_positions:
-                if 'longitude' in planet_data:
-                    planet_house = get_planet_house(planet_data['longitude'], houses_data)
-                    planet_data['house'] = planet_house
+            with stage('house_placement'):
+                for planet_data in planetary_positions:
+                    if 'longitude' in planet_data:
+                        planet_house = get_planet_house(planet_data['longitude'], houses_data)
+                        planet_data['house'] = planet_house
             
             # Add special points
-            asc_sidereal = ascmc[0] - KP_AYANAMSA
-            if asc_sidereal < 0:
-                asc_sidereal += 360
-            
-            mc_sidereal = ascmc[1] - KP_AYANAMSA
-            if mc_sidereal < 0:
-                mc_sidereal += 360
+            asc_sidereal = float(to_sidereal(ascmc[0], jd_utc))
+            mc_sidereal = float(to_sidereal(ascmc[1], jd_utc))
             
             chart_data['special_points'] = {
                 'ascendant': {
@@ -269,12 +348,26 @@ def calculate_chart_for_web(input_data):
             }
             
         except Exception as e:
+            count_body_error('houses')
             chart_data['houses'] = [{'error': str(e)}]
         
+        # Comparison house systems, all derived from one shared ARMC, obliquity and Ascendant
+        if birth['house_systems']:
+            with stage('house_systems'):
+                systems = compute_house_systems([jd_utc], [latitude], [longitude],
+                                                birth['house_systems'], ayanamsa)
+            chart_data['house_systems'] = {
+                'systems': list(systems['systems']),
+                'names': [HOUSE_SYSTEM_NAMES[code] for code in systems['systems']],
+                'cusps': systems['cusps'][0].tolist(),  # 12 rows, one column per system
+                'porphyry_fallback': systems['fallback'][0].tolist()
+            }
+        
         chart_data['planetary_positions'] = planetary_positions
         
         # Generate interpretation
-        chart_data['interpretation'] = generate_interpretation(planetary_positions, chart_data)
+        with stage('generate_interpretation'):
+            chart_data['interpretation'] = generate_interpretation(planetary_positions, chart_data)
         
         return {
             'success': True,
@@ -332,7 +425,7 @@ def generate_interpretation(planetary_positions, chart_data):
         interpretation_parts.append(f"Ascendant in {asc_sign}: Personality projection and life approach.")
     
     interpretation_parts.append("\nThis is a professional KP astrology calculation using Swiss Ephemeris precision.")
-    interpretation_parts.append(f"Ayanamsa used: {chart_data['ayanamsa']['formatted']} (KP-Newcomb system)")
+    interpretation_parts.append(f"Ayanamsa used: {chart_data['ayanamsa']['formatted']} ({AYANAMSA_NAME} system)")
     
     return "\n\n".join(interpretation_parts)
 
@@ -352,7 +445,10 @@ def main():
             'birthPlace': 'Tamil Nadu, India'
         }
     
-    result = calculate_chart_for_web(input_data)
+    # Imported here: kp_chart_cache imports this module
+    from kp_profiler import run_profiled
+    from kp_chart_cache import cached_chart
+    result = run_profiled('chart', cached_chart, input_data, input_data.get('profile'))
     print(json.dumps(result, indent=2, ensure_ascii=False))
 
 if __name__ == "__main__":